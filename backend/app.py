@@ -1,17 +1,281 @@
-from flask import Flask, request, jsonify, send_file
+import time
+# Start of import, for the startup report (GET /api/startup)
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
 from tarot_scraper import TarotScraper
-from llm_service import LLMService
-from tts_service import TTSService
-import io
+from deck import DECK, UnknownCard, normalize_cards
+from llm_service import DEFAULT_MODEL, LLMService, PROMPT_VERSION, iter_stream_text, parse_keep_alive, template_for
+from llm_scheduler import LLMScheduler, QueueFullError
+from interpretation_cache import InterpretationCache
+from resumable_streams import StreamRegistry
+from tts_service import DEFAULT_SPEECH_RATE, DEFAULT_VOICE, TTSService
+from tts_cache import AudioCache
+from read_aloud import ReadAloudPipeline
+from sentence_events import FRAMINGS, negotiate_framing, iter_events
+from framing import FRAME_MIMETYPE, iter_frame
+from warmup import Warmup
+from cancellation import CancelToken, Cancelled, DisconnectMonitor, cancellable, client_socket
+from bulk import BulkInterpreter
+from precomputed import PrecomputedStore
+from lazy_service import LazyService, ServiceUnavailable
+import audio_codecs
+import metrics
+from audio_codecs import UnsupportedFormat
+import json
+import os
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React Native app
 
-# Initialize services
-scraper = TarotScraper()
-llm_service = LLMService()
-tts_service = TTSService()
+# Admission control in front of Ollama: bounded concurrency and wait queue
+llm_scheduler = LLMScheduler(
+    max_concurrent=int(os.environ.get('LLM_MAX_CONCURRENT', 2)),
+    max_queue=int(os.environ.get('LLM_MAX_QUEUE', 32)),
+    queue_timeout=float(os.environ.get('LLM_QUEUE_TIMEOUT', 120)),
+    aging=float(os.environ.get('LLM_QUEUE_AGING', 2))
+)
+
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 2))
+TTS_MODEL_PATH = os.path.abspath(DEFAULT_VOICE)
+TTS_SPEECH_RATE = DEFAULT_SPEECH_RATE
+# With TTS_TIME_STRETCH=1, other speech rates are time-stretched from audio
+# already cached or precomputed at the default rate instead of re-synthesized.
+# With TTS_SHARD_WORKERS above 1, long texts are split at sentence boundaries
+# and the pieces synthesized on that many workers at once.
+TTS_TIME_STRETCH = os.environ.get('TTS_TIME_STRETCH', '0') == '1'
+TTS_SHARD_WORKERS = int(os.environ.get('TTS_SHARD_WORKERS', 1))
+TTS_SHARD_MIN_CHARS = int(os.environ.get('TTS_SHARD_MIN_CHARS', 200))
+tts_cache = AudioCache(
+    cache_dir=os.environ.get('TTS_CACHE_DIR', 'tts_cache') or None,
+    memory_bytes=int(os.environ.get('TTS_CACHE_MEMORY_MB', 32)) * 1024 * 1024,
+    disk_bytes=int(os.environ.get('TTS_CACHE_DISK_MB', 512)) * 1024 * 1024
+)
+
+# Interpretations and audio built ahead of time (precomputed.py), served from
+# a memory mapping; readings and sentences not in it are generated live
+precomputed = PrecomputedStore.open(os.environ.get('PRECOMPUTED_STORE', 'precomputed.store'))
+if precomputed is not None:
+    precomputed.check_model(DEFAULT_MODEL, PROMPT_VERSION)
+# Stored audio to time-stretch from, if it was voiced with this voice
+stretch_source = None
+if precomputed is not None and precomputed.meta.get('voice') == os.path.basename(TTS_MODEL_PATH):
+    stretch_source = precomputed
+
+def create_tts_service():
+    """The TTS service with its Piper pool; the voice model must exist."""
+    service = TTSService(
+        model_path=TTS_MODEL_PATH,
+        speech_rate=TTS_SPEECH_RATE,
+        pool_size=TTS_WORKERS,
+        cache=tts_cache,
+        time_stretch=TTS_TIME_STRETCH,
+        shard_workers=TTS_SHARD_WORKERS,
+        shard_min_chars=TTS_SHARD_MIN_CHARS
+    )
+    service.precomputed = stretch_source
+    return service
+
+# Services are built on first use (see lazy_service.py), so the server binds
+# without waiting for them, and a missing voice only disables speech
+scraper = LazyService('Card meanings', TarotScraper)
+llm_service = LazyService('LLM', lambda: LLMService(
+    scheduler=llm_scheduler,
+    keep_alive=parse_keep_alive(os.environ.get('LLM_KEEP_ALIVE', '30m'))
+))
+tts_service = LazyService('TTS', create_tts_service)
+SERVICES = {'scraper': scraper, 'llm': llm_service, 'tts': tts_service}
+
+# Optional cache of finished interpretations; identical concurrent readings share one generation
+interpretation_cache = None
+if os.environ.get('INTERPRETATION_CACHE', '0') == '1':
+    interpretation_cache = InterpretationCache(
+        ttl=float(os.environ.get('INTERPRETATION_CACHE_TTL', 3600)),
+        max_entries=int(os.environ.get('INTERPRETATION_CACHE_SIZE', 1024)),
+        variants=int(os.environ.get('INTERPRETATION_CACHE_VARIANTS', 1)),
+        error_message=lambda e: llm_service.error_message(e)
+    )
+# Replay buffers for resumable streams ("resumable": true), which a client
+# that lost its connection reconnects to instead of starting over
+stream_registry = StreamRegistry(
+    ttl=float(os.environ.get('STREAM_REPLAY_TTL', 300)),
+    max_bytes=int(os.environ.get('STREAM_REPLAY_MB', 16)) * 1024 * 1024,
+    error_message=lambda e: llm_service.error_message(e)
+)
+
+# Load the model, cache the system prompt and run the voice once, without
+# delaying startup; /api/health/ready reports when this has finished. This
+# builds the LLM and TTS services in the background right after startup;
+# with WARMUP=0 each is only built by the first request that needs it.
+WARMUP = os.environ.get('WARMUP', '1') == '1'
+warmup = Warmup(llm_service, tts_service, interval=float(os.environ.get('WARMUP_INTERVAL', 240)))
+if WARMUP:
+    warmup.start()
+
+# Synthesis jobs for server-side pipelines, one per Piper worker
+tts_executor = ThreadPoolExecutor(max_workers=max(TTS_WORKERS, 1), thread_name_prefix='tts')
+
+VALID_SPREAD_TYPES = [1, 3, 6, 9, 10, 12]
+MAX_TTS_BATCH = 64
+# Bulk jobs: readings per request, and how many of them are generated at once
+MAX_BULK_READINGS = int(os.environ.get('BULK_MAX_READINGS', 1000))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', llm_scheduler.max_concurrent))
+
+# Send a Server-Timing header on every response (clients can also ask with "X-Timing: 1")
+TIMING_HEADERS = os.environ.get('TIMING_HEADERS', '0') == '1'
+
+# Requests whose Ollama and Piper work is stopped when the client disconnects
+CANCELLABLE_ENDPOINTS = {
+    'interpret_reading', 'interpret_reading_stream', 'interpret_batch',
+    'read_aloud', 'text_to_speech', 'text_to_speech_batch'
+}
+disconnect_monitor = DisconnectMonitor()
+
+@app.before_request
+def start_request_metrics():
+    g.started = time.perf_counter()
+    if TIMING_HEADERS or request.headers.get('X-Timing') == '1':
+        g.timings_token = metrics.collect_timings()
+
+@app.before_request
+def watch_client():
+    """Give a cancellable request a CancelToken that trips when its client disconnects."""
+    if request.endpoint not in CANCELLABLE_ENDPOINTS:
+        return
+    g.cancel = CancelToken()
+    sock = client_socket(request.environ)
+    if sock is not None:
+        # Read the body first, so only the client closing the connection makes it readable
+        request.get_data(cache=True)
+        disconnect_monitor.watch(sock, g.cancel)
+        g.client_socket = sock
+
+@app.after_request
+def finish_request_metrics(response):
+    """Attach Server-Timing and count the bytes sent (streamed bodies as they go out)."""
+    endpoint = request.endpoint or 'unknown'
+    if getattr(g, 'timings_token', None) is not None:
+        # Streamed responses only include the stages finished before the first byte
+        response.headers['Server-Timing'] = metrics.server_timing(metrics.collected_timings())
+    if response.is_streamed:
+        response.response = metrics.CountingBody(
+            response.response, endpoint, response.status_code, g.started
+        )
+    else:
+        metrics.observe_response(
+            endpoint, response.status_code, response.calculate_content_length() or 0,
+            time.perf_counter() - g.started
+        )
+    return response
+
+@app.teardown_request
+def stop_request_metrics(exc):
+    token = g.pop('timings_token', None)
+    if token is not None:
+        try:
+            metrics.stop_collecting(token)
+        except ValueError:
+            pass  # torn down from a different context than the one that started it
+
+def release_client(sock, cancel):
+    """Stop watching a finished request; anything still attached to its token has lost its client."""
+    if sock is not None:
+        disconnect_monitor.unwatch(sock)
+    cancel.cancel()
+
+@app.after_request
+def release_client_with_body(response):
+    """A streamed body outlives the request context, so its client is released when the body closes."""
+    if response.is_streamed and g.get('cancel') is not None:
+        sock, cancel = g.pop('client_socket', None), g.pop('cancel')
+        response.call_on_close(lambda: release_client(sock, cancel))
+    return response
+
+@app.teardown_request
+def release_finished_client(exc):
+    cancel = g.pop('cancel', None)
+    if cancel is not None:
+        release_client(g.pop('client_socket', None), cancel)
+
+def get_card_meanings(cards):
+    """Look up the meaning of every card in the reading, keyed by deck id."""
+    with metrics.timer('meaning_lookup'):
+        return {card_obj['id']: scraper.get_card_meaning(DECK[card_obj['id']]) for card_obj in cards}
+
+def interpretation_stream(cards, spread_type, card_meanings, cancel=None):
+    """
+    Iterator of interpretation text, through the interpretation cache when enabled.
+    
+    Admission happens here, before the response starts, so a full queue
+    raises QueueFullError while a 429 can still be returned (and Cancelled
+    if the client leaves while queued). Once `cancel` trips the iterator
+    ends and the Ollama stream is closed.
+    """
+    if interpretation_cache is None:
+        ticket = llm_service.admit(cards, cancel)
+        return cancellable(iter_stream_text(llm_service.generate_interpretation(
+            cards,
+            spread_type,
+            card_meanings,
+            stream=True,
+            ticket=ticket
+        )), cancel, 'llm')
+    key = InterpretationCache.make_key(cards, spread_type, llm_service.model_name, PROMPT_VERSION)
+    # A shared generation carries on for the cache and its other readers; only this reader stops
+    return cancellable(interpretation_cache.stream(
+        key,
+        lambda ticket: llm_service.stream_interpretation(cards, spread_type, card_meanings, ticket),
+        admit=lambda: llm_service.admit(cards, cancel)
+    ), cancel)
+
+def start_resumable(cards, spread_type, card_meanings, cancel=None):
+    """
+    Start a reading in a replay buffer that outlives the request.
+    
+    Admission happens here as for interpretation_stream, and a client that
+    leaves while queued (`cancel`) still gives up its place. Once started,
+    the generation no longer depends on the connection: only the end of
+    the reading or stream_registry.cancel() stops it.
+    """
+    generation_cancel = CancelToken()
+    detach = cancel.on_cancel(generation_cancel.cancel) if cancel is not None else None
+    try:
+        text_stream = interpretation_stream(cards, spread_type, card_meanings, generation_cancel)
+    finally:
+        if detach is not None:
+            detach()
+    return stream_registry.start(text_stream, generation_cancel, cards, spread_type)
+
+def precomputed_response(view, mimetype, headers=None):
+    """
+    Serve a slice of the memory-mapped store. WSGI bodies must be bytes, so
+    this copies it once; asgi_app.py sends the mapped slice itself.
+    """
+    headers = dict(headers or {}, **{'X-Precomputed': '1'})
+    return Response(bytes(view), mimetype=mimetype, headers=headers)
+
+def cancelled_response():
+    """The client has gone; 499 (client closed request) is only seen by logs and metrics."""
+    return Response(status=499)
+
+def busy_response(e):
+    """429 with Retry-After for a request the scheduler turned away."""
+    response = jsonify({'error': str(e), 'retryAfter': e.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+def unavailable_response(e):
+    """503 for a request whose service could not be built (for example a missing voice model)."""
+    return jsonify({'error': str(e)}), 503
+
+def get_audio_format(data):
+    """Requested (format, sample rate) from the body or Accept header; raises UnsupportedFormat."""
+    audio_format = audio_codecs.negotiate(data.get('format'), request.headers.get('Accept'))
+    sample_rate = audio_codecs.validate_rate(data.get('sampleRate'))
+    return audio_format, sample_rate
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -21,10 +285,33 @@ def health_check():
         'message': 'Tarot interpretation service is running'
     })
 
+@app.route('/api/health/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return jsonify(warmup.liveness())
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness probe: 200 once the model is loaded and primed and the voice
+    is warm, 503 until then. Reports the expected first-token latency.
+    """
+    ready, report = warmup.readiness()
+    return jsonify(report), 200 if ready else 503
+
 @app.route('/api/interpret_stream', methods=['POST'])
 def interpret_reading_stream():
     """
     Generate a streaming interpretation for a tarot reading.
+    
+    By default the raw text is streamed as Ollama produces it. With
+    "framing": "ndjson" or "sse" in the body (or a matching Accept header)
+    the text is coalesced into sentence events with sequence numbers, card
+    position markers and a final stats event (see sentence_events.py).
+    
+    With "resumable": true the reading is generated into a replay buffer
+    and the response carries its id in X-Stream-Id; after a dropped
+    connection, GET /api/interpret_stream/<id> picks it up again.
     """
     try:
         data = request.get_json()
@@ -36,38 +323,95 @@ def interpret_reading_stream():
         
         if not cards:
             return jsonify({'error': 'No cards provided'}), 400
-            
-        # Get meanings for all cards
-        card_meanings = {}
-        for card_obj in cards:
-            card_name = card_obj['card']
-            is_reversed = card_obj.get('reversed', False)
-            meaning = scraper.get_card_meaning(card_name, is_reversed)
-            card_meanings[card_name.lower()] = meaning
-            
-        # Generator function for streaming response
-        def generate():
-            stream = llm_service.generate_interpretation(
-                cards, 
-                spread_type, 
-                card_meanings, 
-                stream=True
+        
+        try:
+            cards = normalize_cards(cards)
+        except UnknownCard as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            framing = negotiate_framing(data.get('framing'), request.headers.get('Accept'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        headers = {}
+        stored = precomputed.reading(cards, spread_type) if precomputed is not None else None
+        if stored is not None:
+            if framing is None:
+                return precomputed_response(stored, 'text/plain')
+            text_stream = iter([str(stored, 'utf-8')])
+            headers['X-Precomputed'] = '1'
+        elif data.get('resumable'):
+            # A stored reading needs no resuming: it is sent in one piece
+            buffer = start_resumable(cards, spread_type, get_card_meanings(cards), g.cancel)
+            text_stream = cancellable(buffer.generation.subscribe(), g.cancel)
+            headers['X-Stream-Id'] = buffer.stream_id
+        else:
+            # Get meanings for all cards
+            card_meanings = get_card_meanings(cards)
+            text_stream = interpretation_stream(cards, spread_type, card_meanings, g.cancel)
+        
+        if framing is not None:
+            labels = template_for(spread_type, len(cards)).labels
+            headers.update({'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+            return Response(
+                stream_with_context(iter_events(text_stream, cards, labels, framing)),
+                mimetype=FRAMINGS[framing],
+                headers=headers
             )
-            
-            for chunk in stream:
-                if isinstance(chunk, dict) and 'message' in chunk:
-                    content = chunk['message']['content']
-                    if content:
-                        yield content
-                elif isinstance(chunk, str):
-                    yield chunk
-
-        from flask import Response, stream_with_context
-        return Response(stream_with_context(generate()), mimetype='text/plain')
 
+        return Response(stream_with_context(text_stream), mimetype='text/plain', headers=headers)
+
+    except QueueFullError as e:
+        return busy_response(e)
+    except Cancelled:
+        return cancelled_response()
     except Exception as e:
         return jsonify({'error': f'Error processing request: {str(e)}'}), 500
 
+@app.route('/api/interpret_stream/<stream_id>', methods=['GET'])
+def resume_interpretation_stream(stream_id):
+    """
+    Resume a resumable interpretation stream after a dropped connection.
+    
+    The part the client missed is replayed from the stream's buffer and
+    the rest follows the same generation live. Query parameters:
+        offset: Bytes of plain text already received
+        seq: For framed streams, the first sentence not yet received (an SSE
+            Last-Event-ID header is taken as the last one received)
+        framing: As for POST /api/interpret_stream (or the Accept header)
+    """
+    buffer = stream_registry.get(stream_id)
+    if buffer is None:
+        return jsonify({'error': 'Unknown or expired stream'}), 404
+    try:
+        framing = negotiate_framing(request.args.get('framing'), request.headers.get('Accept'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        seq = int(request.args.get('seq', 0))
+        if request.headers.get('Last-Event-ID') is not None:
+            seq = int(request.headers['Last-Event-ID']) + 1
+    except ValueError:
+        return jsonify({'error': 'offset and seq must be integers'}), 400
+    if offset < 0 or seq < 0:
+        return jsonify({'error': 'offset and seq must not be negative'}), 400
+    
+    headers = {'X-Stream-Id': stream_id, 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if framing is not None:
+        labels = template_for(buffer.spread_type, len(buffer.cards)).labels
+        events = iter_events(buffer.generation.subscribe(), buffer.cards, labels, framing, resume_seq=seq)
+        return Response(stream_with_context(events), mimetype=FRAMINGS[framing], headers=headers)
+    return Response(stream_with_context(buffer.text(offset)), mimetype='text/plain', headers=headers)
+
+@app.route('/api/interpret_stream/<stream_id>', methods=['DELETE'])
+def cancel_interpretation_stream(stream_id):
+    """Stop a resumable stream's generation (a dropped connection alone does not)."""
+    if not stream_registry.cancel(stream_id):
+        return jsonify({'error': 'Unknown or expired stream'}), 404
+    return '', 204
+
 @app.route('/api/interpret', methods=['POST'])
 def interpret_reading():
     """
@@ -78,10 +422,14 @@ def interpret_reading():
         "cards": [
             {"card": "The Fool", "reversed": false},
             {"card": "The Magician", "reversed": true},
+            {"id": 13},  (a deck id from deck.py instead of a name)
             ...
         ],
         "spreadType": 3
     }
+    
+    Card names are matched case-insensitively, with common aliases
+    ("Judgment", "2 of Coins"); an unknown or repeated card is a 400.
     """
     try:
         data = request.get_json()
@@ -95,23 +443,35 @@ def interpret_reading():
         if not cards:
             return jsonify({'error': 'No cards provided'}), 400
         
-        if spread_type not in [1, 3, 6, 9, 10, 12]:
+        try:
+            cards = normalize_cards(cards)
+        except UnknownCard as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if spread_type not in VALID_SPREAD_TYPES:
             return jsonify({'error': 'Invalid spread type'}), 400
         
+        stored = precomputed.reading(cards, spread_type) if precomputed is not None else None
+        if stored is not None:
+            response = jsonify({
+                'interpretation': str(stored, 'utf-8'),
+                'cardCount': len(cards),
+                'spreadType': spread_type
+            })
+            response.headers['X-Precomputed'] = '1'
+            return response
+        
         # Get meanings for all cards
-        card_meanings = {}
-        for card_obj in cards:
-            card_name = card_obj['card']
-            is_reversed = card_obj.get('reversed', False)
-            meaning = scraper.get_card_meaning(card_name, is_reversed)
-            card_meanings[card_name.lower()] = meaning
-        
-        # Generate interpretation using LLM
-        interpretation = llm_service.generate_interpretation(
-            cards, 
-            spread_type, 
-            card_meanings
-        )
+        card_meanings = get_card_meanings(cards)
+        
+        # Generate interpretation using LLM, streamed so it can stop if the client leaves
+        text_stream = interpretation_stream(cards, spread_type, card_meanings, g.cancel)
+        try:
+            interpretation = ''.join(text_stream)
+        except Exception as e:
+            interpretation = llm_service.error_message(e)
+        if g.cancel.cancelled:
+            return cancelled_response()
         
         return jsonify({
             'interpretation': interpretation,
@@ -119,6 +479,158 @@ def interpret_reading():
             'spreadType': spread_type
         })
     
+    except QueueFullError as e:
+        return busy_response(e)
+    except Cancelled:
+        return cancelled_response()
+    except Exception as e:
+        return jsonify({
+            'error': f'Error processing request: {str(e)}'
+        }), 500
+
+def validate_reading(reading):
+    """Error message for a reading that cannot be interpreted, else None."""
+    if not isinstance(reading, dict):
+        return 'Reading must be an object'
+    cards = reading.get('cards')
+    if not isinstance(cards, list) or not cards:
+        return 'No cards provided'
+    if reading.get('spreadType', 1) not in VALID_SPREAD_TYPES:
+        return 'Invalid spread type'
+    return None
+
+@app.route('/api/interpret_batch', methods=['POST'])
+def interpret_batch():
+    """
+    Generate interpretations for many readings, for offline pre-generation.
+    
+    Expected JSON body:
+    {
+        "readings": [
+            {"id": "daily-1", "cards": [{"card": "The Fool", "reversed": false}], "spreadType": 1},
+            ...
+        ],
+        "skipIds": ["daily-0"],  (optional, ids already generated)
+        "concurrency": 2  (optional)
+    }
+    
+    Readings are queued behind interactive requests and streamed back as
+    NDJSON in completion order: one "result" or "error" line per reading,
+    then a "stats" line with readings per minute. To resume an interrupted
+    job, send the same readings again with the ids already received in
+    "skipIds" (readings without an id get one derived from their cards).
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        readings = data.get('readings', [])
+        skip_ids = data.get('skipIds', [])
+        
+        if not isinstance(readings, list) or not readings:
+            return jsonify({'error': 'No readings provided'}), 400
+        
+        if len(readings) > MAX_BULK_READINGS:
+            return jsonify({'error': f'Too many readings (max {MAX_BULK_READINGS})'}), 400
+        
+        if not isinstance(skip_ids, list):
+            return jsonify({'error': 'skipIds must be a list'}), 400
+        
+        try:
+            concurrency = int(data.get('concurrency', BULK_CONCURRENCY))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid concurrency'}), 400
+        
+        runner = BulkInterpreter(
+            llm_service,
+            get_card_meanings,
+            concurrency=max(1, min(concurrency, BULK_CONCURRENCY)),
+            validate=validate_reading,
+            cancel=g.cancel
+        )
+        
+        def generate():
+            for record in runner.run(readings, skip=(str(rid) for rid in skip_ids)):
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    except Exception as e:
+        return jsonify({
+            'error': f'Error processing request: {str(e)}'
+        }), 500
+
+@app.route('/api/read_aloud', methods=['POST'])
+def read_aloud():
+    """
+    Generate an interpretation and synthesize it on the server.
+    
+    Expected JSON body is the same as /api/interpret, plus an optional
+    "rate" (Piper length-scale).
+    
+    Streams frames (see framing.py): a "text" frame per sentence, an
+    "audio" frame with a WAV payload per sentence in the same order, and
+    a final "stats" frame with time_to_first_audio_ms.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        cards = data.get('cards', [])
+        spread_type = data.get('spreadType', 1)
+        rate = data.get('rate')
+        
+        if not cards:
+            return jsonify({'error': 'No cards provided'}), 400
+        
+        try:
+            cards = normalize_cards(cards)
+        except UnknownCard as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if spread_type not in VALID_SPREAD_TYPES:
+            return jsonify({'error': 'Invalid spread type'}), 400
+        
+        try:
+            audio_format, sample_rate = get_audio_format(data)
+        except UnsupportedFormat as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Without a voice there is nothing to read aloud; fail before generating
+        tts_service.get()
+        card_meanings = get_card_meanings(cards)
+        pipeline = ReadAloudPipeline(
+            tts_service, tts_executor, rate=rate,
+            audio_format=audio_format, sample_rate=sample_rate, cancel=g.cancel
+        )
+        
+        text_stream = interpretation_stream(cards, spread_type, card_meanings, g.cancel)
+        
+        def generate():
+            try:
+                yield from pipeline.run(text_stream)
+            finally:
+                # Release the generation slot even if the client left early
+                close = getattr(text_stream, 'close', None)
+                if close is not None:
+                    close()
+        
+        return Response(stream_with_context(generate()), mimetype=FRAME_MIMETYPE)
+    
+    except QueueFullError as e:
+        return busy_response(e)
+    except Cancelled:
+        return cancelled_response()
+    except ServiceUnavailable as e:
+        return unavailable_response(e)
     except Exception as e:
         return jsonify({
             'error': f'Error processing request: {str(e)}'
@@ -131,10 +643,18 @@ def text_to_speech():
     
     Expected JSON body:
     {
-        "text": "Text to convert to speech"
+        "text": "Text to convert to speech",
+        "rate": 1.4,           (optional Piper length-scale)
+        "stream": true,        (optional)
+        "format": "ulaw",      (optional: wav, ulaw, alaw, opus)
+        "sampleRate": 16000    (optional: 8000, 11025, 16000, 22050)
     }
     
-    Returns WAV audio file
+    Returns WAV audio file (or Ogg for opus). Without "format", the Accept
+    header is used to pick one. X-Payload-Ratio reports the size against
+    raw 16-bit WAV. With "stream", the header is sent straight away and
+    audio is forwarded as Piper produces it (wav, ulaw and alaw at the
+    native rate only).
     """
     try:
         data = request.get_json()
@@ -143,26 +663,217 @@ def text_to_speech():
             return jsonify({'error': 'No data provided'}), 400
         
         text = data.get('text', '')
+        rate = data.get('rate')
         
         if not text or len(text.strip()) == 0:
             return jsonify({'error': 'No text provided'}), 400
         
+        try:
+            audio_format, sample_rate = get_audio_format(data)
+            if data.get('stream') and audio_format != 'wav':
+                audio_codecs.StreamEncoder(audio_format)
+                if sample_rate:
+                    raise UnsupportedFormat("Resampling is not available for streamed audio")
+        except UnsupportedFormat as e:
+            return jsonify({'error': str(e)}), 400
+        
+        headers = {
+            'Content-Disposition': 'inline; filename=speech.wav',
+            'X-Audio-Format': audio_format
+        }
+        
+        if precomputed is not None:
+            # A complete stored clip also answers a streamed request
+            stored = precomputed.audio(
+                text.strip(), rate if rate is not None else TTS_SPEECH_RATE, audio_format, sample_rate
+            )
+            if stored is not None:
+                headers['X-Payload-Ratio'] = str(audio_codecs.nominal_ratio(audio_format, sample_rate))
+                if audio_format == 'opus':
+                    headers['Content-Disposition'] = 'inline; filename=speech.ogg'
+                return precomputed_response(stored, audio_codecs.FORMATS[audio_format], headers)
+        
+        if data.get('stream'):
+            chunks = tts_service.synthesize_stream(text, rate, g.cancel)
+            if audio_format != 'wav':
+                chunks = audio_codecs.encode_stream(chunks, audio_format)
+            headers['X-Payload-Ratio'] = str(audio_codecs.nominal_ratio(audio_format))
+            return Response(
+                stream_with_context(chunks),
+                mimetype=audio_codecs.FORMATS[audio_format],
+                headers=headers
+            )
+        
         # Generate audio
-        audio_data = tts_service.synthesize(text)
-        
-        # Return audio file
-        return send_file(
-            io.BytesIO(audio_data),
-            mimetype='audio/wav',
-            as_attachment=False,
-            download_name='speech.wav'
-        )
+        audio_data = tts_service.synthesize(text, rate, g.cancel)
+        audio_data, mimetype, _, ratio = audio_codecs.encode_segment(audio_data, audio_format, sample_rate)
+        headers['X-Payload-Ratio'] = str(ratio)
+        if mimetype != 'audio/wav':
+            headers['Content-Disposition'] = 'inline; filename=speech.ogg'
+        
+        # Return audio bytes directly, without another BytesIO copy
+        return Response(audio_data, mimetype=mimetype, headers=headers)
     
+    except Cancelled:
+        return cancelled_response()
+    except ServiceUnavailable as e:
+        return unavailable_response(e)
     except Exception as e:
         return jsonify({
             'error': f'Error generating speech: {str(e)}'
         }), 500
 
+@app.route('/api/tts_batch', methods=['POST'])
+def text_to_speech_batch():
+    """
+    Convert many texts to speech in one request.
+    
+    Expected JSON body:
+    {
+        "texts": ["First sentence.", "Second sentence."],
+        "rate": 1.4  (optional)
+    }
+    
+    Items are synthesized concurrently and streamed back in request order
+    as frames (see framing.py). Each "audio" frame carries one WAV with its
+    index, duration and byte offset within the concatenated audio payloads,
+    and a final "done" frame carries the totals.
+    """
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+        
+        texts = data.get('texts', [])
+        rate = data.get('rate')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'No texts provided'}), 400
+        
+        if len(texts) > MAX_TTS_BATCH:
+            return jsonify({'error': f'Too many texts (max {MAX_TTS_BATCH})'}), 400
+        
+        if any(not isinstance(text, str) or not text.strip() for text in texts):
+            return jsonify({'error': 'Texts must be non-empty strings'}), 400
+        
+        try:
+            audio_format, sample_rate = get_audio_format(data)
+        except UnsupportedFormat as e:
+            return jsonify({'error': str(e)}), 400
+        
+        cancel = g.cancel
+        tts_service.get()
+        
+        def synthesize(text):
+            return audio_codecs.encode_segment(
+                tts_service.synthesize(text, rate, cancel), audio_format, sample_rate
+            )
+        
+        futures = [tts_executor.submit(synthesize, text) for text in texts]
+        
+        def generate():
+            offset = 0
+            wav_bytes = 0
+            total_duration = 0.0
+            try:
+                for index, future in enumerate(futures):
+                    try:
+                        audio, mimetype, duration, ratio = future.result()
+                    except Exception as e:
+                        yield from iter_frame({'type': 'error', 'index': index, 'error': str(e)})
+                        continue
+                    yield from iter_frame({
+                        'type': 'audio',
+                        'index': index,
+                        'offset': offset,
+                        'mimetype': mimetype,
+                        'duration': round(duration, 3),
+                        'ratio': ratio
+                    }, audio)
+                    offset += len(audio)
+                    wav_bytes += len(audio) / ratio if ratio else len(audio)
+                    total_duration += duration
+                yield from iter_frame({
+                    'type': 'done',
+                    'count': len(futures),
+                    'bytes': offset,
+                    'duration': round(total_duration, 3),
+                    'ratio': audio_codecs.payload_ratio(offset, wav_bytes)
+                })
+            finally:
+                for future in futures:
+                    if future.cancel():
+                        metrics.record_cancel('tts_queued')
+        
+        return Response(stream_with_context(generate()), mimetype=FRAME_MIMETYPE)
+    
+    except ServiceUnavailable as e:
+        return unavailable_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': f'Error generating speech: {str(e)}'
+        }), 500
+
+@app.route('/api/interpret/cache', methods=['GET'])
+def interpretation_cache_stats():
+    """Hit, miss and coalescing counters for the interpretation cache."""
+    if interpretation_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(interpretation_cache.stats(), enabled=True))
+
+@app.route('/api/interpret/streams', methods=['GET'])
+def resumable_stream_stats():
+    """Replay buffers held for resumable streams, and how often they were resumed."""
+    return jsonify(stream_registry.stats())
+
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_stats():
+    """Active and queued generations, rejections and queue wait percentiles."""
+    return jsonify(llm_scheduler.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Per-stage latency, throughput and bytes-sent histograms in Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    """Prompt evaluation time over recent generations (drops when the prefix cache is warm)."""
+    return jsonify(llm_service.prompt_stats())
+
+@app.route('/api/precomputed', methods=['GET'])
+def precomputed_stats():
+    """Contents of the precomputed store and its hit/miss counters."""
+    if precomputed is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(precomputed.stats(), enabled=True))
+
+@app.route('/api/tts/cache', methods=['GET'])
+def tts_cache_stats():
+    """Hit, miss and byte counters for the TTS audio cache."""
+    return jsonify(tts_cache.stats())
+
+@app.route('/api/startup', methods=['GET'])
+def startup_stats():
+    """How long the backend took to import, and which services have been built (and how long each took)."""
+    return jsonify(startup_report())
+
+def startup_report():
+    return {
+        'import_ms': round(IMPORT_MS, 1),
+        'budget_ms': STARTUP_BUDGET_MS,
+        'warmup': WARMUP,
+        'services': {name: service.status() for name, service in SERVICES.items()}
+    }
+
+# Cold start is held to this budget; python startup_profile.py breaks it down per module
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 500))
+IMPORT_MS = (time.perf_counter() - IMPORT_STARTED) * 1000
+if IMPORT_MS > STARTUP_BUDGET_MS:
+    print(f"Warning: backend import took {IMPORT_MS:.0f} ms, over the {STARTUP_BUDGET_MS:.0f} ms budget "
+          f"(python startup_profile.py shows where it went)")
+
 if __name__ == '__main__':
     print("Starting Tarot Interpretation Service...")
     print("Make sure Ollama is running with: ollama serve")
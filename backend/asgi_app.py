@@ -0,0 +1,529 @@
+"""
+Asyncio (ASGI) serving mode for the tarot backend.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+/api/health (with its live/ready probes), /api/interpret,
+/api/interpret_stream and /api/tts run natively on the event loop: Ollama
+is called through ollama.AsyncClient and Piper workers are driven over
+asyncio subprocess pipes, so an open stream costs a coroutine instead of a
+worker thread. Every other endpoint is served by the Flask app (app.py) in
+a thread pool.
+
+The native routes watch for the client's http.disconnect while they work,
+and cancel the Ollama stream or Piper synthesis behind a request whose
+client has gone (see cancellation.py for the Flask side).
+"""
+
+import os
+import time
+import asyncio
+from asyncio import FIRST_COMPLETED
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as flask_backend
+import audio_codecs
+import metrics
+from audio_codecs import UnsupportedFormat
+from cancellation import CancelToken, Cancelled
+from deck import UnknownCard, normalize_cards
+from llm_service import PROMPT_VERSION, template_for
+from sentence_events import FRAMINGS, negotiate_framing, aiter_events
+from llm_scheduler import QueueFullError
+from interpretation_cache import InterpretationCache
+from tts_service import (
+    AsyncPiperPool, SAMPLE_RATE, SAMPLE_WIDTH, STREAM_CACHE_LIMIT, WAV_HEADER_SIZE, WARMUP_TEXT,
+    split_shards, stretch_from_copy
+)
+
+scraper = flask_backend.scraper
+llm_service = flask_backend.llm_service
+tts_cache = flask_backend.tts_cache
+warmup = flask_backend.warmup
+precomputed = flask_backend.precomputed
+
+tts_pool = AsyncPiperPool(
+    flask_backend.TTS_MODEL_PATH,
+    size=int(os.environ.get('ASGI_TTS_WORKERS', 2))
+)
+tts_pool_warmup = None
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def validate_reading(data, check_spread=True):
+    """Return (cards, spread_type, error response)."""
+    if not data:
+        return None, None, JSONResponse({'error': 'No data provided'}, status_code=400)
+    cards = data.get('cards', [])
+    spread_type = data.get('spreadType', 1)
+    if not cards:
+        return None, None, JSONResponse({'error': 'No cards provided'}, status_code=400)
+    if check_spread and spread_type not in flask_backend.VALID_SPREAD_TYPES:
+        return None, None, JSONResponse({'error': 'Invalid spread type'}, status_code=400)
+    try:
+        cards = normalize_cards(cards)
+    except UnknownCard as e:
+        return None, None, JSONResponse({'error': str(e)}, status_code=400)
+    return cards, spread_type, None
+
+
+async def open_interpretation(cards, spread_type):
+    """
+    Admit the reading and return (async iterator of its text, ticket or None).
+
+    Raises QueueFullError before anything is streamed, like app.interpretation_stream.
+    """
+    # Dict lookups in the deck registry; not worth a thread hop
+    card_meanings = flask_backend.get_card_meanings(cards)
+    cache = flask_backend.interpretation_cache
+    if cache is not None:
+        # The shared generation is thread-based; admit and follow it from the thread pool
+        key = InterpretationCache.make_key(cards, spread_type, llm_service.model_name, PROMPT_VERSION)
+        cancel = CancelToken()
+        try:
+            source = await asyncio.to_thread(
+                cache.stream,
+                key,
+                lambda ticket: llm_service.stream_interpretation(cards, spread_type, card_meanings, ticket),
+                lambda: llm_service.admit(cards, cancel)
+            )
+        except asyncio.CancelledError:
+            # Give up the queue place the thread is still waiting in
+            cancel.cancel()
+            raise
+        # Followers of a shared generation never stop it, so nothing to count
+        return render_errors(iterate_in_threadpool(source)), None
+    ticket = await llm_service.aadmit(cards)
+    text_stream = llm_service.astream_interpretation(cards, spread_type, card_meanings, ticket)
+    return render_errors(text_stream, 'llm'), ticket
+
+
+async def open_resumable(cards, spread_type):
+    """
+    Start a resumable reading (app.start_resumable) and return (async
+    iterator of its text, stream id). The generation runs in a thread and
+    carries on if this client goes; resuming is served by the Flask app.
+    """
+    card_meanings = flask_backend.get_card_meanings(cards)
+    cancel = CancelToken()
+    try:
+        buffer = await asyncio.to_thread(flask_backend.start_resumable, cards, spread_type, card_meanings, cancel)
+    except asyncio.CancelledError:
+        cancel.cancel()
+        raise
+    return iterate_in_threadpool(buffer.generation.subscribe()), buffer.stream_id
+
+
+async def render_errors(text_stream, cancel_kind=None):
+    """
+    Pass text through, rendering a failure like LLMService does.
+
+    A stream closed or cancelled before its end is counted under cancel_kind
+    in tarot_cancelled_total (when given).
+    """
+    start = time.perf_counter()
+    try:
+        async for text in text_stream:
+            yield text
+    except Exception as e:
+        yield llm_service.error_message(e)
+    except (asyncio.CancelledError, GeneratorExit):
+        if cancel_kind is not None:
+            metrics.record_cancel(cancel_kind, time.perf_counter() - start)
+        raise
+    finally:
+        await text_stream.aclose()
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def unless_disconnected(receive, awaitable):
+    """
+    Await work while watching for the client to disconnect.
+
+    Raises:
+        Cancelled: The client left first; the work has been cancelled
+    """
+    work = asyncio.ensure_future(awaitable)
+    watch = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({work, watch}, return_when=FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        raise
+    finally:
+        watch.cancel()
+    if not work.done():
+        work.cancel()
+        await asyncio.gather(work, return_exceptions=True)
+        raise Cancelled("Client disconnected")
+    return work.result()
+
+
+class DisconnectAwareResponse(StreamingResponse):
+    """
+    StreamingResponse that stops producing as soon as the client disconnects.
+
+    Starlette only notices a departed client when a write fails, and leaves
+    the body iterator open; this one listens for http.disconnect throughout
+    and closes the iterator, which ends the Ollama stream or Piper request.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await unless_disconnected(receive, self.stream_response(send))
+        except (Cancelled, OSError):
+            pass
+        finally:
+            aclose = getattr(self.body_iterator, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+            if self.background is not None:
+                await self.background()
+
+
+def cancelled_response():
+    """Status for a request whose client left (nginx's 499); nobody reads it."""
+    return Response(status_code=499)
+
+
+def unavailable_response(reason):
+    """503 for a request that cannot be served here (for example a missing voice model)."""
+    return JSONResponse({'error': str(reason)}, status_code=503)
+
+
+class BufferResponse(Response):
+    """Response whose body is a memoryview into the precomputed store, sent without a copy."""
+
+    def render(self, content):
+        return content
+
+
+async def stored_text(view):
+    yield str(view, 'utf-8')
+
+
+def precomputed_response(view, media_type, headers=None):
+    headers = dict(headers or {}, **{'X-Precomputed': '1'})
+    return BufferResponse(view, media_type=media_type, headers=headers)
+
+
+def busy_response(e):
+    return JSONResponse(
+        {'error': str(e), 'retryAfter': e.retry_after},
+        status_code=429,
+        headers={'Retry-After': str(e.retry_after)}
+    )
+
+
+async def health_check(request):
+    return JSONResponse({
+        'status': 'healthy',
+        'message': 'Tarot interpretation service is running'
+    })
+
+
+async def liveness(request):
+    return JSONResponse(warmup.liveness())
+
+
+async def readiness(request):
+    """Flask-side readiness (model primed, voice warm) plus the async Piper pool."""
+    ready, report = await asyncio.to_thread(warmup.readiness)
+    pool_ready = tts_pool_warmup is not None and (await tts_pool.health_check())['healthy'] > 0
+    report['asgi_tts'] = {'ready': pool_ready, 'warmup_ms': tts_pool_warmup}
+    ready = ready and pool_ready
+    report['status'] = 'ready' if ready else 'warming'
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+
+async def interpret_reading(request):
+    data = await read_json(request)
+    cards, spread_type, error = validate_reading(data)
+    if error is not None:
+        return error
+    stored = precomputed.reading(cards, spread_type) if precomputed is not None else None
+    if stored is not None:
+        return JSONResponse({
+            'interpretation': str(stored, 'utf-8'),
+            'cardCount': len(cards),
+            'spreadType': spread_type
+        }, headers={'X-Precomputed': '1'})
+    async def generate():
+        text_stream, _ = await open_interpretation(cards, spread_type)
+        try:
+            return ''.join([text async for text in text_stream])
+        finally:
+            await text_stream.aclose()
+
+    try:
+        interpretation = await unless_disconnected(request.receive, generate())
+        return JSONResponse({
+            'interpretation': interpretation,
+            'cardCount': len(cards),
+            'spreadType': spread_type
+        })
+    except QueueFullError as e:
+        return busy_response(e)
+    except Cancelled:
+        return cancelled_response()
+    except Exception as e:
+        return JSONResponse({'error': f'Error processing request: {str(e)}'}, status_code=500)
+
+
+async def interpret_reading_stream(request):
+    data = await read_json(request)
+    cards, spread_type, error = validate_reading(data, check_spread=False)
+    if error is not None:
+        return error
+    try:
+        framing = negotiate_framing(data.get('framing'), request.headers.get('accept'))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    stored = precomputed.reading(cards, spread_type) if precomputed is not None else None
+    if stored is not None:
+        if framing is None:
+            return precomputed_response(stored, 'text/plain')
+        labels = template_for(spread_type, len(cards)).labels
+        return StreamingResponse(
+            aiter_events(stored_text(stored), cards, labels, framing),
+            media_type=FRAMINGS[framing],
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-Precomputed': '1'}
+        )
+    headers = {}
+    try:
+        if data.get('resumable'):
+            text_stream, headers['X-Stream-Id'] = await unless_disconnected(
+                request.receive, open_resumable(cards, spread_type)
+            )
+            ticket = None
+        else:
+            text_stream, ticket = await unless_disconnected(request.receive, open_interpretation(cards, spread_type))
+    except QueueFullError as e:
+        return busy_response(e)
+    except Cancelled:
+        return cancelled_response()
+    except Exception as e:
+        return JSONResponse({'error': f'Error processing request: {str(e)}'}, status_code=500)
+    # The stream releases its ticket; the background task covers a client that
+    # disconnected before the stream was ever started
+    background = BackgroundTask(ticket.release) if ticket else None
+    if framing is not None:
+        labels = template_for(spread_type, len(cards)).labels
+        return DisconnectAwareResponse(
+            aiter_events(text_stream, cards, labels, framing),
+            media_type=FRAMINGS[framing],
+            headers=dict(headers, **{'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}),
+            background=background
+        )
+    return DisconnectAwareResponse(text_stream, media_type='text/plain', headers=headers, background=background)
+
+
+async def cached_speech(key, text, rate):
+    """WAV for text from the audio cache, or time-stretched from a copy at another rate; None if neither."""
+    wav_data = await asyncio.to_thread(tts_cache.get, key)
+    if wav_data is None and flask_backend.TTS_TIME_STRETCH:
+        wav_data = await asyncio.to_thread(
+            stretch_from_copy, text, rate, flask_backend.TTS_SPEECH_RATE,
+            flask_backend.TTS_MODEL_PATH, tts_cache, flask_backend.stretch_source
+        )
+    return wav_data
+
+
+async def synthesize_pcm(text, rate):
+    """
+    Complete WAV for text, through the shared audio cache. Only the async
+    pool runs Piper here; the Flask TTSService (and its pool) is not built.
+    """
+    key = tts_cache.make_key(text, flask_backend.TTS_MODEL_PATH, rate)
+    wav_data = await cached_speech(key, text, rate)
+    if wav_data is None:
+        start = time.perf_counter()
+        shards = split_shards(
+            text, min(flask_backend.TTS_SHARD_WORKERS, tts_pool.size), flask_backend.TTS_SHARD_MIN_CHARS
+        )
+        if len(shards) > 1:
+            # Each shard takes its own pooled worker; the PCM is joined in text order
+            tasks = [asyncio.ensure_future(tts_pool.synthesize(shard, rate)) for shard in shards]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # One shard failed (or the client left): stop its siblings too
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            chunks = [chunk for result in results for chunk in result]
+        else:
+            chunks = await tts_pool.synthesize(text, rate)
+        data_size = sum(len(chunk) for chunk in chunks)
+        metrics.record_synthesis(time.perf_counter() - start, data_size / (SAMPLE_RATE * SAMPLE_WIDTH))
+        wav_data = b''.join([audio_codecs.wav_header(data_size, SAMPLE_RATE), *chunks])
+        await asyncio.to_thread(tts_cache.put, key, wav_data)
+    return wav_data
+
+
+async def stream_speech(text, rate, audio_format):
+    """
+    Streamed WAV (or G.711) as Piper produces it, mirroring TTSService.synthesize_stream:
+    a cached or time-stretched copy is sent at once, and new audio is cached
+    when it finishes (unless it grew past STREAM_CACHE_LIMIT).
+    """
+    encoder = None if audio_format == 'wav' else audio_codecs.StreamEncoder(audio_format)
+    key = tts_cache.make_key(text, flask_backend.TTS_MODEL_PATH, rate)
+    wav_data = await cached_speech(key, text, rate)
+    if wav_data is not None:
+        if encoder is None:
+            yield wav_data
+        else:
+            yield encoder.header()
+            yield encoder.encode(wav_data[WAV_HEADER_SIZE:])
+        return
+
+    yield encoder.header() if encoder else audio_codecs.wav_header(0xFFFFFFFF, SAMPLE_RATE)
+    kept = []
+    kept_size = 0
+    pcm_size = 0
+    start = time.perf_counter()
+    pcm = tts_pool.stream(text, rate)
+    try:
+        async for chunk in pcm:
+            if not pcm_size:
+                metrics.record('tts_first_audio', time.perf_counter() - start)
+            pcm_size += len(chunk)
+            if kept is not None:
+                kept.append(chunk)
+                kept_size += len(chunk)
+                if kept_size > STREAM_CACHE_LIMIT:
+                    kept = None
+            yield encoder.encode(chunk) if encoder else chunk
+    finally:
+        # Closing now (not whenever the generator is collected) frees the worker
+        await pcm.aclose()
+
+    metrics.record_synthesis(time.perf_counter() - start, pcm_size / (SAMPLE_RATE * SAMPLE_WIDTH))
+    if kept is not None:
+        wav_data = b''.join([audio_codecs.wav_header(kept_size, SAMPLE_RATE), *kept])
+        await asyncio.to_thread(tts_cache.put, key, wav_data)
+
+
+async def text_to_speech(request):
+    data = await read_json(request)
+    if not data:
+        return JSONResponse({'error': 'No data provided'}, status_code=400)
+
+    text = data.get('text', '')
+    rate = data.get('rate')
+    if rate is None:
+        rate = flask_backend.TTS_SPEECH_RATE
+
+    if not text or len(text.strip()) == 0:
+        return JSONResponse({'error': 'No text provided'}, status_code=400)
+
+    try:
+        audio_format = audio_codecs.negotiate(data.get('format'), request.headers.get('accept'))
+        sample_rate = audio_codecs.validate_rate(data.get('sampleRate'))
+        if data.get('stream') and audio_format != 'wav':
+            audio_codecs.StreamEncoder(audio_format)
+            if sample_rate:
+                raise UnsupportedFormat("Resampling is not available for streamed audio")
+    except UnsupportedFormat as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+    headers = {
+        'Content-Disposition': 'inline; filename=speech.wav',
+        'X-Audio-Format': audio_format
+    }
+
+    stored = precomputed.audio(text.strip(), rate, audio_format, sample_rate) if precomputed is not None else None
+    if stored is not None:
+        headers['X-Payload-Ratio'] = str(audio_codecs.nominal_ratio(audio_format, sample_rate))
+        if audio_format == 'opus':
+            headers['Content-Disposition'] = 'inline; filename=speech.ogg'
+        return precomputed_response(stored, audio_codecs.FORMATS[audio_format], headers)
+    if not os.path.exists(flask_backend.TTS_MODEL_PATH):
+        # Stored clips above are still served without a voice
+        return unavailable_response(f"TTS unavailable: Voice model not found: {flask_backend.TTS_MODEL_PATH}")
+
+    try:
+        if data.get('stream'):
+            headers['X-Payload-Ratio'] = str(audio_codecs.nominal_ratio(audio_format))
+            return DisconnectAwareResponse(
+                stream_speech(text, rate, audio_format),
+                media_type=audio_codecs.FORMATS[audio_format],
+                headers=headers
+            )
+
+        wav_data = await unless_disconnected(request.receive, synthesize_pcm(text, rate))
+        audio_data, mimetype, _, ratio = audio_codecs.encode_segment(wav_data, audio_format, sample_rate)
+        headers['X-Payload-Ratio'] = str(ratio)
+        if mimetype != 'audio/wav':
+            headers['Content-Disposition'] = 'inline; filename=speech.ogg'
+        return Response(audio_data, media_type=mimetype, headers=headers)
+    except Cancelled:
+        return cancelled_response()
+    except Exception as e:
+        return JSONResponse({'error': f'Error generating speech: {str(e)}'}, status_code=500)
+
+
+async def warm_tts_pool():
+    global tts_pool_warmup
+    try:
+        timings = await tts_pool.warm_up(WARMUP_TEXT, flask_backend.TTS_SPEECH_RATE)
+        tts_pool_warmup = [round(ms, 1) for ms in timings]
+    except Exception as e:
+        print(f"Warning: async TTS warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await tts_pool.start()
+    warm_task = asyncio.create_task(warm_tts_pool())
+    try:
+        yield
+    finally:
+        warm_task.cancel()
+        await tts_pool.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/health/live', liveness, methods=['GET']),
+        Route('/api/health/ready', readiness, methods=['GET']),
+        Route('/api/interpret', interpret_reading, methods=['POST']),
+        Route('/api/interpret_stream', interpret_reading_stream, methods=['POST']),
+        Route('/api/tts', text_to_speech, methods=['POST']),
+        # Everything else is handled by the Flask app
+        Mount('/', app=WSGIMiddleware(flask_backend.app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("Starting Tarot Interpretation Service (asyncio mode)...")
+    print("\nService will be available at http://localhost:5000")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,300 @@
+"""
+Compact audio encodings for synthesized speech
+Converts Piper's 16-bit 22.05 kHz WAV into smaller payloads (G.711 μ-law or
+A-law, lower sample rates, or Opus when an encoder is installed). All
+sample processing is vectorized with NumPy.
+"""
+
+import functools
+import shutil
+import struct
+import subprocess
+
+import numpy as np
+
+from tts_service import SAMPLE_RATE, SAMPLE_WIDTH, WAV_HEADER_SIZE, wav_duration
+
+# Requested format -> response mimetype
+FORMATS = {
+    'wav': 'audio/wav',    # 16-bit PCM, as produced by Piper
+    'ulaw': 'audio/wav',   # WAV container holding 8-bit G.711 μ-law
+    'alaw': 'audio/wav',   # WAV container holding 8-bit G.711 A-law
+    'opus': 'audio/ogg',   # Ogg Opus, needs ffmpeg or opusenc on PATH
+}
+
+# Accept header values understood by negotiate(), in preference order
+ACCEPT_FORMATS = [
+    ('audio/ogg', 'opus'),
+    ('audio/opus', 'opus'),
+    ('audio/basic', 'ulaw'),
+    ('audio/wav', 'wav'),
+]
+
+SUPPORTED_RATES = (8000, 11025, 16000, 22050)
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_ALAW = 6
+_WAVE_FORMAT_MULAW = 7
+
+_OPUS_BITRATE = '24k'
+
+
+class UnsupportedFormat(ValueError):
+    """Raised for an unknown format, rate, or an encoder that is not installed."""
+
+
+# Upper bound of each G.711 segment (CCITT reference encoder)
+_ULAW_SEGMENT_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_ALAW_SEGMENT_END = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def pcm_from_wav(wav_data):
+    """View the PCM samples of a Piper WAV as int16 without copying."""
+    return np.frombuffer(memoryview(wav_data)[WAV_HEADER_SIZE:], dtype='<i2')
+
+
+def ulaw_encode(samples):
+    """Encode int16 samples as G.711 μ-law bytes."""
+    value = samples.astype(np.int32) >> 2
+    mask = np.where(value < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(value), 8159) + 0x21
+    segment = np.searchsorted(_ULAW_SEGMENT_END, value)
+    encoded = (segment << 4) | ((value >> (segment + 1)) & 0x0F)
+    encoded = np.where(segment >= 8, 0x7F, encoded)
+    return (encoded ^ mask).astype(np.uint8)
+
+
+def alaw_encode(samples):
+    """Encode int16 samples as G.711 A-law bytes."""
+    value = samples.astype(np.int32) >> 3
+    negative = value < 0
+    mask = np.where(negative, 0x55, 0xD5)
+    value = np.where(negative, -value - 1, value)
+    segment = np.searchsorted(_ALAW_SEGMENT_END, value)
+    shift = np.maximum(segment, 1)
+    encoded = (segment << 4) | ((value >> shift) & 0x0F)
+    encoded = np.where(segment >= 8, 0x7F, encoded)
+    return (encoded ^ mask).astype(np.uint8)
+
+
+def resample(samples, src_rate, dst_rate, taps=31):
+    """
+    Resample int16 samples to dst_rate.
+
+    Downsampling applies a windowed-sinc low-pass at the new Nyquist
+    frequency before interpolating, so it does not alias.
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    x = samples.astype(np.float32)
+    if dst_rate < src_rate:
+        cutoff = dst_rate / src_rate / 2
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+        x = np.convolve(x, (kernel / kernel.sum()).astype(np.float32), mode='same')
+    count = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(count) * (src_rate / dst_rate)
+    y = np.interp(positions, np.arange(len(x)), x)
+    return np.clip(np.rint(y), -32768, 32767).astype('<i2')
+
+
+def wav_header(data_size, sample_rate, format_tag=_WAVE_FORMAT_PCM, bits=16):
+    """
+    WAV header for mono audio in the given format.
+
+    Non-PCM formats get the 18-byte fmt chunk and the fact chunk the spec requires.
+    """
+    block_align = bits // 8
+    if format_tag == _WAVE_FORMAT_PCM:
+        fmt = struct.pack('<HHIIHH', format_tag, 1, sample_rate,
+                          sample_rate * block_align, block_align, bits)
+        extra = b''
+    else:
+        fmt = struct.pack('<HHIIHHH', format_tag, 1, sample_rate,
+                          sample_rate * block_align, block_align, bits, 0)
+        extra = b'fact' + struct.pack('<II', 4, data_size // block_align)
+    riff_size = 4 + (8 + len(fmt)) + len(extra) + (8 + data_size)
+    return (b'RIFF' + struct.pack('<I', min(riff_size, 0xFFFFFFFF)) + b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + extra
+            + b'data' + struct.pack('<I', min(data_size, 0xFFFFFFFF)))
+
+
+@functools.lru_cache(maxsize=None)
+def opus_encoder():
+    """
+    Command line for a local Opus encoder reading WAV on stdin, or None.
+    Looked up once per process; install an encoder before starting the server.
+    """
+    if shutil.which('ffmpeg'):
+        return ('ffmpeg', '-loglevel', 'error', '-f', 'wav', '-i', 'pipe:0',
+                '-c:a', 'libopus', '-b:a', _OPUS_BITRATE, '-f', 'ogg', 'pipe:1')
+    if shutil.which('opusenc'):
+        return ('opusenc', '--quiet', '--bitrate', _OPUS_BITRATE.rstrip('k'), '-', '-')
+    return None
+
+
+def available_formats():
+    """Formats that can be produced on this machine."""
+    return [fmt for fmt in FORMATS if fmt != 'opus' or opus_encoder()]
+
+
+def negotiate(requested=None, accept=None):
+    """
+    Pick the output format from an explicit request or an Accept header.
+
+    Args:
+        requested: Format name from the request body, if any
+        accept: Value of the Accept header, if any
+
+    Returns:
+        str: Format name (defaults to 'wav')
+    """
+    if requested:
+        requested = requested.lower()
+        if requested not in FORMATS:
+            raise UnsupportedFormat(f"Unsupported audio format: {requested}")
+        if requested not in available_formats():
+            raise UnsupportedFormat(f"No local encoder for audio format: {requested}")
+        return requested
+    if accept:
+        available = available_formats()
+        for mimetype, fmt in ACCEPT_FORMATS:
+            if mimetype in accept and fmt in available:
+                return fmt
+    return 'wav'
+
+
+def validate_rate(sample_rate):
+    if sample_rate is None:
+        return None
+    if sample_rate not in SUPPORTED_RATES:
+        raise UnsupportedFormat(f"Unsupported sample rate: {sample_rate}")
+    return sample_rate
+
+
+def encode(wav_data, fmt='wav', sample_rate=None):
+    """
+    Re-encode a Piper WAV.
+
+    Args:
+        wav_data: WAV bytes from TTSService
+        fmt: One of FORMATS
+        sample_rate: Optional output rate from SUPPORTED_RATES
+
+    Returns:
+        tuple: (encoded bytes, mimetype)
+    """
+    rate = sample_rate or SAMPLE_RATE
+    if fmt == 'wav' and rate == SAMPLE_RATE:
+        return wav_data, FORMATS['wav']
+
+    samples = resample(pcm_from_wav(wav_data), SAMPLE_RATE, rate)
+
+    if fmt == 'wav':
+        payload = samples.tobytes()
+        header = wav_header(len(payload), rate)
+    elif fmt in ('ulaw', 'alaw'):
+        codec = ulaw_encode if fmt == 'ulaw' else alaw_encode
+        tag = _WAVE_FORMAT_MULAW if fmt == 'ulaw' else _WAVE_FORMAT_ALAW
+        payload = codec(samples).tobytes()
+        header = wav_header(len(payload), rate, tag, bits=8)
+    elif fmt == 'opus':
+        return _encode_opus(samples, rate), FORMATS['opus']
+    else:
+        raise UnsupportedFormat(f"Unsupported audio format: {fmt}")
+
+    return b''.join([header, payload]), FORMATS[fmt]
+
+
+def _encode_opus(samples, rate):
+    cmd = opus_encoder()
+    if cmd is None:
+        raise UnsupportedFormat("No local encoder for audio format: opus")
+    pcm = samples.tobytes()
+    result = subprocess.run(
+        cmd,
+        input=wav_header(len(pcm), rate) + pcm,
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Opus encoding failed: {result.stderr.decode('utf-8', 'replace')}")
+    return result.stdout
+
+
+class StreamEncoder:
+    """
+    Chunk-by-chunk G.711 encoder for streamed WAV output.
+
+    Only ulaw/alaw at the native rate can be streamed: they are stateless
+    per sample, so chunks can be encoded as they arrive.
+    """
+
+    def __init__(self, fmt):
+        if fmt not in ('ulaw', 'alaw'):
+            raise UnsupportedFormat(f"Audio format cannot be streamed: {fmt}")
+        self.codec = ulaw_encode if fmt == 'ulaw' else alaw_encode
+        self.tag = _WAVE_FORMAT_MULAW if fmt == 'ulaw' else _WAVE_FORMAT_ALAW
+        self._carry = b''
+
+    def header(self):
+        return wav_header(0xFFFFFFFF, SAMPLE_RATE, self.tag, bits=8)
+
+    def encode(self, pcm_chunk):
+        """Encode one raw PCM chunk, carrying an odd trailing byte to the next."""
+        if self._carry:
+            pcm_chunk = self._carry + pcm_chunk
+        usable = len(pcm_chunk) & ~1
+        self._carry = pcm_chunk[usable:]
+        return self.codec(np.frombuffer(pcm_chunk, dtype='<i2', count=usable // 2)).tobytes()
+
+
+def encode_stream(wav_chunks, fmt):
+    """
+    Re-encode a streamed WAV (see TTSService.synthesize_stream) chunk by chunk.
+
+    The original 44-byte header is dropped and replaced by one for fmt.
+    """
+    encoder = StreamEncoder(fmt)
+    yield encoder.header()
+    skip = WAV_HEADER_SIZE
+    for chunk in wav_chunks:
+        if skip:
+            if len(chunk) <= skip:
+                skip -= len(chunk)
+                continue
+            chunk = chunk[skip:]
+            skip = 0
+        encoded = encoder.encode(chunk)
+        if encoded:
+            yield encoded
+
+
+def encode_segment(wav_data, fmt='wav', sample_rate=None):
+    """
+    Encode one synthesized segment and describe it.
+
+    Returns:
+        tuple: (encoded bytes, mimetype, duration in seconds, payload ratio vs WAV)
+    """
+    encoded, mimetype = encode(wav_data, fmt, sample_rate)
+    return encoded, mimetype, wav_duration(wav_data), payload_ratio(len(encoded), len(wav_data))
+
+
+def payload_ratio(encoded_size, wav_size):
+    """Encoded size as a fraction of the raw Piper WAV."""
+    return round(encoded_size / wav_size, 4) if wav_size else 1.0
+
+
+def nominal_ratio(fmt, sample_rate=None):
+    """
+    Expected payload ratio for a response whose final size is unknown.
+    For Opus this is the target bitrate against 16-bit PCM at Piper's rate
+    (Ogg framing adds a few percent; the sample rate does not matter).
+    """
+    if fmt == 'opus':
+        bits_per_second = int(_OPUS_BITRATE.rstrip('k')) * 1000
+        return round((bits_per_second / 8) / (SAMPLE_RATE * SAMPLE_WIDTH), 4)
+    rate = sample_rate or SAMPLE_RATE
+    bytes_per_sample = 1 if fmt in ('ulaw', 'alaw') else SAMPLE_WIDTH
+    return round((rate * bytes_per_sample) / (SAMPLE_RATE * SAMPLE_WIDTH), 4)
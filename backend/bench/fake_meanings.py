@@ -0,0 +1,180 @@
+"""
+Stand-in card meanings site for the meanings refresh.
+
+Serves a page for every card at /meanings/{slug} ("the-fool",
+"ace-of-cups") with "Upright" and "Reversed" sections, after a fixed
+latency. Pages carry an ETag and Last-Modified and answer conditional
+requests with 304 until the content version changes. GET /stats reports
+how the site was used: requests, 304s, the most requests in flight at
+once and the shortest gap between two requests.
+
+    python bench/fake_meanings.py --port 8766 --latency-ms 50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck import DECK  # noqa: E402
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{name} Tarot Card Meaning</title></head>
+<body>
+<nav><a href="/">All cards</a></nav>
+<h1>{name}</h1>
+<p>Revision {version} of our guide to {name}.</p>
+<h2>{name} Upright Meaning</h2>
+<p>{upright}</p>
+<p>Further notes on the upright card.</p>
+<h2>{name} Reversed Meaning</h2>
+<p>{reversed}</p>
+</body></html>
+"""
+
+
+class FakeMeanings:
+    """Page content and usage counters shared by all request handlers."""
+
+    def __init__(self, latency_ms=50.0, version=1):
+        self.latency_ms = latency_ms
+        self.version = version
+        self.modified = time.time()
+        self.pages = {}
+        for card in DECK:
+            slug = card.name.lower().replace(' ', '-')
+            self.pages[slug] = card
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.min_gap_ms = None
+        self._last = None
+
+    def bump(self):
+        """Change every page (a new content version)."""
+        with self._lock:
+            self.version += 1
+            self.modified = time.time()
+
+    def render(self, card):
+        meanings = card.meanings
+        body = PAGE.format(
+            name=card.name, version=self.version,
+            upright=f"{meanings['upright']} (rev. {self.version})",
+            reversed=f"{meanings['reversed']} (rev. {self.version})"
+        ).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        return body, etag
+
+    def started(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last is not None:
+                gap = (now - self._last) * 1000
+                self.min_gap_ms = gap if self.min_gap_ms is None else min(self.min_gap_ms, gap)
+            self._last = now
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, not_modified):
+        with self._lock:
+            self.in_flight -= 1
+            if not_modified:
+                self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'not_modified': self.not_modified,
+                'max_in_flight': self.max_in_flight,
+                'min_gap_ms': round(self.min_gap_ms, 2) if self.min_gap_ms is not None else None,
+                'version': self.version
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = self.not_modified = self.max_in_flight = 0
+            self.min_gap_ms = self._last = None
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=b'', headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(200, json.dumps(fake.stats()).encode(), [('Content-Type', 'application/json')])
+                return
+            slug = self.path.rstrip('/').rsplit('/', 1)[-1]
+            card = fake.pages.get(slug) if self.path.startswith('/meanings/') else None
+            fake.started()
+            not_modified = False
+            try:
+                time.sleep(fake.latency_ms / 1000)
+                if card is None:
+                    self._send(404, b'Not found')
+                    return
+                body, etag = fake.render(card)
+                modified = formatdate(fake.modified, usegmt=True)
+                if self.headers.get('If-None-Match') == etag:
+                    not_modified = True
+                    self._send(304, headers=[('ETag', etag), ('Last-Modified', modified)])
+                    return
+                self._send(200, body, [('Content-Type', 'text/html; charset=utf-8'),
+                                       ('ETag', etag), ('Last-Modified', modified)])
+            finally:
+                fake.finished(not_modified)
+
+    return Handler
+
+
+def make_server(fake, host='127.0.0.1', port=8766):
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    return server
+
+
+def serve(fake, host='127.0.0.1', port=8766):
+    """Start the server in a daemon thread and return it."""
+    server = make_server(fake, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in card meanings site")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = make_server(FakeMeanings(args.latency_ms), args.host, args.port)
+    print(f"Fake meanings site on http://{args.host}:{args.port}/meanings/{{slug}}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Stand-in Ollama server for benchmarks.
+
+Implements the parts of the Ollama HTTP API the backend uses (/api/chat,
+/api/generate, /api/ps, /api/tags) and streams canned tokens at a fixed
+rate after a fixed first-token latency, reporting the same eval counters
+a real server does. Prompt evaluation is modelled as a per-token cost for
+the part of the prompt that differs from the previous request, so prompt
+caching shows up in prompt_eval_duration.
+
+    python bench/fake_ollama.py --port 11435 --tokens-per-second 40 --first-token-ms 150
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "The cards suggest a season of change is gathering around you. "
+    "What might you be ready to release, and what could you welcome in its place? "
+    "Perhaps the path ahead is asking for patience rather than certainty. "
+    "Could the challenge you sense be an invitation to grow? "
+).split()
+
+
+class FakeOllama:
+    """Token timing model shared by all request handlers."""
+
+    def __init__(self, tokens_per_second=40.0, first_token_ms=150.0, tokens=120,
+                 prompt_ms_per_token=0.5, load_ms=0.0):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_ms = first_token_ms
+        self.tokens = tokens
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.load_ms = load_ms
+        self.loaded = set()
+        self.requests = 0
+        self._last_prompt = ''
+        self._lock = threading.Lock()
+
+    def prompt_eval(self, model, prompt):
+        """(prompt tokens, uncached tokens, load seconds) for a request."""
+        with self._lock:
+            self.requests += 1
+            shared = 0
+            for a, b in zip(prompt, self._last_prompt):
+                if a != b:
+                    break
+                shared += 1
+            self._last_prompt = prompt
+            load = 0.0 if model in self.loaded else self.load_ms / 1000
+            self.loaded.add(model)
+        tokens = max(1, len(prompt) // 4)
+        uncached = max(1, (len(prompt) - shared) // 4)
+        return tokens, uncached, load
+
+    def generate(self, model, prompt, num_predict=None):
+        """Yield (text, final stats or None), sleeping to match the configured rates."""
+        start = time.perf_counter()
+        prompt_tokens, uncached, load = self.prompt_eval(model, prompt)
+        prompt_s = uncached * self.prompt_ms_per_token / 1000
+        time.sleep(load + max(self.first_token_ms / 1000, prompt_s))
+        count = self.tokens if num_predict is None or num_predict < 0 else min(num_predict, self.tokens)
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second else 0
+        eval_start = time.perf_counter()
+        for i in range(count):
+            if i:
+                time.sleep(interval)
+            yield WORDS[i % len(WORDS)] + ' ', None
+        eval_s = time.perf_counter() - eval_start + interval
+        yield '', {
+            'total_duration': int((time.perf_counter() - start) * 1e9),
+            'load_duration': int(load * 1e9),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(prompt_s * 1e9),
+            'eval_count': count,
+            'eval_duration': int(eval_s * 1e9)
+        }
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, obj, status=200):
+            body = json.dumps(obj).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _chunk(self, obj):
+            data = (json.dumps(obj) + '\n').encode('utf-8')
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == '/api/ps':
+                self._json({'models': [{'name': m, 'model': m} for m in sorted(fake.loaded)]})
+            elif self.path == '/api/tags':
+                self._json({'models': [{'name': m, 'model': m} for m in sorted(fake.loaded)]})
+            else:
+                self._json({'error': 'not found'}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            model = body.get('model', '')
+            if self.path == '/api/chat':
+                prompt = ''.join(m.get('content', '') for m in body.get('messages') or [])
+                chat = True
+            elif self.path == '/api/generate':
+                prompt = body.get('prompt', '')
+                chat = False
+            else:
+                self._json({'error': 'not found'}, 404)
+                return
+
+            if body.get('keep_alive') == 0:
+                fake.loaded.discard(model)
+                self._json({'model': model, 'done': True, 'response': ''})
+                return
+
+            num_predict = (body.get('options') or {}).get('num_predict')
+            stream = body.get('stream', True)
+            base = {'model': model, 'created_at': '2024-01-01T00:00:00Z'}
+
+            def message(text, done, stats=None):
+                payload = dict(base, done=done, **(stats or {}))
+                if chat:
+                    payload['message'] = {'role': 'assistant', 'content': text}
+                else:
+                    payload['response'] = text
+                return payload
+
+            if not stream:
+                parts = []
+                stats = None
+                for text, stats in fake.generate(model, prompt, num_predict):
+                    parts.append(text)
+                self._json(message(''.join(parts), True, stats))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for text, stats in fake.generate(model, prompt, num_predict):
+                    self._chunk(message(text, stats is not None, stats))
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+
+def make_server(fake, host='127.0.0.1', port=11435):
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    return server
+
+
+def serve(fake, host='127.0.0.1', port=11435):
+    """Start the server in a daemon thread and return it."""
+    server = make_server(fake, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--tokens-per-second', type=float, default=40.0)
+    parser.add_argument('--first-token-ms', type=float, default=150.0)
+    parser.add_argument('--tokens', type=int, default=120)
+    parser.add_argument('--prompt-ms-per-token', type=float, default=0.5)
+    parser.add_argument('--load-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.tokens_per_second, args.first_token_ms, args.tokens,
+                      args.prompt_ms_per_token, args.load_ms)
+    server = make_server(fake, args.host, args.port)
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
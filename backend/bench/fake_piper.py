@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Stand-in `piper` executable for benchmarks.
+
+Accepts the piper CLI arguments TTSService uses (--model, --length-scale,
+--output-raw), reads text from stdin and writes 16-bit mono PCM at
+22.05 kHz to stdout. The audio lasts as long as the text would take to
+speak and is produced at a configurable real-time factor, in chunks:
+
+    FAKE_PIPER_RTF            synthesis time / audio time (default 0.1)
+    FAKE_PIPER_CHARS_PER_SEC  speaking speed before --length-scale (default 15)
+    FAKE_PIPER_STARTUP_MS     model load time per process (default 0)
+    FAKE_PIPER_CHUNK_MS       audio per output chunk (default 250)
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+SAMPLE_RATE = 22050
+
+
+def tone(samples, start):
+    """A quiet 220 Hz tone, so the output is valid, non-silent audio."""
+    step = 2 * math.pi * 220 / SAMPLE_RATE
+    return b''.join(
+        int(3000 * math.sin(step * (start + i))).to_bytes(2, 'little', signed=True)
+        for i in range(samples)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in piper executable")
+    parser.add_argument('--model', '-m')
+    parser.add_argument('--length-scale', '--length_scale', type=float, default=1.0)
+    parser.add_argument('--output-raw', '--output_raw', action='store_true')
+    args, _ = parser.parse_known_args()
+
+    rtf = float(os.environ.get('FAKE_PIPER_RTF', 0.1))
+    chars_per_sec = float(os.environ.get('FAKE_PIPER_CHARS_PER_SEC', 15))
+    chunk_ms = float(os.environ.get('FAKE_PIPER_CHUNK_MS', 250))
+    time.sleep(float(os.environ.get('FAKE_PIPER_STARTUP_MS', 0)) / 1000)
+
+    text = sys.stdin.buffer.read().decode('utf-8', 'replace').strip()
+    if not text:
+        return
+    audio_seconds = len(text) / chars_per_sec * args.length_scale
+    total = int(audio_seconds * SAMPLE_RATE)
+    chunk = max(1, int(SAMPLE_RATE * chunk_ms / 1000))
+    pattern = tone(chunk, 0)
+
+    out = sys.stdout.buffer
+    written = 0
+    while written < total:
+        samples = min(chunk, total - written)
+        time.sleep(samples / SAMPLE_RATE * rtf)
+        out.write(pattern[:samples * 2])
+        out.flush()
+        written += samples
+
+
+if __name__ == '__main__':
+    main()
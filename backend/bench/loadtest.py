@@ -0,0 +1,163 @@
+"""
+Concurrent load generator for the tarot backend.
+
+Opens many streaming readings at once and reports how many the server
+held open, time to first byte and total latency, as JSON.
+
+    python bench/loadtest.py --url http://localhost:5000 --concurrency 200 --requests 400
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+DECK_SAMPLE = [
+    "The Fool", "The Magician", "The High Priestess", "The Empress",
+    "The Lovers", "The Chariot", "Strength", "The Hermit", "Wheel of Fortune",
+    "Death", "The Star", "The Moon", "The Sun", "The World",
+    "Ace of Cups", "Three of Swords", "Ten of Pentacles", "Knight of Wands"
+]
+
+
+def make_reading(spread_type):
+    cards = random.sample(DECK_SAMPLE, spread_type) if spread_type <= len(DECK_SAMPLE) else []
+    return {
+        'cards': [{'card': name, 'reversed': random.random() < 0.3} for name in cards],
+        'spreadType': spread_type
+    }
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds for a list of seconds."""
+    return {
+        f'p{pct}': round(percentile(samples, pct) * 1000, 1) if samples else None
+        for pct in (50, 95, 99)
+    }
+
+
+class Result:
+    __slots__ = ('ok', 'status', 'ttfb', 'total', 'bytes', 'error')
+
+    def __init__(self):
+        self.ok = False
+        self.status = None
+        self.ttfb = None
+        self.total = None
+        self.bytes = 0
+        self.error = None
+
+
+def run_request(host, port, path, body, timeout):
+    """POST body to path and read the streamed response to the end."""
+    result = Result()
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('POST', path, body=json.dumps(body),
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        result.status = response.status
+        first = response.read1(65536) if hasattr(response, 'read1') else response.read(1)
+        result.ttfb = time.perf_counter() - start
+        result.bytes = len(first)
+        while True:
+            chunk = response.read1(65536) if hasattr(response, 'read1') else response.read(65536)
+            if not chunk:
+                break
+            result.bytes += len(chunk)
+        result.total = time.perf_counter() - start
+        result.ok = 200 <= response.status < 300
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+    finally:
+        conn.close()
+    return result
+
+
+def run_load(url, path, bodies, concurrency, timeout=120.0):
+    """
+    Send every body to path with at most `concurrency` requests in flight.
+
+    Returns:
+        dict: counts, wall time, throughput, TTFB/latency percentiles and
+        the peak number of requests the server had open at once
+    """
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+    pending = list(enumerate(bodies))
+    results = [None] * len(bodies)
+    lock = threading.Lock()
+    state = {'open': 0, 'peak': 0}
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                index, body = pending.pop()
+                state['open'] += 1
+                state['peak'] = max(state['peak'], state['open'])
+            results[index] = run_request(host, port, path, body, timeout)
+            with lock:
+                state['open'] -= 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ok = [r for r in results if r.ok]
+    errors = {}
+    for r in results:
+        if not r.ok:
+            reason = r.error or f'HTTP {r.status}'
+            errors[reason] = errors.get(reason, 0) + 1
+
+    return {
+        'path': path,
+        'requests': len(results),
+        'ok': len(ok),
+        'failed': len(results) - len(ok),
+        'errors': errors,
+        'concurrency': concurrency,
+        'peak_open': state['peak'],
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(len(ok) / wall, 2) if wall else None,
+        'bytes': sum(r.bytes for r in ok),
+        'ttfb_ms': summarize([r.ttfb for r in ok]),
+        'latency_ms': summarize([r.total for r in ok])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent streaming load test")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--path', default='/api/interpret_stream')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--spread', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    bodies = [make_reading(args.spread) for _ in range(args.requests)]
+    report = run_load(args.url, args.path, bodies, args.concurrency, args.timeout)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Prompt evaluation time for back-to-back readings, straight against Ollama.
+
+Runs readings one after another through LLMService and reports Ollama's
+prompt_eval_duration for each, as JSON. With the shared system prompt
+cached, every reading after the first should only evaluate its cards.
+
+    python bench/prompt_cache.py --readings 10 --spread 3
+    python bench/prompt_cache.py --cold     # unload the model first for a baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import ollama
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deck import normalize_cards  # noqa: E402
+from llm_service import LLMService, parse_keep_alive  # noqa: E402
+from loadtest import make_reading  # noqa: E402
+
+
+def run(service, readings, spread_type, prime):
+    """Return the prompt evaluation stats of each reading, in order."""
+    primed = service.prime() if prime else None
+    results = []
+    for _ in range(readings):
+        cards = normalize_cards(make_reading(spread_type)['cards'])
+        meanings = {
+            card['id']: {'upright': 'Growth and change', 'reversed': 'Delay and doubt'}
+            for card in cards
+        }
+        service.generate_interpretation(cards, spread_type, meanings)
+        results.append(service.last_prompt_eval())
+    return primed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back-to-back prompt evaluation benchmark")
+    parser.add_argument('--model', default='llama3.2:3b')
+    parser.add_argument('--readings', type=int, default=10)
+    parser.add_argument('--spread', type=int, default=3)
+    parser.add_argument('--keep-alive', default='30m')
+    parser.add_argument('--no-prime', action='store_true', help="Skip priming the system prompt")
+    parser.add_argument('--cold', action='store_true', help="Unload the model before starting")
+    args = parser.parse_args()
+
+    service = LLMService(model_name=args.model, keep_alive=parse_keep_alive(args.keep_alive))
+    if args.cold:
+        ollama.generate(model=args.model, prompt='', keep_alive=0)
+
+    primed, results = run(service, args.readings, args.spread, not args.no_prime)
+    evals = [r['prompt_eval_ms'] for r in results if r]
+    print(json.dumps({
+        'model': args.model,
+        'spread': args.spread,
+        'primed': primed,
+        'readings': results,
+        'first_prompt_eval_ms': round(evals[0], 1) if evals else None,
+        'rest_avg_prompt_eval_ms': round(sum(evals[1:]) / len(evals[1:]), 1) if len(evals) > 1 else None,
+        'summary': service.prompt_stats()
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Full refresh of the card meanings cache against the stand-in site.
+
+Runs three refreshes of all 78 cards into a scratch cache file, against
+bench/fake_meanings.py: a cold one, a revalidation (every page answers
+304), and one after the site changed every page. Reports each run's
+refresh stats next to what the site saw (requests, 304s, most requests in
+flight, shortest gap between requests), and checks the cache file holds
+the new meanings, as JSON.
+
+    python bench/refresh_meanings.py
+    python bench/refresh_meanings.py --workers 16 --rate 50 --latency-ms 100
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_meanings import FakeMeanings, serve  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meanings refresh against the stand-in site")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=40.0, help="Requests per second per host")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Stand-in page latency")
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    from deck import DECK
+    from tarot_scraper import MeaningRefresher, TarotScraper
+
+    fake = FakeMeanings(args.latency_ms)
+    server = serve(fake, port=args.port)
+    source = f'http://127.0.0.1:{args.port}/meanings/{{slug}}'
+
+    with tempfile.TemporaryDirectory(prefix='tarot-refresh-') as scratch:
+        cache_file = os.path.join(scratch, 'tarot_cache.json')
+        scraper = TarotScraper(cache_file=cache_file)
+        refresher = MeaningRefresher(source, workers=args.workers, rate=args.rate)
+
+        runs = {}
+        for name in ('cold', 'revalidate', 'changed'):
+            if name == 'changed':
+                fake.bump()
+            fake.reset_stats()
+            stats = scraper.refresh(refresher)
+            if not stats['errors']:
+                del stats['errors']
+            runs[name] = {'refresh': stats, 'site': fake.stats()}
+
+        with open(cache_file, encoding='utf-8') as f:
+            on_disk = json.load(f)
+        fool = scraper.get_card_meaning(DECK[0])
+
+    server.shutdown()
+    print(json.dumps({
+        'cards': len(DECK),
+        'workers': args.workers,
+        'rate_per_host': args.rate,
+        'latency_ms': args.latency_ms,
+        'runs': runs,
+        'cached_cards': sum(1 for card in DECK if card.key in on_disk),
+        'latest_meaning_served': fool['upright'].endswith(f"(rev. {fake.version})")
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
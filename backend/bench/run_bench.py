@@ -0,0 +1,232 @@
+"""
+Reproducible backend benchmark against local stand-ins for Ollama and Piper.
+
+Starts bench/fake_ollama.py in-process and the backend (Flask or ASGI) in a
+subprocess whose PATH resolves `piper` to bench/fake_piper.py, waits for
+/api/health/ready, then drives each scenario with bench/loadtest.py and
+prints one JSON report: p50/p95/p99 latency, time to first byte and
+throughput per scenario. No GPU, model or network needed.
+
+    python bench/run_bench.py
+    python bench/run_bench.py --scenarios interpret_stream --concurrency 16 --spreads 1:5,3:3,10:1
+    python bench/run_bench.py --server asgi --tokens-per-second 20 --output results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from fake_ollama import FakeOllama, serve
+from loadtest import make_reading, run_load
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+SCENARIOS = {
+    'interpret': '/api/interpret',
+    'interpret_stream': '/api/interpret_stream',
+    'tts': '/api/tts'
+}
+
+SENTENCES = [
+    "The cards reveal a path that is still unfolding.",
+    "What might the Tower be asking you to let go of?",
+    "Perhaps the coming weeks hold a quiet turning point.",
+    "Could patience be the gift hidden in this reading?",
+    "The Star suggests that hope is closer than it seems.",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(spec):
+    """'1:5,3:3,10:1' -> [(1, 5.0), (3, 3.0), (10, 1.0)]"""
+    mix = []
+    for part in spec.split(','):
+        spread, _, weight = part.partition(':')
+        mix.append((int(spread), float(weight or 1)))
+    return mix
+
+
+def make_bodies(scenario, count, mix, rng):
+    spreads = [spread for spread, _ in mix]
+    weights = [weight for _, weight in mix]
+    if scenario == 'tts':
+        # Unique text per request, so the audio cache never answers for Piper
+        return [
+            {'text': f"Reading {i}. " + ' '.join(rng.sample(SENTENCES, rng.randint(1, 3))), 'rate': 1.0}
+            for i in range(count)
+        ]
+    return [make_reading(rng.choices(spreads, weights)[0]) for _ in range(count)]
+
+
+def make_sandbox(root):
+    """Working directory with a placeholder voice and a `piper` that runs the stand-in."""
+    voices = os.path.join(root, 'voices')
+    os.makedirs(voices)
+    open(os.path.join(voices, 'ru_RU-irina-medium.onnx'), 'wb').close()
+    bin_dir = os.path.join(root, 'bin')
+    os.makedirs(bin_dir)
+    piper = os.path.join(bin_dir, 'piper')
+    with open(piper, 'w') as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(BENCH_DIR, "fake_piper.py")}" "$@"\n')
+    os.chmod(piper, 0o755)
+    return bin_dir
+
+
+def start_backend(server, port, cwd, env, log):
+    if server == 'asgi':
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi_app:app',
+               '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning']
+    else:
+        cmd = [sys.executable, '-c',
+               f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b'null')
+
+
+def wait_ready(url, proc, log_path, timeout):
+    """Seconds until /api/health/ready answered 200."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if proc.poll() is not None:
+            with open(log_path, errors='replace') as f:
+                raise RuntimeError(f"Backend exited:\n{f.read()[-2000:]}")
+        try:
+            status, _ = get_json(url + '/api/health/ready')
+            if status == 200:
+                return time.perf_counter() - start
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Backend did not become ready in time")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend benchmark with fake Ollama and Piper")
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="Comma-separated: " + ', '.join(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=40, help="Requests per scenario")
+    parser.add_argument('--spreads', default='1:4,3:4,6:1,10:1', help="Spread mix as size:weight")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    # Fake Ollama
+    parser.add_argument('--tokens-per-second', type=float, default=40.0)
+    parser.add_argument('--first-token-ms', type=float, default=150.0)
+    parser.add_argument('--tokens', type=int, default=120)
+    # Fake Piper
+    parser.add_argument('--piper-rtf', type=float, default=0.1)
+    parser.add_argument('--piper-startup-ms', type=float, default=0.0)
+    # Backend
+    parser.add_argument('--llm-concurrency', type=int, default=2)
+    parser.add_argument('--tts-workers', type=int, default=2)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra environment for the backend (repeatable)")
+    parser.add_argument('--output', help="Write the report here instead of stdout")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    mix = parse_mix(args.spreads)
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    fake = FakeOllama(args.tokens_per_second, args.first_token_ms, args.tokens)
+    ollama_server = serve(fake, port=free_port())
+    ollama_url = f'http://127.0.0.1:{ollama_server.server_address[1]}'
+
+    with tempfile.TemporaryDirectory(prefix='tarot-bench-') as sandbox:
+        bin_dir = make_sandbox(sandbox)
+        env = dict(os.environ)
+        env.update({
+            'PATH': bin_dir + os.pathsep + env.get('PATH', ''),
+            'PYTHONPATH': BACKEND_DIR,
+            'OLLAMA_HOST': ollama_url,
+            'PIPER_WORKER_ENGINE': 'cli',
+            'FAKE_PIPER_RTF': str(args.piper_rtf),
+            'FAKE_PIPER_STARTUP_MS': str(args.piper_startup_ms),
+            'TTS_WORKERS': str(args.tts_workers),
+            'ASGI_TTS_WORKERS': str(args.tts_workers),
+            'TTS_CACHE_DIR': '',
+            'LLM_MAX_CONCURRENT': str(args.llm_concurrency),
+            'LLM_MAX_QUEUE': str(max(32, args.requests)),
+            'WARMUP': '1'
+        })
+        for item in args.env:
+            key, _, value = item.partition('=')
+            env[key] = value
+
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        log_path = os.path.join(sandbox, 'backend.log')
+        log = open(log_path, 'wb')
+        proc = start_backend(args.server, port, sandbox, env, log)
+        try:
+            ready_s = wait_ready(url, proc, log_path, args.timeout)
+            results = {}
+            for name in scenarios:
+                bodies = make_bodies(name, args.requests, mix, rng)
+                results[name] = run_load(url, SCENARIOS[name], bodies, args.concurrency, args.timeout)
+            _, scheduler = get_json(url + '/api/scheduler')
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            log.close()
+        ollama_server.shutdown()
+
+    report = {
+        'config': {
+            'server': args.server,
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'spreads': dict((str(spread), weight) for spread, weight in mix),
+            'fake_ollama': {
+                'tokens_per_second': args.tokens_per_second,
+                'first_token_ms': args.first_token_ms,
+                'tokens': args.tokens
+            },
+            'fake_piper': {'rtf': args.piper_rtf, 'startup_ms': args.piper_startup_ms},
+            'llm_concurrency': args.llm_concurrency,
+            'tts_workers': args.tts_workers
+        },
+        'ready_s': round(ready_s, 3),
+        'scenarios': results,
+        'scheduler': scheduler,
+        'ollama_requests': fake.requests
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Serial versus sharded synthesis of a long text.
+
+Synthesizes the same text once on a single Piper worker and then split at
+sentence boundaries across 2, 4, ... workers (TTSService shard_workers),
+reporting wall milliseconds, the speedup over serial, and whether the
+joined audio is byte-identical to the serial audio, as JSON.
+
+    python bench/sharded_tts.py
+    python bench/sharded_tts.py --workers 1,2,4,8 --repeat 5
+    python bench/sharded_tts.py --fake --piper-rtf 0.3    # stand-in piper
+
+The stand-in piper sizes its output from the character count, so sharded
+audio there differs from serial by the dropped spaces between shards;
+real Piper voices each sentence on its own and matches exactly.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from run_bench import make_sandbox  # noqa: E402
+
+TEXT = " ".join([
+    "The Tower stands at the heart of this spread, and its message is not a gentle one.",
+    "Something you have built is ready to fall, and the question is whether you will let it.",
+    "Beside it, the Star offers a quieter promise: after the storm, there is room to breathe.",
+    "The Three of Swords in the past position speaks of a loss you have not fully named.",
+    "What might change if you gave that grief the attention it has been asking for?",
+    "In the near future, the Knight of Wands brings movement, perhaps sooner than you expect.",
+    "Take a moment to notice where your energy rises, and where it drains away.",
+    "The outcome card, the World, suggests a cycle closing, and a new one ready to begin.",
+])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial versus sharded synthesis of a long text")
+    parser.add_argument('--voice', default='./voices/ru_RU-irina-medium.onnx')
+    parser.add_argument('--text', default=TEXT)
+    parser.add_argument('--rate', type=float, default=1.4)
+    parser.add_argument('--workers', default='2,4', help="Comma-separated shard worker counts")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fake', action='store_true', help="Use bench/fake_piper.py instead of Piper")
+    parser.add_argument('--piper-rtf', type=float, default=0.3, help="Real-time factor of the fake piper")
+    args = parser.parse_args()
+
+    sandbox = None
+    voice = args.voice
+    if args.fake:
+        sandbox = tempfile.TemporaryDirectory(prefix='tarot-shards-')
+        bin_dir = make_sandbox(sandbox.name)
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+        os.environ['PIPER_WORKER_ENGINE'] = 'cli'
+        os.environ['FAKE_PIPER_RTF'] = str(args.piper_rtf)
+        voice = os.path.join(sandbox.name, 'voices', 'ru_RU-irina-medium.onnx')
+
+    from tts_service import TTSService, wav_duration
+
+    counts = [int(value) for value in args.workers.split(',')]
+    tts_service = TTSService(model_path=voice, speech_rate=args.rate,
+                             pool_size=max(counts), shard_workers=max(counts))
+    tts_service.warm_up()
+
+    def measure(workers):
+        # No audio cache here, so every call runs Piper
+        tts_service.shard_workers = workers
+        walls, wav = [], None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            wav = tts_service.synthesize(args.text)
+            walls.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(walls), 2), len(tts_service.shards(args.text)), wav
+
+    serial_ms, _, serial_wav = measure(1)
+    results = []
+    for workers in counts:
+        wall_ms, shards, wav = measure(workers)
+        results.append({
+            'workers': workers,
+            'shards': shards,
+            'wall_ms': wall_ms,
+            'speedup': round(serial_ms / wall_ms, 2) if wall_ms else None,
+            'audio_s': round(wav_duration(wav), 3),
+            'identical': wav == serial_wav
+        })
+
+    print(json.dumps({
+        'piper': 'fake' if args.fake else 'piper',
+        'characters': len(args.text),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'serial': {'wall_ms': serial_ms, 'audio_s': round(wav_duration(serial_wav), 3)},
+        'sharded': results
+    }, indent=2))
+    tts_service.close()
+    if sandbox is not None:
+        sandbox.cleanup()
+
+
+if __name__ == '__main__':
+    main()
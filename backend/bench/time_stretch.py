@@ -0,0 +1,135 @@
+"""
+Rate change by time-stretch versus re-synthesis.
+
+Synthesizes a text once at the default rate, then produces it at each
+other rate both ways: by running Piper again with that length-scale, and
+by WSOLA time-stretching the first result (TTSService.stretch). Reports
+wall and CPU milliseconds for each method, the audio length, and the
+speedup, as JSON. Piper CPU time is read from /proc for the worker
+process, so it is only reported on Linux.
+
+    python bench/time_stretch.py
+    python bench/time_stretch.py --rates 1.0,1.2,1.8 --repeat 5
+    python bench/time_stretch.py --fake --piper-rtf 0.2    # stand-in piper (it sleeps, so compare wall time)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from run_bench import make_sandbox  # noqa: E402
+
+TEXT = (
+    "The cards reveal a path that is still unfolding. "
+    "What might the Tower be asking you to let go of, and what could take its place? "
+    "Perhaps the coming weeks hold a quiet turning point."
+)
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def worker_cpu_seconds(tts_service):
+    """CPU time of the Piper worker processes and the children they waited for, or None."""
+    if tts_service.pool is None:
+        return None
+    total = 0
+    try:
+        for worker in tts_service.pool.workers:
+            with open(f'/proc/{worker.proc.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            # utime, stime, cutime, cstime (fields 14-17, counted after the command name)
+            total += sum(int(value) for value in fields[11:15])
+    except (OSError, AttributeError):
+        return None
+    return total / CLOCK_TICKS
+
+
+def measure(fn, repeat, cpu=time.process_time):
+    """(median wall ms, median CPU ms or None, last result) of repeat calls."""
+    walls, cpus, result = [], [], None
+    for _ in range(repeat):
+        cpu_start = cpu()
+        start = time.perf_counter()
+        result = fn()
+        walls.append((time.perf_counter() - start) * 1000)
+        cpu_end = cpu()
+        if cpu_start is not None and cpu_end is not None:
+            cpus.append((cpu_end - cpu_start) * 1000)
+    return (round(statistics.median(walls), 2),
+            round(statistics.median(cpus), 2) if cpus else None,
+            result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-stretch versus re-synthesis for rate changes")
+    parser.add_argument('--voice', default='./voices/ru_RU-irina-medium.onnx')
+    parser.add_argument('--text', default=TEXT)
+    parser.add_argument('--base-rate', type=float, default=1.4, help="Rate the audio is cached at")
+    parser.add_argument('--rates', default='0.8,1.0,1.2,1.6,2.0', help="Comma-separated target rates")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fake', action='store_true', help="Use bench/fake_piper.py instead of Piper")
+    parser.add_argument('--piper-rtf', type=float, default=0.1, help="Real-time factor of the fake piper")
+    args = parser.parse_args()
+
+    sandbox = None
+    voice = args.voice
+    if args.fake:
+        sandbox = tempfile.TemporaryDirectory(prefix='tarot-stretch-')
+        bin_dir = make_sandbox(sandbox.name)
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+        os.environ['PIPER_WORKER_ENGINE'] = 'cli'
+        os.environ['FAKE_PIPER_RTF'] = str(args.piper_rtf)
+        voice = os.path.join(sandbox.name, 'voices', 'ru_RU-irina-medium.onnx')
+
+    from tts_service import TTSService, wav_duration
+
+    tts_service = TTSService(model_path=voice, speech_rate=args.base_rate, pool_size=1)
+    tts_service.warm_up()
+    base = tts_service.synthesize(args.text)
+
+    results = []
+    for rate in [float(value) for value in args.rates.split(',')]:
+        synth_wall, synth_cpu, synth_wav = measure(
+            lambda: tts_service.synthesize(args.text, rate), args.repeat,
+            cpu=lambda: worker_cpu_seconds(tts_service)
+        )
+        stretch_wall, stretch_cpu, stretch_wav = measure(
+            lambda: tts_service.stretch(base, args.base_rate, rate), args.repeat
+        )
+        entry = {
+            'rate': rate,
+            'resynthesis': {'wall_ms': synth_wall, 'cpu_ms': synth_cpu,
+                            'audio_s': round(wav_duration(synth_wav), 3)},
+        }
+        if stretch_wav is None:
+            entry['stretch'] = None  # Outside the ratio WSOLA is used for
+        else:
+            entry['stretch'] = {'wall_ms': stretch_wall, 'cpu_ms': stretch_cpu,
+                                'audio_s': round(wav_duration(stretch_wav), 3)}
+            entry['speedup'] = round(synth_wall / stretch_wall, 1) if stretch_wall else None
+            if synth_cpu and stretch_cpu:
+                entry['cpu_ratio'] = round(stretch_cpu / synth_cpu, 3)
+        results.append(entry)
+
+    print(json.dumps({
+        'piper': 'fake' if args.fake else 'piper',
+        'base_rate': args.base_rate,
+        'base_audio_s': round(wav_duration(base), 3),
+        'characters': len(args.text),
+        'repeat': args.repeat,
+        'rates': results
+    }, indent=2))
+    if sandbox is not None:
+        tts_service.pool.close()
+        sandbox.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Bulk interpretation for offline pre-generation jobs.
+
+Runs a list of readings through LLMService with bounded parallelism and
+yields NDJSON-ready records as each one finishes. Jobs are resumable:
+every record carries the reading's id, and ids that already have a result
+are skipped on the next run.
+
+Served over HTTP as POST /api/interpret_batch, or run directly:
+
+    python bulk.py --daily --output daily.ndjson
+    python bulk.py --input readings.ndjson --output results.ndjson --concurrency 4
+
+Re-running the same command after an interruption continues where it stopped.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from cancellation import CancelToken, cancellable
+from deck import DECK, UnknownCard, card_id, normalize_cards
+from llm_scheduler import QueueFullError
+
+# Bulk work queues behind every interactive reading
+BULK_PRIORITY = 1000
+
+
+def daily_readings(names: Optional[List[str]] = None) -> Iterator[Dict]:
+    """A single-card reading for every card in both orientations."""
+    for name in names or [card.name for card in DECK]:
+        for is_reversed in (False, True):
+            yield {
+                'id': f"daily:{name.lower().replace(' ', '-')}:{'reversed' if is_reversed else 'upright'}",
+                'cards': [{'card': name, 'reversed': is_reversed}],
+                'spreadType': 1
+            }
+
+
+def reading_key(cards: List[Dict], spread_type: int) -> str:
+    """Canonical text key of a reading: spread type, then each card's deck id and orientation."""
+    parts = []
+    for card_obj in cards:
+        found = card_id(card_obj)
+        part = str(found) if found is not None else str(card_obj.get('card', '')).lower()
+        parts.append(part + ('r' if card_obj.get('reversed') else ''))
+    return f"{spread_type}/{'|'.join(parts)}"
+
+
+def reading_id(reading: Dict) -> str:
+    """The reading's own id, or one derived from its spread and cards."""
+    if reading.get('id') is not None:
+        return str(reading['id'])
+    return reading_key(reading.get('cards', []), reading.get('spreadType', 1))
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a result in an NDJSON output file (a torn last line is ignored)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('type') == 'result':
+                done.add(record['id'])
+    return done
+
+
+class BulkInterpreter:
+    """Runs many readings through LLMService with at most `concurrency` in flight."""
+
+    def __init__(self, llm_service, card_meanings: Callable[[List[Dict]], Dict],
+                 concurrency: int = 2, validate: Optional[Callable[[Dict], Optional[str]]] = None,
+                 cancel: Optional[CancelToken] = None):
+        """
+        Args:
+            llm_service: LLMService used for every reading
+            card_meanings: Looks up the meanings for a reading's cards
+            concurrency: Readings generated at once
+            validate: Optional check returning an error message for a bad reading
+            cancel: Optional CancelToken; when it trips, generations in progress
+                are stopped and no more are started
+        """
+        self.llm_service = llm_service
+        self.card_meanings = card_meanings
+        self.concurrency = max(1, concurrency)
+        self.validate = validate
+        self.cancel = cancel
+
+    def _acquire(self, cards):
+        """A low-priority scheduler slot, waiting out a full queue instead of failing."""
+        scheduler = self.llm_service.scheduler
+        if scheduler is None:
+            return None
+        while True:
+            if self.cancel is not None:
+                self.cancel.check()
+            try:
+                return scheduler.acquire(BULK_PRIORITY + scheduler.priority_for(cards), self.cancel)
+            except QueueFullError as e:
+                if self.cancel is None:
+                    time.sleep(e.retry_after)
+                    continue
+                # Wait out the full queue, but stop as soon as the job is cancelled
+                woken = threading.Event()
+                detach = self.cancel.on_cancel(woken.set)
+                try:
+                    woken.wait(e.retry_after)
+                finally:
+                    detach()
+
+    def _generate(self, reading: Dict) -> Dict:
+        rid = reading_id(reading)
+        spread_type = reading.get('spreadType', 1)
+        error = self.validate(reading) if self.validate else None
+        if error:
+            return {'type': 'error', 'id': rid, 'error': error}
+        try:
+            cards = normalize_cards(reading.get('cards'))
+        except UnknownCard as e:
+            return {'type': 'error', 'id': rid, 'error': str(e)}
+        start = time.perf_counter()
+        try:
+            meanings = self.card_meanings(cards)
+            ticket = self._acquire(cards)
+            text = ''.join(cancellable(
+                self.llm_service.stream_interpretation(cards, spread_type, meanings, ticket), self.cancel, 'llm'
+            ))
+            if self.cancel is not None:
+                self.cancel.check()
+        except Exception as e:
+            return {'type': 'error', 'id': rid, 'error': str(e)}
+        return {
+            'type': 'result',
+            'id': rid,
+            'spreadType': spread_type,
+            'cards': cards,
+            'interpretation': text,
+            'ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def run(self, readings: Iterable[Dict], skip: Iterable[str] = ()) -> Iterator[Dict]:
+        """
+        Yield a record per reading in completion order, then a stats record.
+
+        Readings are pulled from the iterable lazily, so a large input is
+        never held in memory all at once.
+        """
+        skip = set(skip)
+        stats = {'type': 'stats', 'completed': 0, 'failed': 0, 'skipped': 0}
+        start = time.perf_counter()
+
+        def remaining():
+            for reading in readings:
+                if self.cancel is not None and self.cancel.cancelled:
+                    return
+                if reading_id(reading) in skip:
+                    stats['skipped'] += 1
+                else:
+                    yield reading
+
+        source = remaining()
+        pending = set()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='bulk')
+        try:
+            while True:
+                # Keep a small backlog queued, without reading the whole input up front
+                for reading in islice(source, self.concurrency * 2 - len(pending)):
+                    pending.add(executor.submit(self._generate, reading))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    stats['completed' if record['type'] == 'result' else 'failed'] += 1
+                    yield record
+        finally:
+            # A closed stream (client gone, Ctrl-C) drops the backlog; running readings
+            # finish alone unless the cancel token stops them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed_s'] = round(elapsed, 2)
+        stats['readings_per_minute'] = round(stats['completed'] / elapsed * 60, 2) if elapsed else None
+        yield stats
+
+
+def _read_input(path: str) -> Iterator[Dict]:
+    """Readings from an NDJSON file or a JSON array ('-' for stdin)."""
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            yield from json.loads(first + f.read())
+            return
+        rest = first + f.readline()
+        if rest.strip():
+            yield json.loads(rest)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many interpretations to an NDJSON file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="Readings as NDJSON or a JSON array ('-' for stdin)")
+    source.add_argument('--daily', action='store_true',
+                        help="Single-card readings for every card, upright and reversed")
+    parser.add_argument('--output', required=True, help="NDJSON results; appended to and resumed from")
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--model', default='llama3.2:3b')
+    args = parser.parse_args()
+
+    from llm_service import LLMService
+    from tarot_scraper import TarotScraper
+
+    scraper = TarotScraper()
+    llm_service = LLMService(model_name=args.model)
+
+    def card_meanings(cards):
+        return {card_obj['id']: scraper.get_card_meaning(DECK[card_obj['id']]) for card_obj in cards}
+
+    readings = daily_readings() if args.daily else _read_input(args.input)
+    done = completed_ids(args.output)
+    if done:
+        print(f"Resuming: {len(done)} readings already in {args.output}", file=sys.stderr)
+
+    runner = BulkInterpreter(llm_service, card_meanings, concurrency=args.concurrency)
+    with open(args.output, 'a', encoding='utf-8') as out:
+        try:
+            for record in runner.run(readings, skip=done):
+                if record['type'] == 'stats':
+                    print(json.dumps(record), file=sys.stderr)
+                    continue
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                if record['type'] == 'error':
+                    print(f"Failed {record['id']}: {record['error']}", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Interrupted; run the same command again to resume", file=sys.stderr)
+            sys.exit(130)
+
+
+if __name__ == '__main__':
+    main()
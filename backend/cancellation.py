@@ -0,0 +1,194 @@
+"""
+Stopping work whose client has gone away.
+
+When the app's stop button aborts a request, the server would otherwise
+keep Ollama generating and Piper synthesizing for nobody. Each cancellable
+request gets a CancelToken; work attaches to it what to do if the client
+leaves (close the Ollama stream, kill the Piper worker, give up a queue
+place). The DisconnectMonitor trips the token as soon as the client's
+socket closes, even while nothing is being written to it, and a request
+that ends early (a streamed response closed after a failed write) trips
+it when the response is closed. Stopped work is counted in
+tarot_cancelled_total.
+"""
+
+import itertools
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+import metrics
+
+
+class Cancelled(Exception):
+    """Raised by work whose request was cancelled."""
+
+
+class CancelToken:
+    """Cancellation flag for one request, with callbacks run when it trips."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._ids = itertools.count()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run callback when the token is cancelled (now, if it already is).
+
+        Returns:
+            Function that detaches the callback once the work is done
+        """
+        with self._lock:
+            if not self.cancelled:
+                key = next(self._ids)
+                self._callbacks[key] = callback
+                return lambda: self._detach(key)
+        callback()
+        return lambda: None
+
+    def _detach(self, key):
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    def cancel(self):
+        """Trip the token and run every attached callback once."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: cancellation callback failed: {e}")
+
+    def check(self):
+        """Raise Cancelled if the token has tripped."""
+        if self.cancelled:
+            raise Cancelled("Client disconnected")
+
+
+def cancellable(iterable: Iterable, cancel: Optional[CancelToken], kind: Optional[str] = None) -> Iterator:
+    """
+    Pass items through until the token trips or the consumer stops early,
+    then close the source (which ends the Ollama stream or Piper request
+    behind it).
+
+    Args:
+        iterable: Source of items, closed when iteration stops
+        cancel: Token to check between items (None: only stop when closed)
+        kind: Label recorded in tarot_cancelled_total when the source is cut
+            short; None for work that carries on regardless (a shared generation)
+    """
+    start = time.perf_counter()
+    it = iter(iterable)
+    cut = False
+    try:
+        for item in it:
+            if cancel is not None and cancel.cancelled:
+                cut = True
+                break
+            yield item
+    except GeneratorExit:
+        cut = True
+        raise
+    finally:
+        if cut and kind is not None:
+            metrics.record_cancel(kind, time.perf_counter() - start)
+        close = getattr(it, 'close', None)
+        if close is not None:
+            close()
+
+
+def client_socket(environ) -> Optional[socket.socket]:
+    """The client connection of a WSGI request, where the server exposes it."""
+    return environ.get('werkzeug.socket') or environ.get('gunicorn.socket')
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    """Whether a readable socket was closed by the client (rather than sent more data)."""
+    try:
+        return sock.recv(1, socket.MSG_PEEK | getattr(socket, 'MSG_DONTWAIT', 0)) == b''
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError:
+        return True
+
+
+class DisconnectMonitor:
+    """
+    One background thread watching the sockets of in-flight requests.
+
+    A watched socket becomes readable when the client closes it; the
+    request's token is then cancelled. Register a socket only once the
+    request body has been read, so that leftover body bytes are not
+    mistaken for activity. A socket that turns readable with data (a
+    pipelined request) is simply no longer watched.
+
+    End of input is taken as the client leaving, so a client that shuts
+    down only its sending side (shutdown(SHUT_WR)) after the request and
+    still waits for the response is cancelled too. HTTP clients do not do
+    this in practice; one that must should not use the cancellable
+    endpoints through the Flask server.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        """
+        Args:
+            interval: Seconds between checks of the watched set for changes
+        """
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._watched = {}
+        self._thread = None
+
+    def watch(self, sock: socket.socket, token: CancelToken):
+        with self._cond:
+            self._watched[sock] = token
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='disconnect-monitor', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def unwatch(self, sock: socket.socket):
+        with self._cond:
+            self._watched.pop(sock, None)
+
+    def _readable(self, sockets):
+        """Sockets that turn readable within one interval (any fd number, unlike select.select)."""
+        with selectors.DefaultSelector() as selector:
+            for sock in sockets:
+                try:
+                    selector.register(sock, selectors.EVENT_READ)
+                except (OSError, ValueError, KeyError):
+                    continue  # Closed since it was listed
+            return [key.fileobj for key, _ in selector.select(self.interval)]
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._watched:
+                    self._cond.wait()
+                sockets = [sock for sock in self._watched if sock.fileno() >= 0]
+                for sock in list(self._watched):
+                    if sock.fileno() < 0:
+                        # Closed by the server: the request is over
+                        del self._watched[sock]
+            try:
+                readable = self._readable(sockets)
+            except (OSError, ValueError):
+                # A socket was closed while we waited; the next pass drops it
+                time.sleep(self.interval)
+                continue
+            for sock in readable:
+                closed = _peer_closed(sock)
+                with self._cond:
+                    token = self._watched.pop(sock, None)
+                if closed and token is not None:
+                    token.cancel()
@@ -0,0 +1,264 @@
+"""
+Canonical registry of the 78 tarot cards.
+
+Built once at import and never modified. Every card has an integer id
+(0-21 for the major arcana in order, then Wands, Cups, Swords and
+Pentacles from Ace to King), its built-in meanings, and its prompt line
+for each orientation already rendered. Incoming names are resolved
+through an alias index ("Judgment", "2 of Coins", "Knave of Staves",
+"the wheel") with a dict lookup, and requests naming anything else are
+rejected at the API edge by normalize_cards().
+"""
+
+import re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+
+class UnknownCard(ValueError):
+    """Raised for a card name or id that is not in the deck."""
+
+
+class Card(NamedTuple):
+    id: int
+    name: str
+    suit: Optional[str]         # None for the major arcana
+    rank: Optional[str]         # 'Ace' .. 'King' for the minor arcana
+    key: str                    # Lowercased name, as used by the meanings cache
+    meanings: Mapping[str, str]  # Read-only {'upright': ..., 'reversed': ...}
+    prompt: Tuple[str, str]     # Prompt line after the position label, (upright, reversed)
+
+
+_MAJOR_ARCANA = (
+    ("The Fool",
+     "New beginnings, innocence, spontaneity, free spirit, adventure",
+     "Recklessness, taken advantage of, inconsideration, naivety"),
+    ("The Magician",
+     "Manifestation, resourcefulness, power, inspired action, skill",
+     "Manipulation, poor planning, untapped talents, illusion"),
+    ("The High Priestess",
+     "Intuition, sacred knowledge, divine feminine, subconscious mind",
+     "Secrets, disconnected from intuition, withdrawal, silence"),
+    ("The Empress",
+     "Femininity, beauty, nature, nurturing, abundance, creativity",
+     "Creative block, dependence on others, smothering, emptiness"),
+    ("The Emperor",
+     "Authority, establishment, structure, father figure, control",
+     "Domination, excessive control, lack of discipline, inflexibility"),
+    ("The Hierophant",
+     "Spiritual wisdom, religious beliefs, conformity, tradition, institutions",
+     "Personal beliefs, freedom, challenging the status quo, rebellion"),
+    ("The Lovers",
+     "Love, harmony, relationships, values alignment, choices",
+     "Self-love, disharmony, imbalance, misalignment of values"),
+    ("The Chariot",
+     "Control, willpower, success, action, determination, victory",
+     "Self-discipline, opposition, lack of direction, aggression"),
+    ("Strength",
+     "Strength, courage, persuasion, influence, compassion, inner power",
+     "Inner strength, self-doubt, low energy, raw emotion, insecurity"),
+    ("The Hermit",
+     "Soul searching, introspection, being alone, inner guidance, solitude",
+     "Isolation, loneliness, withdrawal, paranoia, exile"),
+    ("Wheel of Fortune",
+     "Good luck, karma, life cycles, destiny, turning point, change",
+     "Bad luck, resistance to change, breaking cycles, setbacks"),
+    ("Justice",
+     "Justice, fairness, truth, cause and effect, law, accountability",
+     "Unfairness, lack of accountability, dishonesty, legal issues"),
+    ("The Hanged Man",
+     "Pause, surrender, letting go, new perspectives, sacrifice",
+     "Delays, resistance, stalling, indecision, stagnation"),
+    ("Death",
+     "Endings, change, transformation, transition, letting go, release",
+     "Resistance to change, personal transformation, inner purging"),
+    ("Temperance",
+     "Balance, moderation, patience, purpose, meaning, harmony",
+     "Imbalance, excess, self-healing, re-alignment, extremes"),
+    ("The Devil",
+     "Shadow self, attachment, addiction, restriction, sexuality, materialism",
+     "Releasing limiting beliefs, exploring dark thoughts, detachment"),
+    ("The Tower",
+     "Sudden change, upheaval, chaos, revelation, awakening, disruption",
+     "Personal transformation, fear of change, averting disaster"),
+    ("The Star",
+     "Hope, faith, purpose, renewal, spirituality, inspiration, serenity",
+     "Lack of faith, despair, self-trust, disconnection, discouragement"),
+    ("The Moon",
+     "Illusion, fear, anxiety, subconscious, intuition, dreams",
+     "Release of fear, repressed emotion, inner confusion, clarity"),
+    ("The Sun",
+     "Positivity, fun, warmth, success, vitality, joy, confidence",
+     "Inner child, feeling down, overly optimistic, unrealistic expectations"),
+    ("Judgement",
+     "Judgement, rebirth, inner calling, absolution, reflection, reckoning",
+     "Self-doubt, inner critic, ignoring the call, lack of self-awareness"),
+    ("The World",
+     "Completion, integration, accomplishment, travel, fulfillment, success",
+     "Seeking personal closure, short-cuts, delays, incomplete goals"),
+)
+
+SUITS = ("Wands", "Cups", "Swords", "Pentacles")
+RANKS = ("Ace", "Two", "Three", "Four", "Five", "Six", "Seven", "Eight", "Nine", "Ten",
+         "Page", "Knight", "Queen", "King")
+
+_SUIT_MEANINGS = {
+    "Cups": "emotions, feelings, relationships, connections",
+    "Pentacles": "material world, finances, career, manifestation",
+    "Swords": "thoughts, intellect, communication, conflict",
+    "Wands": "inspiration, energy, action, passion, creativity",
+}
+
+# (upright, reversed) sentence for each rank; numbered cards share one
+_RANK_MEANINGS = {
+    "Ace": ("A new beginning or opportunity in this area.",
+            "Missed opportunity or delayed start."),
+    "Page": ("A message, new learning, or youthful energy.",
+             "Immaturity, lack of commitment, or delayed news."),
+    "Knight": ("Action, movement, pursuit of goals.",
+               "Hasty action, delays, or frustration."),
+    "Queen": ("Nurturing, mature feminine energy, mastery.",
+              "Dependency, manipulation, or self-care needed."),
+    "King": ("Mastery, control, mature masculine energy.",
+             "Domination, control issues, or lack of authority."),
+}
+_NUMBERED_MEANING = ("Development and progression in this area.",
+                     "Challenges or setbacks in this area.")
+
+_MAJOR_ALIASES = {
+    "Judgement": ("judgment",),
+    "Wheel of Fortune": ("the wheel", "wheel", "fortune"),
+    "Strength": ("fortitude",),
+    "The High Priestess": ("priestess", "the popess"),
+    "The Hierophant": ("the pope",),
+    "Temperance": ("art",),
+    "The World": ("the universe",),
+}
+_RANK_ALIASES = {
+    "Ace": ("1", "one"), "Two": ("2",), "Three": ("3",), "Four": ("4",), "Five": ("5",),
+    "Six": ("6",), "Seven": ("7",), "Eight": ("8",), "Nine": ("9",), "Ten": ("10",),
+    "Page": ("knave", "princess"), "Knight": ("prince",),
+}
+_SUIT_ALIASES = {
+    "Wands": ("wand", "rods", "rod", "staves", "staff", "staffs", "batons", "clubs"),
+    "Cups": ("cup", "chalices", "chalice", "hearts"),
+    "Swords": ("sword", "blades", "spades"),
+    "Pentacles": ("pentacle", "coins", "coin", "disks", "discs", "diamonds"),
+}
+
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+
+def _normalize(name: str) -> str:
+    return _SEPARATORS.sub(' ', name.strip().lower())
+
+
+def _prompt_line(name: str, orientation: str, meaning: str) -> str:
+    # Must match llm_service._CARD_LINE after its "**{position}**: " prefix
+    return f"{name} ({orientation})\nMeaning: {meaning}\n\n"
+
+
+def _card(card_id, name, suit, rank, upright, reversed_meaning) -> Card:
+    return Card(
+        id=card_id,
+        name=name,
+        suit=suit,
+        rank=rank,
+        key=name.lower(),
+        meanings=MappingProxyType({'upright': upright, 'reversed': reversed_meaning}),
+        prompt=(_prompt_line(name, "Upright", upright), _prompt_line(name, "Reversed", reversed_meaning))
+    )
+
+
+def _build() -> Tuple[Tuple[Card, ...], Dict[str, Card]]:
+    deck = []
+    index = {}
+
+    def alias(card, *names):
+        for name in names:
+            lowered = _normalize(name)
+            index.setdefault(name, card)
+            index.setdefault(lowered, card)
+            index.setdefault(lowered[4:] if lowered.startswith('the ') else 'the ' + lowered, card)
+
+    for name, upright, reversed_meaning in _MAJOR_ARCANA:
+        card = _card(len(deck), name, None, None, upright, reversed_meaning)
+        deck.append(card)
+        alias(card, name, *_MAJOR_ALIASES.get(name, ()))
+
+    for suit in SUITS:
+        for rank in RANKS:
+            upright, reversed_meaning = _RANK_MEANINGS.get(rank, _NUMBERED_MEANING)
+            card = _card(
+                len(deck), f"{rank} of {suit}", suit, rank,
+                f"This card relates to {_SUIT_MEANINGS[suit]}. {upright}",
+                f"Blocked or internalized {_SUIT_MEANINGS[suit]}. {reversed_meaning}"
+            )
+            deck.append(card)
+            for rank_name in (rank.lower(),) + _RANK_ALIASES.get(rank, ()):
+                for suit_name in (suit.lower(),) + _SUIT_ALIASES[suit]:
+                    alias(card, f"{rank_name} of {suit_name}")
+            index.setdefault(card.name, card)
+
+    return tuple(deck), index
+
+
+DECK, _INDEX = _build()
+MAJOR_ARCANA = DECK[:22]
+DECK_SIZE = len(DECK)
+
+
+def lookup(name: str) -> Optional[Card]:
+    """Card for a name or alias, in any case and spacing; None if there is none."""
+    if not isinstance(name, str):
+        # Request JSON can hold anything here, including unhashable lists
+        return None
+    card = _INDEX.get(name)  # Canonical spellings hit here without normalizing
+    if card is None:
+        card = _INDEX.get(_normalize(name))
+    return card
+
+
+def card_id(card_obj: Dict) -> Optional[int]:
+    """Deck id of a request card object (by 'id', else by 'card' name), or None."""
+    value = card_obj.get('id')
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value < DECK_SIZE:
+        return value
+    card = lookup(card_obj.get('card', ''))
+    return card.id if card is not None else None
+
+
+def card_for(card_obj: Dict) -> Card:
+    """Card of a request card object; raises UnknownCard."""
+    found = card_id(card_obj)
+    if found is None:
+        raise UnknownCard(f"Unknown card: {card_obj.get('card', card_obj.get('id'))!r}")
+    return DECK[found]
+
+
+def normalize_cards(cards) -> List[Dict]:
+    """
+    Validate the cards of a request and return them in canonical form.
+
+    Args:
+        cards: List of {"card": name} or {"id": int} objects, with optional "reversed"
+
+    Returns:
+        List of {"id", "card", "reversed"} with the canonical card name
+
+    Raises:
+        UnknownCard: for a malformed object, an unknown card or a card drawn twice
+    """
+    if not isinstance(cards, list):
+        raise UnknownCard("Cards must be a list")
+    normalized = []
+    seen = set()
+    for card_obj in cards:
+        if not isinstance(card_obj, dict):
+            raise UnknownCard("Every card must be an object")
+        card = card_for(card_obj)
+        if card.id in seen:
+            raise UnknownCard(f"Card drawn twice: {card.name}")
+        seen.add(card.id)
+        normalized.append({'id': card.id, 'card': card.name, 'reversed': bool(card_obj.get('reversed', False))})
+    return normalized
@@ -0,0 +1,36 @@
+"""
+Framing for streamed responses that mix text and binary audio.
+
+Each frame is one line of JSON followed by `length` bytes of payload.
+Text-only frames have no payload and omit `length`. Clients read a line,
+parse it, then read exactly `length` bytes if present.
+"""
+
+import json
+
+FRAME_MIMETYPE = 'application/x-tarot-frames'
+
+
+def frame_header(header):
+    """Encode a frame header as a single JSON line."""
+    return json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def iter_frame(header, payload=None):
+    """
+    Yield the pieces of one frame without concatenating header and payload.
+
+    Args:
+        header: dict of frame metadata
+        payload: optional bytes-like audio payload
+
+    Yields:
+        bytes: header line, then payload if present
+    """
+    if payload is None:
+        yield frame_header(header)
+        return
+    header = dict(header, length=len(payload))
+    yield frame_header(header)
+    if len(payload):
+        yield payload
@@ -0,0 +1,199 @@
+"""
+Cache of finished interpretations with single-flight generation.
+
+Identical readings (same cards, orientations, spread, model and prompt
+version) are served from memory for a TTL, and concurrent identical
+requests attach to one in-flight generation instead of each calling Ollama.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class SharedGeneration:
+    """
+    One in-flight generation whose text chunks are broadcast to every subscriber.
+
+    A background thread pumps the source iterator into a buffer, so a slow
+    or departed subscriber never stalls the others. Late subscribers replay
+    the buffer from the start and then follow along live.
+    """
+
+    def __init__(self, source_factory: Callable[[], Iterable[str]],
+                 on_complete: Optional[Callable[['SharedGeneration'], None]] = None,
+                 error_message: Callable[[Exception], str] = str):
+        self.chunks: List[str] = []
+        self.done = False
+        self.failed = False
+        self._source_factory = source_factory
+        self._on_complete = on_complete
+        self._error_message = error_message
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    def _append(self, text: str):
+        with self._cond:
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def _pump(self):
+        try:
+            for text in self._source_factory():
+                self._append(text)
+        except Exception as e:
+            self.failed = True
+            self._append(self._error_message(e))
+        finally:
+            try:
+                # Publish the result before waking subscribers, so a request that
+                # follows a finished one finds it in the cache
+                if self._on_complete is not None:
+                    self._on_complete(self)
+            finally:
+                with self._cond:
+                    self.done = True
+                    self._cond.notify_all()
+
+    def subscribe(self, start: int = 0) -> Iterator[str]:
+        """Yield every chunk from index start onwards, live until the generation ends."""
+        index = start
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                pending = self.chunks[index:]
+                finished = self.done
+            index += len(pending)
+            yield from pending
+            if finished and index >= len(self.chunks):
+                return
+
+    def text(self) -> str:
+        """Block until the generation ends and return the whole text."""
+        with self._cond:
+            while not self.done:
+                self._cond.wait()
+        return ''.join(self.chunks)
+
+
+class InterpretationCache:
+    """
+    TTL- and size-bounded cache of finished interpretations.
+
+    Up to `variants` different interpretations are kept per key. Until a key
+    has that many, requests generate fresh ones; after that a random stored
+    variant is served, so repeat readings are not always word-for-word.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024, variants: int = 1,
+                 error_message: Callable[[Exception], str] = str):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.error_message = error_message
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple, List[Tuple[str, float]]]' = OrderedDict()
+        self._inflight: Dict[Tuple, SharedGeneration] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(cards: List[Dict], spread_type: int, model: str, prompt_version: int) -> Tuple:
+        """Key a reading by (deck ids, orientations, spread, model, prompt version)."""
+        card_key = tuple((card_obj['id'], bool(card_obj.get('reversed', False))) for card_obj in cards)
+        return (card_key, spread_type, model, prompt_version)
+
+    def get(self, key: Tuple) -> Optional[str]:
+        """Return a stored interpretation once the key has all its variants, else None."""
+        now = time.monotonic()
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None:
+                return None
+            variants[:] = [(text, expires) for text, expires in variants if expires > now]
+            if not variants:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if len(variants) < self.variants:
+                return None
+            return random.choice(variants)[0]
+
+    def put(self, key: Tuple, text: str):
+        with self._lock:
+            variants = self._entries.setdefault(key, [])
+            self._entries.move_to_end(key)
+            variants.append((text, time.monotonic() + self.ttl))
+            del variants[:-self.variants]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _start(self, key: Tuple, source_factory: Callable[[], Iterable[str]]) -> SharedGeneration:
+        """Start the shared generation for key (caller holds the lock)."""
+        def on_complete(finished: SharedGeneration):
+            with self._lock:
+                if self._inflight.get(key) is finished:
+                    del self._inflight[key]
+            if not finished.failed:
+                self.put(key, ''.join(finished.chunks))
+
+        generation = SharedGeneration(source_factory, on_complete, self.error_message)
+        self._inflight[key] = generation
+        return generation
+
+    def stream(self, key: Tuple, source_factory: Callable[[Optional[object]], Iterable[str]],
+               admit: Optional[Callable[[], Optional[object]]] = None) -> Iterator[str]:
+        """
+        Return an iterator of the interpretation text for key.
+
+        A cache hit is a single chunk; otherwise the chunks of the shared
+        in-flight generation arrive as they are produced. Only a request that
+        has to start a new generation calls admit() (which may wait for, or be
+        refused, a scheduler slot); its result is passed to source_factory.
+        This runs eagerly, so admission errors reach the caller directly.
+        """
+        text = self.get(key)
+        if text is not None:
+            with self._lock:
+                self.hits += 1
+            return iter([text])
+
+        with self._lock:
+            self.misses += 1
+            generation = self._inflight.get(key)
+            if generation is not None:
+                self.coalesced += 1
+                return generation.subscribe()
+
+        ticket = admit() if admit is not None else None
+        with self._lock:
+            generation = self._inflight.get(key)
+            if generation is not None:
+                # Someone else started it while we waited for a slot
+                self.coalesced += 1
+                if ticket is not None:
+                    ticket.release()
+            else:
+                generation = self._start(key, lambda: source_factory(ticket))
+        return generation.subscribe()
+
+    def generate(self, key: Tuple, source_factory: Callable[[Optional[object]], Iterable[str]],
+                 admit: Optional[Callable[[], Optional[object]]] = None) -> str:
+        """Return the whole interpretation for key, sharing any in-flight generation."""
+        return ''.join(self.stream(key, source_factory, admit))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'entries': len(self._entries),
+                'inflight': len(self._inflight)
+            }
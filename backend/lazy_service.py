@@ -0,0 +1,82 @@
+"""
+Services built on first use instead of at import.
+
+Constructing the card meanings cache, the LLM client and the Piper pool at
+import time delays every worker spawn, and one failure (a missing voice
+file) stops the whole server from starting. A LazyService stands in for a
+service object: the first attribute access builds it, once, from whichever
+thread gets there first, and only the endpoints that touch a service pay
+for it. The startup warm-up (warmup.py, on unless WARMUP=0) builds the LLM
+and TTS services in the background straight away, so with it on only the
+bind is lazy.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ServiceUnavailable(Exception):
+    """Raised when a service could not be built (for example its voice model is missing)."""
+
+
+class LazyService:
+    """
+    A service constructed by `factory` on first use, thread-safely.
+
+    Attribute access is forwarded to the service, so a LazyService can be
+    passed wherever the service itself was. A failed construction raises
+    ServiceUnavailable and is tried again on the next use, so fixing the
+    cause (installing the voice) does not need a restart.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        Args:
+            name: Shown in errors and the startup report
+            factory: Builds the service; called at most once successfully
+        """
+        self.name = name
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._service = None
+        self.init_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def get(self):
+        """The service, building it first if needed; raises ServiceUnavailable."""
+        service = self._service
+        if service is not None:
+            return service
+        with self._lock:
+            if self._service is None:
+                start = time.perf_counter()
+                try:
+                    service = self._factory()
+                except Exception as e:
+                    if str(e) != self.error:
+                        print(f"Warning: {self.name} unavailable: {e}")
+                    self.error = str(e)
+                    raise ServiceUnavailable(f"{self.name} unavailable: {e}") from e
+                self.init_ms = (time.perf_counter() - start) * 1000
+                self.error = None
+                self._service = service
+            return self._service
+
+    @property
+    def ready(self) -> bool:
+        """Whether the service has been built (without building it)."""
+        return self._service is not None
+
+    def __getattr__(self, name):
+        # Only called for names not found on the LazyService itself
+        if name.startswith('__') or name in ('_factory', '_lock', '_service'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def status(self) -> Dict:
+        return {
+            'ready': self.ready,
+            'init_ms': round(self.init_ms, 1) if self.init_ms is not None else None,
+            'error': self.error
+        }
@@ -0,0 +1,284 @@
+"""
+Admission control in front of Ollama.
+
+At most `max_concurrent` generations run at once; up to `max_queue` more
+wait in priority order (smaller spreads first, FIFO within a priority).
+Waiting ages a request: every `aging` seconds in the queue counts as one
+priority step, so a large spread is passed over by smaller ones arriving
+at most (difference in priority x aging) seconds after it, and never
+starves under a steady stream of single-card draws.
+Anything beyond that is rejected immediately with QueueFullError, which
+the API turns into 429 + Retry-After.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import metrics
+from cancellation import CancelToken, Cancelled
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the wait queue is full or a queued request waited too long."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A granted generation slot. Release it exactly once when the generation ends."""
+
+    def __init__(self, scheduler: 'LLMScheduler', priority: int, wait_s: float):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.wait_s = wait_s
+        self.granted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.scheduler._release(time.monotonic() - self.granted_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class TicketedStream:
+    """
+    Iterator over a generation that releases its Ticket when exhausted,
+    closed, or garbage collected (e.g. a response that was never started).
+    """
+
+    def __init__(self, iterable: Iterable, ticket: Ticket):
+        self._it = iter(iterable)
+        self._ticket = ticket
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._it)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        ticket, self._ticket = self._ticket, None
+        if ticket is None:
+            return
+        try:
+            close = getattr(self._it, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            ticket.release()
+
+    def __del__(self):
+        self.close()
+
+
+class _Waiter:
+    __slots__ = ('priority', 'granted', 'cancelled', 'wake')
+
+    def __init__(self, priority, wake):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.wake = wake
+
+
+class LLMScheduler:
+    """Bounded, prioritized concurrency limit for LLM generations."""
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 32,
+                 queue_timeout: float = 120.0, history: int = 1000, aging: float = 2.0):
+        """
+        Args:
+            max_concurrent: Generations allowed to run at once
+            max_queue: Requests allowed to wait; more are rejected
+            queue_timeout: Seconds a request may wait before it is rejected
+            history: Number of recent waits kept for the wait-time percentiles
+            aging: Seconds of waiting worth one priority step (0 = strict priority)
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.aging = aging
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._heap = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._waits = deque(maxlen=history)
+        self._service_s = 10.0  # running estimate of how long a slot is held
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @staticmethod
+    def priority_for(cards) -> int:
+        """Lower runs first: single-card draws ahead of 12-card spreads."""
+        return len(cards)
+
+    # --- Granting ---
+
+    def _try_grant(self) -> bool:
+        """Take a free slot if nobody is queued ahead (caller holds the lock)."""
+        if self._active < self.max_concurrent and not self._queued:
+            self._active += 1
+            return True
+        return False
+
+    def _enqueue(self, priority: int, wake) -> _Waiter:
+        """Queue a waiter or reject (caller holds the lock)."""
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError("Server is busy, please retry shortly", self.retry_after())
+        waiter = _Waiter(priority, wake)
+        # Ordering by priority minus (time waited / aging) is the same as ordering
+        # by priority plus (time queued / aging), which does not change while waiting
+        rank = priority + time.monotonic() / self.aging if self.aging > 0 else priority
+        heapq.heappush(self._heap, (rank, next(self._seq), waiter))
+        self._queued += 1
+        return waiter
+
+    def _release(self, held_s: Optional[float]):
+        """Free a slot (or hand it on); held_s is None for a slot that was never used."""
+        with self._lock:
+            if held_s is not None:
+                self._service_s = 0.9 * self._service_s + 0.1 * held_s
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                # Hand the slot straight to the next waiter
+                self._queued -= 1
+                waiter.granted = True
+                waiter.wake()
+                return
+            self._active -= 1
+
+    def _abandon(self, waiter: _Waiter, timed_out: bool) -> bool:
+        """
+        Give up waiting. Returns True if the slot was granted in the meantime
+        (the caller then owns it and must use or release it).
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            self._queued -= 1
+            if timed_out:
+                self.timed_out += 1
+            return False
+
+    def _ticket(self, priority: int, start: float) -> Ticket:
+        wait_s = time.monotonic() - start
+        with self._lock:
+            self.admitted += 1
+            self._waits.append(wait_s)
+        return Ticket(self, priority, wait_s)
+
+    def acquire(self, priority: int = 0, cancel: Optional[CancelToken] = None) -> Ticket:
+        """
+        Block until a slot is free; raises QueueFullError if the queue is full or
+        the wait times out, and Cancelled if `cancel` trips while waiting.
+        """
+        start = time.monotonic()
+        event = threading.Event()
+        with self._lock:
+            if self._try_grant():
+                waiter = None
+            else:
+                waiter = self._enqueue(priority, event.set)
+        if waiter is not None:
+            detach = cancel.on_cancel(event.set) if cancel is not None else None
+            try:
+                woken = event.wait(self.queue_timeout)
+            finally:
+                if detach is not None:
+                    detach()
+            if cancel is not None and cancel.cancelled:
+                # Client went away; if the slot was already handed to us, pass it on
+                if self._abandon(waiter, timed_out=False):
+                    self._release(None)
+                metrics.record_cancel('llm_queued', time.monotonic() - start)
+                raise Cancelled("Client disconnected while queued")
+            if not woken and not self._abandon(waiter, timed_out=True):
+                raise QueueFullError("Timed out waiting for the model", self.retry_after())
+        return self._ticket(priority, start)
+
+    async def acquire_async(self, priority: int = 0) -> Ticket:
+        """acquire() for the asyncio server; waiting does not block the event loop."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        with self._lock:
+            if self._try_grant():
+                waiter = None
+            else:
+                waiter = self._enqueue(priority, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter, timed_out=True):
+                    raise QueueFullError("Timed out waiting for the model", self.retry_after())
+            except asyncio.CancelledError:
+                # Client went away; if the slot was already handed to us, pass it on
+                if self._abandon(waiter, timed_out=False):
+                    self._release(None)
+                metrics.record_cancel('llm_queued', time.monotonic() - start)
+                raise
+        return self._ticket(priority, start)
+
+    # --- Reporting ---
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from queue depth and slot hold time."""
+        backlog = (self._queued + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(backlog * self._service_s))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            queued_by_priority = {}
+            for _, _, waiter in self._heap:
+                if not waiter.cancelled:
+                    queued_by_priority[waiter.priority] = queued_by_priority.get(waiter.priority, 0) + 1
+
+            def pct(p):
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 1)
+
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._queued,
+                'queued_by_priority': queued_by_priority,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'wait_ms': {'p50': pct(50), 'p95': pct(95), 'max': pct(100)},
+                'avg_service_s': round(self._service_s, 2)
+            }
@@ -1,18 +1,226 @@
-import ollama
-from typing import List, Dict
+import threading
+import time
+import metrics
+from collections import deque
+from typing import List, Dict, Iterable, Iterator, AsyncIterator, Mapping, Optional, Union
+from deck import card_for
+from llm_scheduler import LLMScheduler, Ticket, TicketedStream
+from cancellation import CancelToken
+
+
+def _ollama():
+    """The ollama client module, imported on first use: it pulls in httpx and pydantic."""
+    import ollama
+    return ollama
+
+
+def _field(chunk, name):
+    """Read a response field from a dict or a ChatResponse object."""
+    if isinstance(chunk, dict):
+        return chunk.get(name)
+    return getattr(chunk, name, None)
+
+
+def iter_stream_text(stream: Iterable) -> Iterator[str]:
+    """
+    Yield the text content of each chunk from a streamed interpretation.
+    Closing this generator closes the stream, so Ollama stops generating.
+    """
+    try:
+        for chunk in stream:
+            if isinstance(chunk, dict) and 'message' in chunk:
+                content = chunk['message']['content']
+                if content:
+                    yield content
+            elif isinstance(chunk, str):
+                yield chunk
+            elif getattr(chunk, 'message', None) is not None:
+                # ollama>=0.4 returns ChatResponse objects
+                if chunk.message.content:
+                    yield chunk.message.content
+    finally:
+        _close(stream)
+
+
+def _close(stream):
+    """Close a stream now rather than whenever it is garbage collected."""
+    close = getattr(stream, 'close', None)
+    if close is not None:
+        close()
+
+
+# Ollama model used when none is given
+DEFAULT_MODEL = 'llama3.2:3b'
+
+# Bump whenever the prompt wording changes, so cached interpretations are not reused
+PROMPT_VERSION = 2
+
+# Everything that does not depend on the reading lives in the system prompt, so
+# every request starts with the same tokens and Ollama can reuse their KV cache.
+# Do not interpolate per-request values into it.
+SYSTEM_PROMPT = (
+    'Avoid putting a title in the reading or adding any astrix or other punctuation that could cause the reading to sound obviously generated. '
+    'Try really hard to never type any astrix around any text or titles for any part of the reading. '
+    'Output will be used for a voice over. '
+    'You are a mystical fortune teller with acess to ancient wisdom and knowledge. '
+    'Use thoughtful questions throughout the reading to invite reflection on the cards meanings. Asking questions is encouraged and preferred over making firm declarations. '
+    'Speak in terms of possibilities, tendencies, and emerging patterns rather than stating what will happen. Avoid declaring anything as certain or guaranteed. '
+    'Your job is to avoid sounding obviously wrong while relating the information provided by the relationship between the cards and how they fall. '
+    'Discussing what may be versus what definantly is could be a quick path to making a statement that could be misconstrued as wrong. '
+    'stick to what might be and dont say what absoultly is. '
+    'Questions are good, your predictions cannot be labled wrong when you are asking plenty questions.'
+    'For a single card reading, focus on the card and its meaning, do not refrence other spreads. '
+    'Remember to focus on what cards are in what positions what they mean and the way they are interacting with each other. '
+    '\n\nFor every reading, provide a cohesive interpretation that:\n'
+    '1. Considers how the cards relate to each other\n'
+    '2. Takes into account the position meanings in the spread\n'
+    '3. Offers practical guidance and spiritual insight\n'
+    '4. Addresses the overall narrative of the reading\n'
+)
+
+# Position labels for different spreads
+SPREAD_LABELS = {
+    1: ["Single Card"],
+    3: ["Past", "Present", "Future"],
+    6: ["Past", "Present", "Future", "Hidden Influences", "External Factors", "Outcome"],
+    9: [
+        "Present Situation", "Immediate Influence", "Hidden Influences",
+        "Past Influence", "Recent Past", "Future Influence",
+        "The Querent's Role", "External Factors", "Outcome/Advice"
+    ],
+    10: [
+        "Present Position", "Immediate Influence", "Goal or Destiny",
+        "Distant Past", "Recent Past", "Future Influence",
+        "The Questioner", "External Factors", "Inner Emotions", "Final Result"
+    ],
+    12: [
+        "Past Influences", "Present Situation", "Immediate Influences",
+        "Distant Past", "Recent Past", "Near Future", "Far Future",
+        "External Influences", "Emotional State", "The Querent's Role",
+        "Outcome/Advice", "Final Outcome"
+    ]
+}
+
+# Follows the "**{position}**: " prefix; deck.Card.prompt holds the same line pre-rendered
+_CARD_LINE = "{card} ({orientation})\nMeaning: {meaning}\n\n"
+
+
+class SpreadTemplate:
+    """
+    Precompiled user prompt for one spread type.
+
+    The fixed header and position labels come first and the cards last, so
+    readings of the same spread share the longest possible prompt prefix.
+    """
+
+    __slots__ = ('spread_type', 'labels', 'header', 'prefixes')
+
+    def __init__(self, spread_type: int, labels: List[str]):
+        self.spread_type = spread_type
+        self.labels = labels
+        self.header = (
+            f"Please interpret this {spread_type}-card tarot reading.\n"
+            f"Positions: {', '.join(labels)}\n\n"
+        )
+        self.prefixes = [f"**{label}**: " for label in labels]
+
+    def render(self, cards: List[Dict[str, any]], card_meanings: Dict[int, Mapping[str, str]]) -> str:
+        """
+        Args:
+            cards: Canonical card objects (deck.normalize_cards)
+            card_meanings: Meanings by deck id
+        """
+        parts = [self.header]
+        for i, card_obj in enumerate(cards):
+            card = card_for(card_obj)
+            is_reversed = bool(card_obj.get('reversed', False))
+            meaning = card_meanings.get(card.id)
+            prefix = self.prefixes[i] if i < len(self.prefixes) else f"**Position {i+1}**: "
+            if meaning is None or meaning is card.meanings:
+                # The deck's own meaning: its line is already rendered
+                parts.append(prefix + card.prompt[is_reversed])
+                continue
+            parts.append(prefix + _CARD_LINE.format(
+                card=card.name,
+                orientation="Reversed" if is_reversed else "Upright",
+                meaning=meaning.get(
+                    'reversed' if is_reversed else 'upright',
+                    "No specific meaning available"
+                )
+            ))
+        return ''.join(parts)
+
+
+SPREAD_TEMPLATES = {
+    spread_type: SpreadTemplate(spread_type, labels)
+    for spread_type, labels in SPREAD_LABELS.items()
+}
+
+
+def template_for(spread_type: int, card_count: int) -> SpreadTemplate:
+    """Template for a spread; unknown spreads get numbered positions."""
+    template = SPREAD_TEMPLATES.get(spread_type)
+    if template is None:
+        template = SpreadTemplate(spread_type, [f"Position {i+1}" for i in range(card_count)])
+    return template
+
+
+def parse_keep_alive(value) -> Union[str, float, None]:
+    """Ollama keep_alive from config: '30m', '1h', seconds, or -1 to keep the model loaded."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
 
 class LLMService:
     """Service for generating tarot reading interpretations using a local LLM."""
     
-    def __init__(self, model_name='llama3.2:3b'):
+    def __init__(self, model_name=DEFAULT_MODEL, scheduler: Optional[LLMScheduler] = None,
+                 keep_alive: Union[str, float, None] = '30m'):
+        """
+        Args:
+            model_name: Ollama model to use
+            scheduler: Optional admission control in front of Ollama
+            keep_alive: How long Ollama keeps the model (and its prompt cache)
+                loaded between requests; -1 keeps it loaded indefinitely
+        """
         self.model_name = model_name
+        self.scheduler = scheduler
+        self.keep_alive = keep_alive
+        self._async_client = None
+        self._prompt_evals = deque(maxlen=200)
+        self._first_tokens = deque(maxlen=50)
+        self._prime_ms = None
+        self._last_used = None
+        self._stats_lock = threading.Lock()
+        self._probe_client = None
+    
+    def admit(self, cards: List[Dict[str, any]], cancel: Optional[CancelToken] = None) -> Optional[Ticket]:
+        """
+        Reserve a generation slot, waiting in the scheduler queue if needed.
+        Raises QueueFullError when the queue is full, and Cancelled if `cancel`
+        trips while waiting; None without a scheduler.
+        """
+        if self.scheduler is None:
+            return None
+        return self.scheduler.acquire(self.scheduler.priority_for(cards), cancel)
+    
+    async def aadmit(self, cards: List[Dict[str, any]]) -> Optional[Ticket]:
+        """admit() for the asyncio server."""
+        if self.scheduler is None:
+            return None
+        return await self.scheduler.acquire_async(self.scheduler.priority_for(cards))
     
     def generate_interpretation(
         self, 
         cards: List[Dict[str, any]], 
         spread_type: int,
-        card_meanings: Dict[str, Dict[str, str]],
-        stream: bool = False
+        card_meanings: Dict[int, Mapping[str, str]],
+        stream: bool = False,
+        ticket: Optional[Ticket] = None
     ) -> str:
         """
         Generate a tarot reading interpretation.
@@ -20,111 +228,280 @@ class LLMService:
         Args:
             cards: List of card objects with 'card' and 'reversed' keys
             spread_type: Number of cards in the spread (1, 3, 6, 9, 10, or 12)
-            card_meanings: Dictionary mapping card names to their meanings
+            card_meanings: Meanings by deck id (see deck.py)
             stream: Whether to stream the response as a generator
+            ticket: Slot already granted by admit(); one is acquired here if omitted
             
         Returns:
             String containing the interpretation (or generator if stream=True)
+            
+        Raises:
+            QueueFullError: if the scheduler rejects the request
         """
+        if ticket is None:
+            ticket = self.admit(cards)
+        
         prompt = self._build_prompt(cards, spread_type, card_meanings)
         
         try:
-            response = ollama.chat(
+            started = time.perf_counter()
+            response = _ollama().chat(
                 model=self.model_name,
                 stream=stream,
-                messages=[ 
-                    {
-                        'role': 'system',
-                        'content': (
-                            
-                            'Avoid putting a title in the reading or adding any astrix or other punctuation that could cause the reading to sound obviously generated. '
-                            'Try really hard to never type any astrix around any text or titles for any part of the reading. '
-                            'Output will be used for a voice over. '
-                            'You are a mystical fortune teller with acess to ancient wisdom and knowledge. '
-                            'Use thoughtful questions throughout the reading to invite reflection on the cards meanings. Asking questions is encouraged and preferred over making firm declarations. '
-                            'Speak in terms of possibilities, tendencies, and emerging patterns rather than stating what will happen. Avoid declaring anything as certain or guaranteed. '
-                            'Your job is to avoid sounding obviously wrong while relating the information provided by the relationship between the cards and how they fall. '
-                            'Discussing what may be versus what definantly is could be a quick path to making a statement that could be misconstrued as wrong. '
-                            'stick to what might be and dont say what absoultly is. '
-                            'Questions are good, your predictions cannot be labled wrong when you are asking plenty questions.'
-                            'For a single card reading, focus on the card and its meaning, do not refrence other spreads. '
-                            'Remember to focus on what cards are in what positions what they mean and the way they are interacting with each other. '
-                        )
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    }
-                ]
+                messages=self._messages(prompt),
+                keep_alive=self.keep_alive
             )
             
             if stream:
-                return response # Generator
+                # Generator; the slot is held until it is exhausted or closed
+                response = self._observe(response, started)
+                return TicketedStream(response, ticket) if ticket else response
             
+            self._record(response)
             return response['message']['content']
         except Exception as e:
-            err_msg = f"Error generating interpretation: {str(e)}\n\nPlease ensure Ollama is running and the model '{self.model_name}' is installed."
+            err_msg = self.error_message(e)
             if stream:
+                if ticket:
+                    ticket.release()
                 def err_gen(): yield err_msg
                 return err_gen()
             return err_msg
+        finally:
+            if not stream and ticket:
+                ticket.release()
+    
+    def stream_interpretation(
+        self,
+        cards: List[Dict[str, any]],
+        spread_type: int,
+        card_meanings: Dict[int, Mapping[str, str]],
+        ticket: Optional[Ticket] = None
+    ) -> Iterator[str]:
+        """
+        Stream the interpretation text, raising on failure instead of
+        yielding an error message (so callers can tell the two apart).
+        The ticket (acquired here if omitted) is released when the stream ends.
+        """
+        if ticket is None:
+            ticket = self.admit(cards)
+        try:
+            prompt = self._build_prompt(cards, spread_type, card_meanings)
+            started = time.perf_counter()
+            stream = _ollama().chat(
+                model=self.model_name,
+                stream=True,
+                messages=self._messages(prompt),
+                keep_alive=self.keep_alive
+            )
+            yield from iter_stream_text(self._observe(stream, started))
+        finally:
+            if ticket:
+                ticket.release()
+    
+    async def astream_interpretation(
+        self,
+        cards: List[Dict[str, any]],
+        spread_type: int,
+        card_meanings: Dict[int, Mapping[str, str]],
+        ticket: Optional[Ticket] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream_interpretation using ollama.AsyncClient,
+        for the ASGI server. Raises on failure.
+        """
+        if ticket is None:
+            ticket = await self.aadmit(cards)
+        stream = None
+        try:
+            if self._async_client is None:
+                self._async_client = _ollama().AsyncClient()
+            prompt = self._build_prompt(cards, spread_type, card_meanings)
+            started = time.perf_counter()
+            stream = await self._async_client.chat(
+                model=self.model_name,
+                stream=True,
+                messages=self._messages(prompt),
+                keep_alive=self.keep_alive
+            )
+            first = True
+            async for chunk in stream:
+                self._record(chunk)
+                for text in iter_stream_text([chunk]):
+                    if first:
+                        first = False
+                        self._first_token(started)
+                    yield text
+        finally:
+            try:
+                if stream is not None:
+                    # Closes the connection now, not when the generator is collected
+                    await stream.aclose()
+            finally:
+                if ticket:
+                    ticket.release()
+    
+    def prime(self) -> Optional[Dict]:
+        """
+        Evaluate the shared system prompt once so later readings start from
+        Ollama's cached context instead of re-reading it. Also loads the model.
+        
+        Returns:
+            Prompt evaluation stats for the priming request, or None on failure
+        """
+        started = time.perf_counter()
+        try:
+            response = _ollama().chat(
+                model=self.model_name,
+                messages=[{'role': 'system', 'content': SYSTEM_PROMPT}],
+                options={'num_predict': 1},
+                keep_alive=self.keep_alive
+            )
+        except Exception as e:
+            print(f"Warning: could not prime prompt cache: {e}")
+            return None
+        with self._stats_lock:
+            self._prime_ms = (time.perf_counter() - started) * 1000
+            self._last_used = time.monotonic()
+        stats = self._prompt_eval(response) or {}
+        stats['total_ms'] = round(self._prime_ms, 1)
+        return stats
+    
+    def model_loaded(self) -> Optional[bool]:
+        """
+        Whether Ollama currently has the model in memory, from /api/ps.
+        False if Ollama is unreachable; None if this client cannot tell.
+        """
+        if self._probe_client is None:
+            self._probe_client = _ollama().Client(timeout=2.0)
+        ps = getattr(self._probe_client, 'ps', None)
+        if ps is None:
+            return None
+        try:
+            models = _field(ps(), 'models') or []
+        except Exception:
+            return False
+        return any(
+            self.model_name in (_field(model, 'name'), _field(model, 'model'))
+            for model in models
+        )
+    
+    def idle_seconds(self) -> Optional[float]:
+        """Seconds since the model was last used, None if it never was."""
+        with self._stats_lock:
+            if self._last_used is None:
+                return None
+            return time.monotonic() - self._last_used
+    
+    def expected_first_token_ms(self) -> Optional[float]:
+        """Median time to first token of recent streams, else the priming time."""
+        with self._stats_lock:
+            samples = sorted(self._first_tokens)
+            if samples:
+                return round(samples[len(samples) // 2], 1)
+            return round(self._prime_ms, 1) if self._prime_ms is not None else None
+    
+    @staticmethod
+    def _prompt_eval(chunk) -> Optional[Dict]:
+        """Prompt evaluation fields of a final response chunk, durations in ms."""
+        count = _field(chunk, 'prompt_eval_count')
+        duration = _field(chunk, 'prompt_eval_duration')
+        if count is None and duration is None:
+            return None
+        return {
+            'prompt_tokens': count or 0,
+            'prompt_eval_ms': (duration or 0) / 1e6,
+            'load_ms': (_field(chunk, 'load_duration') or 0) / 1e6
+        }
+    
+    def _record(self, chunk):
+        """Record Ollama's counters from the final chunk of a generation."""
+        if not _field(chunk, 'done'):
+            return
+        metrics.record_generation(
+            _field(chunk, 'eval_count'),
+            _field(chunk, 'eval_duration'),
+            _field(chunk, 'prompt_eval_count'),
+            _field(chunk, 'prompt_eval_duration'),
+            _field(chunk, 'total_duration')
+        )
+        stats = self._prompt_eval(chunk)
+        with self._stats_lock:
+            self._last_used = time.monotonic()
+            if stats is not None:
+                self._prompt_evals.append(stats)
+    
+    def _first_token(self, started: float):
+        elapsed = time.perf_counter() - started
+        metrics.record('llm_first_token', elapsed)
+        with self._stats_lock:
+            self._first_tokens.append(elapsed * 1000)
+    
+    def _observe(self, stream: Iterable, started: float) -> Iterator:
+        """Pass chunks through, recording time to first token and the final stats."""
+        first = True
+        try:
+            for chunk in stream:
+                if first:
+                    first = False
+                    self._first_token(started)
+                self._record(chunk)
+                yield chunk
+        finally:
+            # Ends the HTTP response, which is how Ollama learns to stop
+            _close(stream)
+    
+    def last_prompt_eval(self) -> Optional[Dict]:
+        """Prompt evaluation stats of the most recent generation."""
+        with self._stats_lock:
+            return self._prompt_evals[-1] if self._prompt_evals else None
+    
+    def prompt_stats(self) -> Dict:
+        """
+        Prompt evaluation over recent generations. A warm prefix cache shows
+        up as prompt_eval_ms well below the cold (first) request.
+        """
+        with self._stats_lock:
+            evals = list(self._prompt_evals)
+        if not evals:
+            return {'generations': 0, 'keep_alive': self.keep_alive}
+        times = sorted(e['prompt_eval_ms'] for e in evals)
+        return {
+            'generations': len(evals),
+            'keep_alive': self.keep_alive,
+            'prompt_tokens_avg': round(sum(e['prompt_tokens'] for e in evals) / len(evals), 1),
+            'prompt_eval_ms': {
+                'last': round(evals[-1]['prompt_eval_ms'], 1),
+                'p50': round(times[len(times) // 2], 1),
+                'avg': round(sum(times) / len(times), 1),
+                'max': round(times[-1], 1)
+            },
+            'load_ms_last': round(evals[-1]['load_ms'], 1)
+        }
+    
+    def error_message(self, e: Exception) -> str:
+        """User-facing text for a failed generation."""
+        return f"Error generating interpretation: {str(e)}\n\nPlease ensure Ollama is running and the model '{self.model_name}' is installed."
+    
+    def _messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Chat messages for a reading prompt."""
+        return [
+            {
+                'role': 'system',
+                'content': SYSTEM_PROMPT
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
     
     def _build_prompt(
         self, 
         cards: List[Dict[str, any]], 
         spread_type: int,
-        card_meanings: Dict[str, Dict[str, str]]
+        card_meanings: Dict[int, Mapping[str, str]]
     ) -> str:
         """Build the prompt for the LLM based on the card spread."""
-        
-        # Position labels for different spreads
-        spread_labels = {
-            1: ["Single Card"],
-            3: ["Past", "Present", "Future"],
-            6: ["Past", "Present", "Future", "Hidden Influences", "External Factors", "Outcome"],
-            9: [
-                "Present Situation", "Immediate Influence", "Hidden Influences",
-                "Past Influence", "Recent Past", "Future Influence",
-                "The Querent's Role", "External Factors", "Outcome/Advice"
-            ],
-            10: [
-                "Present Position", "Immediate Influence", "Goal or Destiny",
-                "Distant Past", "Recent Past", "Future Influence",
-                "The Questioner", "External Factors", "Inner Emotions", "Final Result"
-            ],
-            12: [
-                "Past Influences", "Present Situation", "Immediate Influences",
-                "Distant Past", "Recent Past", "Near Future", "Far Future",
-                "External Influences", "Emotional State", "The Querent's Role",
-                "Outcome/Advice", "Final Outcome"
-            ]
-        }
-        
-        labels = spread_labels.get(spread_type, [f"Position {i+1}" for i in range(len(cards))])
-        
-        prompt = f"Please interpret this {spread_type}-card tarot reading:\n\n"
-        
-        # Add each card with its position and meaning
-        for i, card_obj in enumerate(cards):
-            card_name = card_obj['card']
-            is_reversed = card_obj['reversed']
-            position = labels[i] if i < len(labels) else f"Position {i+1}"
-            
-            orientation = "Reversed" if is_reversed else "Upright"
-            meaning_key = 'reversed' if is_reversed else 'upright'
-            
-            card_meaning = card_meanings.get(card_name.lower(), {}).get(
-                meaning_key, 
-                "No specific meaning available"
-            )
-            
-            prompt += f"**{position}**: {card_name} ({orientation})\n"
-            prompt += f"Meaning: {card_meaning}\n\n"
-        
-        prompt += "\nProvide a cohesive interpretation that:\n"
-        prompt += "1. Considers how the cards relate to each other\n"
-        prompt += "2. Takes into account the position meanings in the spread\n"
-        prompt += "3. Offers practical guidance and spiritual insight\n"
-        prompt += "4. Addresses the overall narrative of the reading\n"
-        
-        return prompt
+        with metrics.timer('prompt_build'):
+            return template_for(spread_type, len(cards)).render(cards, card_meanings)
@@ -0,0 +1,299 @@
+"""
+Per-stage latency and throughput metrics in Prometheus text format.
+
+Services call record() / timer() for each stage of a reading; the values
+go into process-wide histograms served at /api/metrics. While a request
+has a timing collector active (see collect_timings), the same stages are
+also gathered for its Server-Timing header.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+REAL_TIME_FACTOR_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f'{self.name}{_labels(zip(self.labelnames, key))} {_number(value)}'
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def _samples(self):
+        with self._lock:
+            snapshot = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total, count) in snapshot:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(pairs + [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(pairs)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(pairs)} {count}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'tarot_stage_seconds',
+    'Time spent in each stage of a reading.',
+    LATENCY_BUCKETS, ['stage']
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    'tarot_llm_tokens_per_second',
+    'Ollama generation speed (eval_count / eval_duration).',
+    TOKENS_PER_SECOND_BUCKETS
+)
+LLM_TOKENS = Counter(
+    'tarot_llm_tokens_total',
+    'Tokens processed by Ollama.',
+    ['kind']
+)
+TTS_REAL_TIME_FACTOR = Histogram(
+    'tarot_tts_real_time_factor',
+    'Piper synthesis time divided by the duration of the audio produced.',
+    REAL_TIME_FACTOR_BUCKETS
+)
+TTS_AUDIO_SECONDS = Counter(
+    'tarot_tts_audio_seconds_total',
+    'Seconds of audio synthesized by Piper.'
+)
+REQUEST_SECONDS = Histogram(
+    'tarot_request_seconds',
+    'Time from request start until the last byte of the response was sent.',
+    LATENCY_BUCKETS, ['endpoint', 'status']
+)
+RESPONSE_BYTES = Histogram(
+    'tarot_response_bytes',
+    'Size of response bodies sent.',
+    BYTES_BUCKETS, ['endpoint']
+)
+BYTES_SENT = Counter(
+    'tarot_bytes_sent_total',
+    'Response body bytes sent.',
+    ['endpoint']
+)
+CANCELLED = Counter(
+    'tarot_cancelled_total',
+    'Work stopped because its client disconnected.',
+    ['kind']
+)
+CANCELLED_SECONDS = Counter(
+    'tarot_cancelled_elapsed_seconds_total',
+    'How long cancelled work had been running (or queued) when it was stopped.',
+    ['kind']
+)
+
+REGISTRY: List[_Metric] = [
+    STAGE_SECONDS, LLM_TOKENS_PER_SECOND, LLM_TOKENS, TTS_REAL_TIME_FACTOR,
+    TTS_AUDIO_SECONDS, REQUEST_SECONDS, RESPONSE_BYTES, BYTES_SENT,
+    CANCELLED, CANCELLED_SECONDS
+]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# --- Per-request timings ---
+
+_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = \
+    contextvars.ContextVar('tarot_timings', default=None)
+
+
+def collect_timings():
+    """Start gathering stage timings for the current request; returns a reset token."""
+    return _timings.set([])
+
+
+def collected_timings() -> List[Tuple[str, float]]:
+    return list(_timings.get() or [])
+
+
+def stop_collecting(token):
+    _timings.reset(token)
+
+
+def server_timing(timings: List[Tuple[str, float]]) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    return ', '.join(f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in timings)
+
+
+def record(stage: str, seconds: float):
+    """Observe a stage duration, and add it to the current request's timings."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def record_generation(eval_count: Optional[int], eval_duration_ns: Optional[int],
+                      prompt_eval_count: Optional[int], prompt_eval_duration_ns: Optional[int],
+                      total_duration_ns: Optional[int]):
+    """Observe Ollama's counters from the final chunk of a generation."""
+    if prompt_eval_duration_ns:
+        record('llm_prompt_eval', prompt_eval_duration_ns / 1e9)
+    if total_duration_ns:
+        record('llm_generation', total_duration_ns / 1e9)
+    if prompt_eval_count:
+        LLM_TOKENS.inc(prompt_eval_count, kind='prompt')
+    if eval_count:
+        LLM_TOKENS.inc(eval_count, kind='generated')
+        if eval_duration_ns:
+            LLM_TOKENS_PER_SECOND.observe(eval_count / (eval_duration_ns / 1e9))
+
+
+def record_synthesis(seconds: float, audio_seconds: float):
+    """Observe one Piper synthesis and its real-time factor."""
+    record('tts_synthesis', seconds)
+    if audio_seconds > 0:
+        TTS_AUDIO_SECONDS.inc(audio_seconds)
+        TTS_REAL_TIME_FACTOR.observe(seconds / audio_seconds)
+
+
+def record_cancel(kind: str, elapsed: float = 0.0):
+    """Count work stopped for a departed client (llm, llm_queued, tts, tts_queued)."""
+    CANCELLED.inc(kind=kind)
+    if elapsed > 0:
+        CANCELLED_SECONDS.inc(elapsed, kind=kind)
+
+
+class CountingBody:
+    """
+    Response body wrapper that counts the bytes actually sent and records
+    the request duration once the body is finished or closed.
+    """
+
+    def __init__(self, body: Iterable[Union[bytes, str]], endpoint: str, status: int, started: float):
+        self._body = body
+        self._endpoint = endpoint
+        self._status = str(status)
+        self._started = started
+        self._sent = 0
+        self._finished = False
+
+    def __iter__(self):
+        for chunk in self._body:
+            if isinstance(chunk, str):
+                # Streamed text is encoded here (as Werkzeug would) so bytes, not characters, are counted
+                chunk = chunk.encode('utf-8')
+            self._sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            close = getattr(self._body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        observe_response(self._endpoint, self._status, self._sent, time.perf_counter() - self._started)
+
+
+def observe_response(endpoint: str, status, sent: int, seconds: float):
+    RESPONSE_BYTES.observe(sent, endpoint=endpoint)
+    BYTES_SENT.inc(sent, endpoint=endpoint)
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint, status=str(status))
@@ -0,0 +1,129 @@
+"""
+Long-lived Piper synthesis worker
+Loads the voice model once and serves synthesis requests over stdin/stdout,
+so TTSService does not pay the ONNX model load for every sentence.
+
+Protocol (one request at a time, driven by PiperWorkerPool):
+    request:  one JSON line, {"text": "...", "length_scale": 1.4} or {"ping": true}
+    response: frames of 1-byte type + 4-byte little-endian length + payload
+        b'A'  chunk of raw 16-bit mono PCM
+        b'D'  end of response (empty payload)
+        b'P'  reply to a ping (empty payload)
+        b'E'  error, payload is a UTF-8 message; ends the response
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+
+FRAME_HEADER = struct.Struct('<cI')
+
+FRAME_AUDIO = b'A'
+FRAME_DONE = b'D'
+FRAME_PONG = b'P'
+FRAME_ERROR = b'E'
+
+
+class _VoiceEngine:
+    """Synthesizes in-process with the piper-tts Python package."""
+
+    def __init__(self, model_path):
+        from piper import PiperVoice
+        self.voice = PiperVoice.load(model_path)
+
+    def synthesize(self, text, length_scale):
+        if hasattr(self.voice, 'synthesize_stream_raw'):
+            # piper-tts 1.2.x
+            yield from self.voice.synthesize_stream_raw(text, length_scale=length_scale)
+        else:
+            # piper-tts 1.3+
+            from piper import SynthesisConfig
+            config = SynthesisConfig(length_scale=length_scale)
+            for chunk in self.voice.synthesize(text, syn_config=config):
+                yield chunk.audio_int16_bytes
+
+
+class _CliEngine:
+    """Falls back to one piper CLI call per request when piper-tts is not importable."""
+
+    def __init__(self, model_path, piper_cmd):
+        self.model_path = model_path
+        self.piper_cmd = piper_cmd
+
+    def synthesize(self, text, length_scale):
+        # Log output goes to a file: a pipe nobody reads until stdout ends would
+        # block piper once it filled, while we wait on stdout
+        with tempfile.TemporaryFile() as errors:
+            proc = subprocess.Popen(
+                [self.piper_cmd, "--model", self.model_path,
+                 "--length-scale", str(length_scale),
+                 "--output-raw"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=errors
+            )
+            proc.stdin.write(text.encode('utf-8'))
+            proc.stdin.close()
+            while True:
+                chunk = proc.stdout.read1(65536)
+                if not chunk:
+                    break
+                yield chunk
+            if proc.wait() != 0:
+                errors.seek(0)
+                raise RuntimeError(errors.read().decode('utf-8', 'replace'))
+
+
+def _load_engine(model_path, piper_cmd):
+    # PIPER_WORKER_ENGINE=cli forces the piper executable (e.g. the benchmark stand-in)
+    if os.environ.get('PIPER_WORKER_ENGINE') != 'cli':
+        try:
+            return _VoiceEngine(model_path)
+        except ImportError:
+            pass
+    return _CliEngine(model_path, piper_cmd)
+
+
+def _write_frame(out, kind, payload=b''):
+    out.write(FRAME_HEADER.pack(kind, len(payload)))
+    if payload:
+        out.write(payload)
+
+
+def serve(engine, stdin, stdout):
+    """Answer requests from stdin until it is closed."""
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+            if req.get('ping'):
+                _write_frame(stdout, FRAME_PONG)
+            else:
+                for pcm in engine.synthesize(req['text'], float(req['length_scale'])):
+                    if pcm:
+                        _write_frame(stdout, FRAME_AUDIO, pcm)
+                        # Hand each chunk over immediately so callers can stream it
+                        stdout.flush()
+                _write_frame(stdout, FRAME_DONE)
+        except Exception as e:
+            _write_frame(stdout, FRAME_ERROR, str(e).encode('utf-8'))
+        stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Persistent Piper synthesis worker")
+    parser.add_argument('--model', required=True)
+    parser.add_argument('--piper-cmd', default='piper')
+    args = parser.parse_args()
+
+    engine = _load_engine(args.model, args.piper_cmd)
+    serve(engine, sys.stdin.buffer, sys.stdout.buffer)
+
+
+if __name__ == '__main__':
+    main()
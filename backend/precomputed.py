@@ -0,0 +1,286 @@
+"""
+Precomputed store of interpretations and their audio.
+
+An offline build packs finished interpretations (from bulk.py) and the
+speech for each of their sentences into one file. The server memory-maps
+it and answers matching requests straight from the mapping, without
+Ollama or Piper; anything not in the store is generated live.
+
+File layout (little-endian):
+
+    magic "TAROTPC1" | index offset (u64) | index length (u64)
+    text and audio blobs, back to back
+    JSON index: {"meta": {...}, "readings": {key: [[offset, length], ...]},
+                 "audio": {key: [offset, length, duration]}}
+
+Readings are keyed like bulk.reading_key(); a reading may have several
+variants, one of which is picked per request. Audio is keyed by sentence
+text, voice and speech rate, and is stored already encoded.
+
+Build with:
+
+    python bulk.py --daily --output daily.ndjson
+    python precomputed.py daily.ndjson --output precomputed.store
+"""
+
+import argparse
+import json
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from bulk import reading_key
+from read_aloud import SentenceSegmenter
+from tts_cache import AudioCache
+
+MAGIC = b'TAROTPC1'
+_HEADER = struct.Struct('<8sQQ')
+FORMAT_VERSION = 2  # 2: readings keyed by deck id
+
+# The app splits streamed text for /api/tts on these (App.tsx); a reading
+# served from the store arrives as one chunk, so its sentences are predictable
+_CLIENT_BOUNDARY = re.compile(r'[.?!]+|\n+')
+
+
+def client_sentences(text: str) -> List[str]:
+    """The sentences the app sends to /api/tts for a text received in one chunk."""
+    sentences = []
+    start = 0
+    for match in _CLIENT_BOUNDARY.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    rest = text[start:].strip()
+    if rest:
+        sentences.append(rest)
+    return sentences
+
+
+def spoken_sentences(text: str) -> List[str]:
+    """Every sentence worth voicing: the app's split plus the server's (read_aloud, sentence events)."""
+    segmenter = SentenceSegmenter()
+    server = segmenter.feed(text) + segmenter.flush()
+    return list(dict.fromkeys(client_sentences(text) + server))
+
+
+def audio_key(text: str, voice: str, rate: float) -> str:
+    """Audio is keyed like AudioCache, by voice file name so the store can move between machines."""
+    return AudioCache.make_key(text, os.path.basename(voice), rate)
+
+
+class PrecomputedStore:
+    """Read-only, memory-mapped view of a store file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, index_offset, index_length = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ValueError(f"Not a precomputed store: {path}")
+        index = json.loads(bytes(self._view[index_offset:index_offset + index_length]))
+        self.meta = index['meta']
+        if self.meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"store format v{self.meta.get('version')} is not v{FORMAT_VERSION}; rebuild it")
+        self._readings = index['readings']
+        self._audio = index['audio']
+        self.readings_enabled = True
+        self._lock = threading.Lock()
+        self._stats = {'reading_hits': 0, 'reading_misses': 0, 'audio_hits': 0, 'audio_misses': 0,
+                       'audio_stretched': 0}
+
+    @classmethod
+    def open(cls, path: Optional[str]) -> Optional['PrecomputedStore']:
+        """Load the store at path, or None (with a warning) if it is missing or unreadable."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            store = cls(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: could not load precomputed store {path}: {e}")
+            return None
+        print(f"✓ Precomputed store: {len(store._readings)} readings, "
+              f"{len(store._audio)} audio clips ({store.meta.get('format')})")
+        return store
+
+    def check_model(self, model: str, prompt_version: int):
+        """Stop serving text that was generated by another model or prompt."""
+        if self.meta.get('model') != model or self.meta.get('prompt_version') != prompt_version:
+            self.readings_enabled = False
+            print(f"Warning: precomputed readings were built for {self.meta.get('model')} "
+                  f"(prompt v{self.meta.get('prompt_version')}); serving them live instead")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def reading(self, cards: List[Dict], spread_type: int) -> Optional[memoryview]:
+        """UTF-8 interpretation text for a reading (a view into the mapping), or None."""
+        variants = self._readings.get(reading_key(cards, spread_type)) if self.readings_enabled else None
+        if not variants:
+            self._count('reading_misses')
+            return None
+        self._count('reading_hits')
+        offset, length = random.choice(variants)
+        return self._view[offset:offset + length]
+
+    def audio(self, text: str, rate: float, audio_format: str, sample_rate: Optional[int] = None) -> Optional[memoryview]:
+        """Encoded audio for a sentence (a view into the mapping), or None."""
+        if audio_format != self.meta.get('format') or sample_rate != self.meta.get('sample_rate'):
+            entry = None
+        else:
+            entry = self._audio.get(audio_key(text, self.meta.get('voice', ''), rate))
+        if entry is None:
+            self._count('audio_misses')
+            return None
+        self._count('audio_hits')
+        offset, length, _ = entry
+        return self._view[offset:offset + length]
+
+    def wav(self, text: str) -> Optional[Tuple[memoryview, float]]:
+        """(native-rate WAV view, length-scale it was voiced at) for a sentence, to time-stretch."""
+        if self.meta.get('format') != 'wav' or self.meta.get('sample_rate') is not None:
+            return None
+        entry = self._audio.get(audio_key(text, self.meta.get('voice', ''), self.meta['rate']))
+        if entry is None:
+            return None
+        self._count('audio_stretched')
+        offset, length, _ = entry
+        return self._view[offset:offset + length], self.meta['rate']
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'path': self.path,
+            'bytes': len(self._mmap),
+            'readings': len(self._readings),
+            'audio': len(self._audio),
+            'readings_enabled': self.readings_enabled,
+            'meta': self.meta
+        })
+        return stats
+
+
+class StoreWriter:
+    """Writes a store file; it replaces the target atomically on close()."""
+
+    def __init__(self, path: str, meta: Dict):
+        self.path = path
+        self.meta = dict(meta, version=FORMAT_VERSION)
+        self._tmp = path + '.tmp'
+        self._file = open(self._tmp, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, 0, 0))
+        self._readings = {}
+        self._audio = {}
+
+    def _append(self, data: bytes) -> int:
+        offset = self._file.tell()
+        self._file.write(data)
+        return offset
+
+    def add_reading(self, cards: List[Dict], spread_type: int, text: str):
+        data = text.encode('utf-8')
+        key = reading_key(cards, spread_type)
+        self._readings.setdefault(key, []).append([self._append(data), len(data)])
+
+    def add_audio(self, text: str, rate: float, data: bytes, duration: float):
+        key = audio_key(text, self.meta['voice'], rate)
+        if key not in self._audio:
+            self._audio[key] = [self._append(data), len(data), round(duration, 3)]
+
+    def close(self):
+        index = json.dumps({
+            'meta': self.meta,
+            'readings': self._readings,
+            'audio': self._audio
+        }, separators=(',', ':')).encode('utf-8')
+        index_offset = self._append(index)
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, index_offset, len(index)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        # A running server keeps its mapping of the old file until it restarts
+        os.replace(self._tmp, self.path)
+
+
+def _read_results(paths: List[str]):
+    """'result' records from bulk.py output files."""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') == 'result' and record.get('interpretation'):
+                    yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a precomputed store from bulk.py results")
+    parser.add_argument('inputs', nargs='+', help="NDJSON output of bulk.py")
+    parser.add_argument('--output', default='precomputed.store')
+    parser.add_argument('--model', default='llama3.2:3b', help="Model the results were generated with")
+    parser.add_argument('--voice', default='./voices/ru_RU-irina-medium.onnx')
+    parser.add_argument('--rate', type=float, default=1.4, help="Piper length-scale to voice at")
+    parser.add_argument('--format', default='wav', help="Stored audio format (wav, ulaw, alaw, opus)")
+    parser.add_argument('--sample-rate', type=int, help="Stored audio sample rate")
+    parser.add_argument('--workers', type=int, default=2, help="Piper workers")
+    parser.add_argument('--no-audio', action='store_true', help="Store text only")
+    args = parser.parse_args()
+
+    import audio_codecs
+    from llm_service import PROMPT_VERSION
+
+    audio_format = audio_codecs.negotiate(args.format)
+    sample_rate = audio_codecs.validate_rate(args.sample_rate)
+    writer = StoreWriter(args.output, {
+        'model': args.model,
+        'prompt_version': PROMPT_VERSION,
+        'voice': os.path.basename(args.voice),
+        'rate': args.rate,
+        'format': audio_format,
+        'sample_rate': sample_rate
+    })
+
+    sentences = []
+    readings = 0
+    for record in _read_results(args.inputs):
+        writer.add_reading(record['cards'], record.get('spreadType', 1), record['interpretation'])
+        sentences.extend(spoken_sentences(record['interpretation']))
+        readings += 1
+    sentences = list(dict.fromkeys(sentences))
+    print(f"{readings} readings, {len(sentences)} distinct sentences", file=sys.stderr)
+
+    if not args.no_audio and sentences:
+        from tts_service import TTSService
+
+        tts_service = TTSService(model_path=args.voice, speech_rate=args.rate, pool_size=args.workers)
+
+        def synthesize(text):
+            return audio_codecs.encode_segment(tts_service.synthesize(text), audio_format, sample_rate)
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for done, (text, (data, _, duration, _)) in enumerate(
+                zip(sentences, executor.map(synthesize, sentences)), 1
+            ):
+                writer.add_audio(text, args.rate, data, duration)
+                if done % 100 == 0:
+                    print(f"  voiced {done}/{len(sentences)}", file=sys.stderr)
+
+    writer.close()
+    print(f"Wrote {args.output} ({os.path.getsize(args.output)} bytes)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
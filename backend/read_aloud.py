@@ -0,0 +1,141 @@
+"""
+Server-side read-aloud pipeline
+Streams LLM text through a sentence segmenter into TTSService, so that
+synthesis of one sentence overlaps with generation of the next.
+"""
+
+import re
+import time
+from collections import deque
+from typing import Iterable, Iterator, List
+
+import metrics
+from framing import iter_frame
+from audio_codecs import encode_segment
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by
+# whitespace, or a run of newlines. Requiring the whitespace keeps "3.5" intact
+# and holds a trailing "." until we know the sentence has really ended.
+_BOUNDARY = re.compile(r'[.!?…]+["\'”)\]]*(?=\s)|\n+')
+
+
+class SentenceSegmenter:
+    """Incrementally splits streamed text into complete sentences."""
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return any sentences it completed."""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            sentence = self._buffer[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left once the stream has ended."""
+        rest = self._buffer.strip()
+        self._buffer = ''
+        return [rest] if rest else []
+
+
+class ReadAloudPipeline:
+    """
+    Turns a stream of LLM text into interleaved text and audio frames.
+
+    Each completed sentence is emitted as a text frame straight away and
+    submitted to the executor for synthesis; audio frames follow in
+    sentence order as soon as they are ready. A final stats frame reports
+    time to first text and time to first audio.
+    """
+
+    def __init__(self, tts_service, executor, rate=None, audio_format='wav', sample_rate=None,
+                 cancel=None):
+        """
+        Args:
+            cancel: Optional CancelToken of the request; when it trips, synthesis
+                in progress is killed and no further frames are produced
+        """
+        self.tts_service = tts_service
+        self.executor = executor
+        self.rate = rate
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.cancel = cancel
+
+    def _synthesize(self, sentence):
+        wav_data = self.tts_service.synthesize(sentence, self.rate, self.cancel)
+        return encode_segment(wav_data, self.audio_format, self.sample_rate)
+
+    def run(self, text_stream: Iterable[str]) -> Iterator[bytes]:
+        start = time.perf_counter()
+        segmenter = SentenceSegmenter()
+        pending = deque()
+        stats = {
+            'type': 'stats',
+            'sentences': 0,
+            'audio_seconds': 0.0,
+            'time_to_first_text_ms': None,
+            'time_to_first_audio_ms': None
+        }
+
+        def cancelled():
+            return self.cancel is not None and self.cancel.cancelled
+
+        def elapsed_ms():
+            return round((time.perf_counter() - start) * 1000, 1)
+
+        def submit(sentence):
+            seq = stats['sentences']
+            stats['sentences'] += 1
+            if stats['time_to_first_text_ms'] is None:
+                stats['time_to_first_text_ms'] = elapsed_ms()
+            future = self.executor.submit(self._synthesize, sentence)
+            pending.append((seq, future))
+            return iter_frame({'type': 'text', 'seq': seq, 'text': sentence})
+
+        def drain(block):
+            while pending and (block or pending[0][1].done()) and not cancelled():
+                seq, future = pending.popleft()
+                try:
+                    audio, mimetype, duration, ratio = future.result()
+                except Exception as e:
+                    yield from iter_frame({'type': 'error', 'seq': seq, 'error': str(e)})
+                    continue
+                if stats['time_to_first_audio_ms'] is None:
+                    stats['time_to_first_audio_ms'] = elapsed_ms()
+                stats['audio_seconds'] += duration
+                yield from iter_frame({
+                    'type': 'audio',
+                    'seq': seq,
+                    'mimetype': mimetype,
+                    'duration': round(duration, 3),
+                    'ratio': ratio
+                }, audio)
+
+        try:
+            for text in text_stream:
+                for sentence in segmenter.feed(text):
+                    yield from submit(sentence)
+                yield from drain(block=False)
+            if cancelled():
+                return
+            for sentence in segmenter.flush():
+                yield from submit(sentence)
+            yield from drain(block=True)
+            if cancelled():
+                return
+
+            stats['audio_seconds'] = round(stats['audio_seconds'], 3)
+            stats['total_ms'] = elapsed_ms()
+            yield from iter_frame(stats)
+        finally:
+            for _, future in pending:
+                if future.cancel():
+                    metrics.record_cancel('tts_queued')
@@ -0,0 +1,177 @@
+"""
+Replay buffers that let a dropped interpretation stream be resumed.
+
+A resumable reading is generated in the background (a SharedGeneration,
+as in interpretation_cache.py), independently of the connection that
+asked for it, and registered under a random stream id. A client whose
+connection dropped reconnects with that id and the offset it got to: the
+text it missed is replayed from the buffer and the rest follows live from
+the same generation, so Ollama is never asked twice.
+
+Buffers are dropped a TTL after their generation finishes, and the
+oldest finished ones are evicted early when all buffers together exceed a
+memory cap. A running buffer is never evicted, so it can always be resumed
+or stopped (DELETE) until it finishes; how many run at once is already
+bounded by the LLM scheduler.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from cancellation import CancelToken
+from interpretation_cache import SharedGeneration
+
+
+class ReplayBuffer:
+    """One resumable reading: its shared generation plus what is needed to replay it."""
+
+    def __init__(self, stream_id: str, text_stream: Iterable[str], cancel: CancelToken,
+                 cards: List[Dict], spread_type: int, error_message: Callable[[Exception], str] = str):
+        self.stream_id = stream_id
+        self.cancel = cancel
+        self.cards = cards
+        self.spread_type = spread_type
+        self.created = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.size = 0
+        self._counted = 0
+        # Started last: it may finish (and call _finished) straight away
+        self.generation = SharedGeneration(lambda: text_stream, self._finished, error_message)
+
+    def _finished(self, generation: SharedGeneration):
+        self.finished_at = time.monotonic()
+
+    def measure(self) -> int:
+        """UTF-8 size of the text buffered so far (counted incrementally)."""
+        chunks = self.generation.chunks
+        for chunk in chunks[self._counted:len(chunks)]:
+            self.size += len(chunk.encode('utf-8'))
+            self._counted += 1
+        return self.size
+
+    def text(self, offset: int = 0) -> Iterator[bytes]:
+        """
+        The interpretation as UTF-8 from byte `offset` on: the buffered part
+        at once, then live until the generation ends.
+        """
+        skip = offset
+        for chunk in self.generation.subscribe():
+            data = chunk.encode('utf-8')
+            if skip >= len(data):
+                skip -= len(data)
+                continue
+            yield data[skip:] if skip else data
+            skip = 0
+
+
+class StreamRegistry:
+    """
+    Replay buffers by stream id, bounded by a TTL and a total size.
+
+    Finished buffers expire `ttl` seconds after their generation ends,
+    checked on every call and by a background thread while any are held.
+    When the buffers together exceed `max_bytes`, finished ones are evicted
+    oldest first; running ones stay until they finish, even over the cap.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_bytes: int = 16 * 1024 * 1024,
+                 error_message: Callable[[Exception], str] = str):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.error_message = error_message
+        self._lock = threading.Condition()
+        self._buffers: 'OrderedDict[str, ReplayBuffer]' = OrderedDict()
+        self._reaper = None
+
+        self.started = 0
+        self.resumed = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def start(self, text_stream: Iterable[str], cancel: CancelToken,
+              cards: List[Dict], spread_type: int) -> ReplayBuffer:
+        """
+        Generate text_stream into a new replay buffer in the background.
+
+        Args:
+            text_stream: The interpretation text (already admitted); it should
+                end when `cancel` trips
+            cancel: Stops the generation (see cancel())
+            cards: The reading's normalized cards, for replaying framed events
+            spread_type: The reading's spread type
+        """
+        stream_id = secrets.token_urlsafe(12)
+        buffer = ReplayBuffer(stream_id, text_stream, cancel, cards, spread_type, self.error_message)
+        with self._lock:
+            self._buffers[stream_id] = buffer
+            self.started += 1
+            self._purge()
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name='stream-reaper', daemon=True)
+                self._reaper.start()
+            self._lock.notify()
+        return buffer
+
+    def get(self, stream_id: str) -> Optional[ReplayBuffer]:
+        """The buffer for stream_id, or None if unknown, expired or evicted."""
+        with self._lock:
+            self._purge()
+            buffer = self._buffers.get(stream_id)
+            if buffer is not None:
+                self.resumed += 1
+            return buffer
+
+    def cancel(self, stream_id: str) -> bool:
+        """Stop a stream's generation and forget it; False if it is unknown."""
+        with self._lock:
+            buffer = self._buffers.pop(stream_id, None)
+        if buffer is None:
+            return False
+        buffer.cancel.cancel()
+        return True
+
+    def _reap(self):
+        """Drop expired buffers even when no requests come in to do it."""
+        interval = max(1.0, min(self.ttl, 30.0))
+        with self._lock:
+            while True:
+                while not self._buffers:
+                    self._lock.wait()
+                self._lock.wait(interval)
+                self._purge()
+
+    def _purge(self):
+        """Drop expired buffers, then evict until under the size cap (caller holds the lock)."""
+        now = time.monotonic()
+        for stream_id, buffer in list(self._buffers.items()):
+            if buffer.finished_at is not None and now - buffer.finished_at > self.ttl:
+                del self._buffers[stream_id]
+                self.expired += 1
+        total = sum(buffer.measure() for buffer in self._buffers.values())
+        while total > self.max_bytes and len(self._buffers) > 1:
+            # Running buffers stay: their generation could not be resumed or stopped otherwise
+            victim = next((buffer for buffer in self._buffers.values() if buffer.finished_at is not None), None)
+            if victim is None:
+                break
+            del self._buffers[victim.stream_id]
+            total -= victim.size
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._purge()
+            running = sum(1 for buffer in self._buffers.values() if buffer.finished_at is None)
+            return {
+                'streams': len(self._buffers),
+                'running': running,
+                'bytes': sum(buffer.size for buffer in self._buffers.values()),
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'started': self.started,
+                'resumed': self.resumed,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
@@ -0,0 +1,193 @@
+"""
+Sentence-framed events for streamed interpretations.
+
+Coalesces the token stream from the LLM into one event per complete
+sentence, so a client receives a handful of frames it can speak straight
+away instead of thousands of token-sized writes. Events are serialized as
+NDJSON (one JSON object per line) or as Server-Sent Events:
+
+    {"type": "position", "index": 0, "label": "Past", "card": "The Fool", "reversed": false}
+    {"type": "sentence", "seq": 0, "text": "...", "position": 0}
+    {"type": "done", "sentences": 12, "time_to_first_sentence_ms": 840.2, ...}
+
+A "position" marker is sent when the interpretation starts talking about
+another card of the reading (the first sentence naming it).
+"""
+
+import json
+import re
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from read_aloud import SentenceSegmenter
+
+FRAMINGS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+
+def negotiate_framing(requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Framing from the request body ("framing") or the Accept header; None
+    keeps the plain-text token stream. Raises ValueError for unknown names.
+    """
+    if requested:
+        requested = requested.lower()
+        if requested in ('text', 'plain'):
+            return None
+        if requested not in FRAMINGS:
+            raise ValueError(f"Unsupported framing '{requested}' (use one of: {', '.join(FRAMINGS)})")
+        return requested
+    accept = (accept or '').lower()
+    for name, mimetype in FRAMINGS.items():
+        if mimetype in accept:
+            return name
+    return None
+
+
+class SentenceEvents:
+    """Turns streamed text into sentence, position and stats events."""
+
+    def __init__(self, cards: List[Dict], labels: List[str]):
+        """
+        Args:
+            cards: The reading's card objects ('card', optional 'reversed')
+            labels: Position label of each card in the spread
+        """
+        self.cards = cards
+        self.labels = labels
+        self._patterns = [
+            re.compile(r'\b' + re.escape(card_obj['card']) + r'\b', re.IGNORECASE)
+            for card_obj in cards
+        ]
+        self._segmenter = SentenceSegmenter()
+        self._position = None
+        self._announced = set()
+        self._start = time.perf_counter()
+        self.stats = {
+            'type': 'done',
+            'sentences': 0,
+            'characters': 0,
+            'chunks': 0,
+            'positions': 0,
+            'time_to_first_sentence_ms': None
+        }
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+    def _match_position(self, sentence: str) -> Optional[int]:
+        """Index of the first card of the reading named in the sentence."""
+        best = None
+        for index, pattern in enumerate(self._patterns):
+            match = pattern.search(sentence)
+            if match and (best is None or match.start() < best[0]):
+                best = (match.start(), index)
+        return best[1] if best else None
+
+    def _sentence(self, sentence: str) -> List[Dict]:
+        events = []
+        index = self._match_position(sentence)
+        if index is not None and index != self._position:
+            self._position = index
+            if index not in self._announced:
+                self._announced.add(index)
+                self.stats['positions'] += 1
+            card_obj = self.cards[index]
+            events.append({
+                'type': 'position',
+                'index': index,
+                'label': self.labels[index] if index < len(self.labels) else f"Position {index+1}",
+                'card': card_obj['card'],
+                'reversed': bool(card_obj.get('reversed', False))
+            })
+        if self.stats['time_to_first_sentence_ms'] is None:
+            self.stats['time_to_first_sentence_ms'] = self._elapsed_ms()
+        events.append({
+            'type': 'sentence',
+            'seq': self.stats['sentences'],
+            'text': sentence,
+            'position': self._position
+        })
+        self.stats['sentences'] += 1
+        self.stats['characters'] += len(sentence)
+        return events
+
+    def feed(self, text: str) -> List[Dict]:
+        """Add a chunk of streamed text; returns the events it completed."""
+        self.stats['chunks'] += 1
+        events = []
+        for sentence in self._segmenter.feed(text):
+            events.extend(self._sentence(sentence))
+        return events
+
+    def finish(self) -> List[Dict]:
+        """Flush the last partial sentence and return it with the stats event."""
+        events = []
+        for sentence in self._segmenter.flush():
+            events.extend(self._sentence(sentence))
+        self.stats['total_ms'] = self._elapsed_ms()
+        events.append(dict(self.stats))
+        return events
+
+
+def encode_event(event: Dict, framing: str) -> bytes:
+    """Serialize one event as an NDJSON line or an SSE message."""
+    data = json.dumps(event, ensure_ascii=False)
+    if framing == 'sse':
+        lines = [f"event: {event['type']}"]
+        if 'seq' in event:
+            lines.append(f"id: {event['seq']}")
+        lines.append(f"data: {data}")
+        return ('\n'.join(lines) + '\n\n').encode('utf-8')
+    return (data + '\n').encode('utf-8')
+
+
+def from_sentence(events: List[Dict], seq: int) -> List[Dict]:
+    """
+    Events of sentences from seq on, for a resumed stream. A position
+    marker always comes just before its sentence, so it goes with it.
+    """
+    if not seq:
+        return events
+    kept = []
+    for index, event in enumerate(events):
+        sentence = events[index + 1] if event['type'] == 'position' else event
+        if sentence['type'] == 'sentence' and sentence['seq'] < seq:
+            continue
+        kept.append(event)
+    return kept
+
+
+def iter_events(text_stream: Iterable[str], cards: List[Dict], labels: List[str],
+                framing: str, resume_seq: int = 0) -> Iterator[bytes]:
+    """
+    Encoded sentence events for a text stream, ending with the stats event.
+    With resume_seq, sentences before it (already delivered) are skipped.
+    """
+    events = SentenceEvents(cards, labels)
+    try:
+        for text in text_stream:
+            for event in from_sentence(events.feed(text), resume_seq):
+                yield encode_event(event, framing)
+        for event in from_sentence(events.finish(), resume_seq):
+            yield encode_event(event, framing)
+    finally:
+        close = getattr(text_stream, 'close', None)
+        if close is not None:
+            close()
+
+
+async def aiter_events(text_stream: AsyncIterator[str], cards: List[Dict], labels: List[str],
+                       framing: str) -> AsyncIterator[bytes]:
+    """iter_events() for an async text stream (ASGI server)."""
+    events = SentenceEvents(cards, labels)
+    try:
+        async for text in text_stream:
+            for event in events.feed(text):
+                yield encode_event(event, framing)
+        for event in events.finish():
+            yield encode_event(event, framing)
+    finally:
+        await text_stream.aclose()
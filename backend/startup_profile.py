@@ -0,0 +1,109 @@
+"""
+Cold-start profile of the backend, checked against a time budget.
+
+Imports app.py in a fresh interpreter under `python -X importtime` (with
+the background warm-up off) and reports where the import time went: each
+backend module, and each third-party package summed over its submodules.
+It then builds the lazily constructed services (card meanings, LLM, TTS)
+one by one and reports how long each took, and which heavy packages the
+import alone pulled in. Exits with status 1 when the import took longer
+than the budget, so cold start can be held to it in CI:
+
+    python startup_profile.py
+    python startup_profile.py --budget-ms 300 --top 15
+    python startup_profile.py --no-init        # import only
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Packages only some endpoints need; none should load while importing the backend
+HEAVY = ('ollama', 'httpx', 'pydantic', 'requests', 'bs4')
+
+CHILD = """
+import json, sys
+import app
+loaded = [name for name in {heavy!r} if name in sys.modules]
+if {init!r}:
+    for service in app.SERVICES.values():
+        try:
+            service.get()
+        except Exception:
+            pass
+report = app.startup_report()
+report['loaded_at_import'] = loaded
+print('STARTUP ' + json.dumps(report))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def breakdown(rows: List[Tuple[str, int, int]], top: int) -> Dict:
+    """Import milliseconds of backend modules (cumulative) and third-party packages (summed self time)."""
+    local = {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith('.py')}
+    modules = {}
+    packages = defaultdict(int)
+    for name, self_us, cumulative_us in rows:
+        root = name.split('.')[0]
+        if root in local:
+            modules[name] = cumulative_us
+        else:
+            packages[root] += self_us
+
+    def ranked(times):
+        best = sorted(times.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {name: round(us / 1000, 1) for name, us in best}
+
+    return {'backend_modules': ranked(modules), 'packages': ranked(packages)}
+
+
+def profile(init: bool = True, top: int = 10) -> Dict:
+    """Import the backend in a child interpreter and return its startup report with the breakdown."""
+    env = dict(os.environ, WARMUP='0')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD.format(heavy=HEAVY, init=init)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith('STARTUP ')]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"Importing the backend failed:\n{result.stderr[-2000:]}")
+    report = json.loads(lines[-1][len('STARTUP '):])
+    report.update(breakdown(parse_importtime(result.stderr), top))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Where the backend's cold start goes, against a budget")
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 500)),
+                        help="Most milliseconds importing app.py may take (default STARTUP_BUDGET_MS or 500)")
+    parser.add_argument('--top', type=int, default=10, help="Modules and packages to list")
+    parser.add_argument('--no-init', action='store_true', help="Do not build the services")
+    args = parser.parse_args()
+
+    report = profile(init=not args.no_init, top=args.top)
+    report['budget_ms'] = args.budget_ms
+    report['within_budget'] = report['import_ms'] <= args.budget_ms
+    print(json.dumps(report, indent=2))
+    if not report['within_budget']:
+        print(f"Over budget: import took {report['import_ms']} ms (budget {args.budget_ms} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
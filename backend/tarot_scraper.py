@@ -1,14 +1,53 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Card meanings: the deck's built-in meanings, overridden by a local JSON
+cache that an offline refresh fills from a web source.
+
+Serving never touches the network. Refresh the cache with:
+
+    python tarot_scraper.py --source 'https://example.com/meanings/{slug}'
+
+All 78 cards are fetched concurrently over one pooled HTTP session,
+revalidated with ETag/If-Modified-Since on later runs, and written into
+the cache file in a single atomic replace. A running server picks the new
+meanings up when it is restarted.
+"""
+
+import argparse
+import re
+import sys
 import json
 import os
-from typing import Dict, Optional
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from deck import DECK, Card, lookup
+
+if TYPE_CHECKING:
+    import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, the atomic rename still applies
+    fcntl = None
+
+# Cache file entry holding the HTTP validators (ETag, Last-Modified) of each
+# refreshed card; not a card name, so lookups never hit it
+VALIDATORS_KEY = '_http'
 
 class TarotScraper:
     """Scrapes tarot card meanings from the web and caches them locally."""
     
     def __init__(self, cache_file='tarot_cache.json'):
+        """
+        Args:
+            cache_file: Path of the JSON cache, written only by refresh()
+        """
         self.cache_file = cache_file
+        self._lock = threading.Lock()
         self.cache = self._load_cache()
     
     def _load_cache(self) -> Dict:
@@ -16,190 +55,328 @@ class TarotScraper:
         if os.path.exists(self.cache_file):
             try:
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    cache = json.load(f)
             except Exception as e:
                 print(f"Error loading cache: {e}")
                 return {}
+            # Older versions copied the built-in meanings in; drop those so the deck's
+            # own (with their pre-rendered prompt lines) are used instead
+            for key, meaning in list(cache.items()):
+                if key == VALIDATORS_KEY:
+                    continue
+                card = lookup(key)
+                if card is not None and card.key == key and meaning == dict(card.meanings):
+                    del cache[key]
+            return cache
         return {}
     
-    def _save_cache(self):
-        """Save tarot card meanings to cache file."""
+    def _write_atomic(self, data: Dict):
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tarot_cache.', suffix='.tmp')
         try:
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(self.cache, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving cache: {e}")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.cache_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _file_lock(self):
+        """Exclusive lock shared by every process using this cache file."""
+        return _FileLock(self.cache_file + '.lock')
+    
+    def refresh(self, refresher: 'MeaningRefresher', cards: Iterable[Card] = DECK) -> Dict:
+        """
+        Fetch fresh meanings for cards and swap them into the cache.
+        
+        Everything is fetched first; the results then replace the cache
+        file in one atomic rename (merged with entries other processes
+        wrote meanwhile) and the in-memory cache in one assignment, so
+        readers see either all old or all new meanings.
+        
+        Returns:
+            dict: refresh stats (fetched, unchanged, failed, elapsed_s, ...)
+        """
+        with self._lock:
+            validators = dict(self.cache.get(VALIDATORS_KEY) or {})
+            current = dict(self.cache)
+        meanings, validators, stats = refresher.run(cards, current, validators)
+        
+        with self._file_lock():
+            merged = self._load_cache()
+            merged.update(meanings)
+            merged[VALIDATORS_KEY] = validators
+            self._write_atomic(merged)
+        with self._lock:
+            self.cache = merged
+        return stats
     
-    def get_card_meaning(self, card_name: str, reversed: bool = False) -> Dict[str, str]:
+    def get_card_meaning(self, card: Union[str, Card], reversed: bool = False) -> Mapping[str, str]:
         """
         Get the meaning of a tarot card.
         
         Args:
-            card_name: Name of the card (e.g., "The Fool", "Ace of Cups")
+            card: Deck card, or its name (e.g., "The Fool", "Ace of Cups")
             reversed: Whether the card is reversed
             
         Returns:
             Dictionary with 'upright' and 'reversed' meanings
         """
-        cache_key = card_name.lower()
+        if isinstance(card, str):
+            card = lookup(card) or card
+        if isinstance(card, Card):
+            # Cached meanings override the deck's own; those are never copied into the cache
+            meaning = self.cache.get(card.key)
+            return card.meanings if meaning is None else meaning
         
-        # Check cache first
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-        
-        # If not in cache, use fallback meanings
-        meaning = self._get_fallback_meaning(card_name)
-        
-        # Cache the result
-        self.cache[cache_key] = meaning
-        self._save_cache()
-        
-        return meaning
+        # A card outside the deck (the API rejects these): a generic meaning
+        return self._get_fallback_meaning(card)
     
-    def _get_fallback_meaning(self, card_name: str) -> Dict[str, str]:
+    def _get_fallback_meaning(self, card_name: str) -> Mapping[str, str]:
         """
         Provide fallback meanings for tarot cards.
         These are basic interpretations that will be used if web scraping fails.
         """
-        # Basic meanings for major arcana
-        major_arcana_meanings = {
-            "the fool": {
-                "upright": "New beginnings, innocence, spontaneity, free spirit, adventure",
-                "reversed": "Recklessness, taken advantage of, inconsideration, naivety"
-            },
-            "the magician": {
-                "upright": "Manifestation, resourcefulness, power, inspired action, skill",
-                "reversed": "Manipulation, poor planning, untapped talents, illusion"
-            },
-            "the high priestess": {
-                "upright": "Intuition, sacred knowledge, divine feminine, subconscious mind",
-                "reversed": "Secrets, disconnected from intuition, withdrawal, silence"
-            },
-            "the empress": {
-                "upright": "Femininity, beauty, nature, nurturing, abundance, creativity",
-                "reversed": "Creative block, dependence on others, smothering, emptiness"
-            },
-            "the emperor": {
-                "upright": "Authority, establishment, structure, father figure, control",
-                "reversed": "Domination, excessive control, lack of discipline, inflexibility"
-            },
-            "the hierophant": {
-                "upright": "Spiritual wisdom, religious beliefs, conformity, tradition, institutions",
-                "reversed": "Personal beliefs, freedom, challenging the status quo, rebellion"
-            },
-            "the lovers": {
-                "upright": "Love, harmony, relationships, values alignment, choices",
-                "reversed": "Self-love, disharmony, imbalance, misalignment of values"
-            },
-            "the chariot": {
-                "upright": "Control, willpower, success, action, determination, victory",
-                "reversed": "Self-discipline, opposition, lack of direction, aggression"
-            },
-            "strength": {
-                "upright": "Strength, courage, persuasion, influence, compassion, inner power",
-                "reversed": "Inner strength, self-doubt, low energy, raw emotion, insecurity"
-            },
-            "the hermit": {
-                "upright": "Soul searching, introspection, being alone, inner guidance, solitude",
-                "reversed": "Isolation, loneliness, withdrawal, paranoia, exile"
-            },
-            "wheel of fortune": {
-                "upright": "Good luck, karma, life cycles, destiny, turning point, change",
-                "reversed": "Bad luck, resistance to change, breaking cycles, setbacks"
-            },
-            "justice": {
-                "upright": "Justice, fairness, truth, cause and effect, law, accountability",
-                "reversed": "Unfairness, lack of accountability, dishonesty, legal issues"
-            },
-            "the hanged man": {
-                "upright": "Pause, surrender, letting go, new perspectives, sacrifice",
-                "reversed": "Delays, resistance, stalling, indecision, stagnation"
-            },
-            "death": {
-                "upright": "Endings, change, transformation, transition, letting go, release",
-                "reversed": "Resistance to change, personal transformation, inner purging"
-            },
-            "temperance": {
-                "upright": "Balance, moderation, patience, purpose, meaning, harmony",
-                "reversed": "Imbalance, excess, self-healing, re-alignment, extremes"
-            },
-            "the devil": {
-                "upright": "Shadow self, attachment, addiction, restriction, sexuality, materialism",
-                "reversed": "Releasing limiting beliefs, exploring dark thoughts, detachment"
-            },
-            "the tower": {
-                "upright": "Sudden change, upheaval, chaos, revelation, awakening, disruption",
-                "reversed": "Personal transformation, fear of change, averting disaster"
-            },
-            "the star": {
-                "upright": "Hope, faith, purpose, renewal, spirituality, inspiration, serenity",
-                "reversed": "Lack of faith, despair, self-trust, disconnection, discouragement"
-            },
-            "the moon": {
-                "upright": "Illusion, fear, anxiety, subconscious, intuition, dreams",
-                "reversed": "Release of fear, repressed emotion, inner confusion, clarity"
-            },
-            "the sun": {
-                "upright": "Positivity, fun, warmth, success, vitality, joy, confidence",
-                "reversed": "Inner child, feeling down, overly optimistic, unrealistic expectations"
-            },
-            "judgement": {
-                "upright": "Judgement, rebirth, inner calling, absolution, reflection, reckoning",
-                "reversed": "Self-doubt, inner critic, ignoring the call, lack of self-awareness"
-            },
-            "the world": {
-                "upright": "Completion, integration, accomplishment, travel, fulfillment, success",
-                "reversed": "Seeking personal closure, short-cuts, delays, incomplete goals"
-            }
-        }
-        
-        # Basic suit meanings
-        suit_meanings = {
-            "cups": "emotions, feelings, relationships, connections",
-            "pentacles": "material world, finances, career, manifestation",
-            "swords": "thoughts, intellect, communication, conflict",
-            "wands": "inspiration, energy, action, passion, creativity"
-        }
-        
-        card_lower = card_name.lower()
-        
-        # Check if it's a major arcana card
-        if card_lower in major_arcana_meanings:
-            return major_arcana_meanings[card_lower]
-        
-        # For minor arcana, generate basic meaning based on suit and number
-        for suit, suit_meaning in suit_meanings.items():
-            if suit in card_lower:
-                upright = f"This card relates to {suit_meaning}. "
-                reversed = f"Blocked or internalized {suit_meaning}. "
-                
-                if "ace" in card_lower:
-                    upright += "A new beginning or opportunity in this area."
-                    reversed += "Missed opportunity or delayed start."
-                elif "page" in card_lower:
-                    upright += "A message, new learning, or youthful energy."
-                    reversed += "Immaturity, lack of commitment, or delayed news."
-                elif "knight" in card_lower:
-                    upright += "Action, movement, pursuit of goals."
-                    reversed += "Hasty action, delays, or frustration."
-                elif "queen" in card_lower:
-                    upright += "Nurturing, mature feminine energy, mastery."
-                    reversed += "Dependency, manipulation, or self-care needed."
-                elif "king" in card_lower:
-                    upright += "Mastery, control, mature masculine energy."
-                    reversed += "Domination, control issues, or lack of authority."
-                else:
-                    # Numbered cards
-                    upright += "Development and progression in this area."
-                    reversed += "Challenges or setbacks in this area."
-                
-                return {
-                    "upright": upright,
-                    "reversed": reversed
-                }
+        card = lookup(card_name)
+        if card is not None:
+            return card.meanings
         
         # Default fallback
         return {
             "upright": f"{card_name} represents an important aspect of your reading that requires reflection.",
             "reversed": f"{card_name} reversed suggests internal processing or blocked energy in this area."
         }
+
+
+def parse_meaning(html: str) -> Optional[Dict[str, str]]:
+    """
+    Upright and reversed meanings from a card page.
+    
+    Takes the first paragraph after a heading mentioning "Upright" and the
+    first after one mentioning "Reversed" (the layout most tarot sites use).
+    
+    Returns:
+        Dictionary with 'upright' and 'reversed', or None if either is missing
+    """
+    # Only the offline refresh parses pages, so the server never imports these
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    found = {}
+    for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        title = heading.get_text(' ', strip=True).lower()
+        orientation = 'reversed' if 'reversed' in title else 'upright' if 'upright' in title else None
+        if orientation is None or orientation in found:
+            continue
+        for sibling in heading.find_all_next(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+            if sibling.name != 'p':
+                break
+            text = re.sub(r'\s+', ' ', sibling.get_text(' ', strip=True))
+            if text:
+                found[orientation] = text
+                break
+    if 'upright' not in found or 'reversed' not in found:
+        return None
+    return {'upright': found['upright'], 'reversed': found['reversed']}
+
+
+class _HostLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart, across threads."""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = {}
+        self._turns = {}
+    
+    def wait(self, host: str):
+        with self._lock:
+            turn = self._turns.setdefault(host, threading.Lock())
+        # One waiter per host at a time, and the next one is timed from when
+        # this one actually woke: a sleeper can wake late while other threads
+        # parse pages, so slots booked ahead of time would bunch up
+        with turn:
+            while True:
+                with self._lock:
+                    delay = self._next.get(host, 0.0) - time.monotonic()
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+            with self._lock:
+                self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + self.interval)
+    
+    def back_off(self, host: str, seconds: float):
+        """Hold every request to host for a while (the server asked us to slow down)."""
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+
+class MeaningRefresher:
+    """
+    Fetches and parses every card's page through one pooled requests.Session.
+    
+    At most `workers` requests are in flight, each host gets at most `rate`
+    requests per second, and pages fetched before are revalidated with
+    If-None-Match / If-Modified-Since so unchanged ones cost a 304.
+    """
+    
+    def __init__(self, url_template: str, workers: int = 8, rate: float = 10.0,
+                 timeout: float = 10.0, retries: int = 2, session: Optional['requests.Session'] = None):
+        """
+        Args:
+            url_template: Page URL with {slug} ("the-fool", "ace-of-cups"), and
+                optionally {id}, {name}, {arcana} ("major"/"minor") and {suit}
+            workers: Requests in flight at once (also the connection pool size)
+            rate: Requests per second to any one host (0 = unlimited)
+            timeout: Seconds per request
+            retries: Extra attempts after a 429/5xx or connection error
+            session: Session to use instead of a new pooled one
+        """
+        self.url_template = url_template
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = _HostLimiter(rate)
+        import requests
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = 'itarot-meanings-refresh/1'
+        self.session = session
+    
+    def url_for(self, card: Card) -> str:
+        slug = re.sub(r'[^a-z0-9]+', '-', card.name.lower()).strip('-')
+        return self.url_template.format(
+            slug=slug, id=card.id, name=card.name,
+            arcana='major' if card.suit is None else 'minor',
+            suit=(card.suit or '').lower()
+        )
+    
+    def fetch(self, card: Card, validator: Optional[Dict]) -> Tuple[str, Optional[Dict], Optional[Dict]]:
+        """
+        Fetch one card's page.
+        
+        Returns:
+            (outcome, meaning, validator): outcome is 'fetched', 'unchanged' (304)
+            or 'failed'; meaning is set when fetched
+        """
+        import requests
+        url = self.url_for(card)
+        host = urlsplit(url).netloc
+        headers = {}
+        if validator and validator.get('url') == url:
+            if validator.get('etag'):
+                headers['If-None-Match'] = validator['etag']
+            if validator.get('last_modified'):
+                headers['If-Modified-Since'] = validator['last_modified']
+        
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = str(e)
+                continue
+            if response.status_code == 304:
+                return 'unchanged', None, validator
+            if response.status_code == 429 or response.status_code >= 500:
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After', '')
+                self.limiter.back_off(host, float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+                continue
+            if response.status_code != 200:
+                return 'failed', None, {'url': url, 'error': f"HTTP {response.status_code}"}
+            meaning = parse_meaning(response.text)
+            if meaning is None:
+                return 'failed', None, {'url': url, 'error': "No upright/reversed meanings found"}
+            return 'fetched', meaning, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+        return 'failed', None, {'url': url, 'error': error}
+    
+    def run(self, cards: Iterable[Card], current: Mapping[str, Mapping],
+            validators: Dict[str, Dict]) -> Tuple[Dict, Dict, Dict]:
+        """
+        Fetch every card concurrently.
+        
+        Args:
+            cards: Cards to refresh
+            current: Meanings cached so far, by card key
+            validators: HTTP validators from the last refresh, by card key
+            
+        Returns:
+            (new meanings by card key, validators by card key, stats)
+        """
+        start = time.perf_counter()
+        cards = list(cards)
+        stats = {'cards': len(cards), 'fetched': 0, 'unchanged': 0, 'failed': 0, 'errors': {}}
+        meanings = {}
+        validators = dict(validators)
+        
+        def refresh_one(card):
+            # A 304 is only useful if we still have what it refers to
+            validator = validators.get(card.key) if card.key in current else None
+            return card, self.fetch(card, validator)
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='refresh') as executor:
+            for card, (outcome, meaning, validator) in executor.map(refresh_one, cards):
+                stats[outcome] += 1
+                if outcome == 'fetched':
+                    meanings[card.key] = meaning
+                    validators[card.key] = validator
+                elif outcome == 'failed':
+                    # Keep whatever meaning the card had; drop its stale validator
+                    validators.pop(card.key, None)
+                    stats['errors'][card.name] = validator['error']
+        stats['elapsed_s'] = round(time.perf_counter() - start, 2)
+        return meanings, validators, stats
+
+
+class _FileLock:
+    """Advisory lock on a side file via fcntl.flock (no-op where unavailable)."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+    
+    def __enter__(self):
+        if fcntl is not None:
+            self._handle = open(self.path, 'a')
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        return self
+    
+    def __exit__(self, *exc):
+        if self._handle is not None:
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the card meanings cache from a web source")
+    parser.add_argument('--source', default=os.environ.get('TAROT_MEANINGS_URL'),
+                        help="Card page URL template with {slug} (default: $TAROT_MEANINGS_URL)")
+    parser.add_argument('--cache-file', default='tarot_cache.json')
+    parser.add_argument('--workers', type=int, default=8, help="Requests in flight at once")
+    parser.add_argument('--rate', type=float, default=10.0, help="Requests per second per host (0 = unlimited)")
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+    if not args.source:
+        parser.error("--source (or TAROT_MEANINGS_URL) is required")
+    
+    scraper = TarotScraper(cache_file=args.cache_file)
+    refresher = MeaningRefresher(args.source, workers=args.workers, rate=args.rate, timeout=args.timeout)
+    stats = scraper.refresh(refresher)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+    sys.exit(1 if stats['failed'] == stats['cards'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Meanings refresh against the stand-in site (bench/fake_meanings.py):
+conditional GETs, 304 revalidation, per-host rate limiting and the merged
+cache file.
+
+    cd backend && python -m pytest -q tests
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'bench'))
+
+pytest.importorskip('requests')
+pytest.importorskip('bs4')
+
+import requests  # noqa: E402
+
+from deck import DECK  # noqa: E402
+from fake_meanings import FakeMeanings, serve  # noqa: E402
+from tarot_scraper import VALIDATORS_KEY, MeaningRefresher, TarotScraper, _HostLimiter  # noqa: E402
+
+CARDS = DECK[:12]
+
+
+@pytest.fixture
+def site():
+    fake = FakeMeanings(latency_ms=5)
+    server = serve(fake, port=0)
+    fake.url = f'http://127.0.0.1:{server.server_address[1]}/meanings/{{slug}}'
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def recording_refresher(site, sent, rate=0.0):
+    """Refresher whose session records the headers of every request it sends."""
+    session = requests.Session()
+    session.hooks['response'].append(lambda response, *args, **kwargs: sent.append(response.request.headers))
+    return MeaningRefresher(site.url, workers=4, rate=rate, session=session)
+
+
+def read_cache(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_cold_refresh_merges_into_cache_file(site, tmp_path):
+    cache_file = str(tmp_path / 'tarot_cache.json')
+    scraper = TarotScraper(cache_file=cache_file)
+    # Written by another process after this one loaded the cache
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'the_sun': {'upright': 'Kept', 'reversed': 'Kept too'}}, f)
+
+    sent = []
+    stats = scraper.refresh(recording_refresher(site, sent), CARDS)
+
+    assert (stats['fetched'], stats['unchanged'], stats['failed']) == (len(CARDS), 0, 0)
+    assert not any('If-None-Match' in headers or 'If-Modified-Since' in headers for headers in sent)
+    on_disk = read_cache(cache_file)
+    assert on_disk['the_sun'] == {'upright': 'Kept', 'reversed': 'Kept too'}
+    for card in CARDS:
+        assert on_disk[card.key]['upright'] == f"{card.meanings['upright']} (rev. 1)"
+        assert on_disk[card.key]['reversed'] == f"{card.meanings['reversed']} (rev. 1)"
+        validator = on_disk[VALIDATORS_KEY][card.key]
+        assert validator['url'].endswith('/' + card.name.lower().replace(' ', '-'))
+        assert validator['etag'] and validator['last_modified']
+    assert scraper.cache == on_disk
+    assert scraper.get_card_meaning(CARDS[0])['upright'].endswith('(rev. 1)')
+
+
+def test_revalidation_sends_validators_and_keeps_meanings(site, tmp_path):
+    cache_file = str(tmp_path / 'tarot_cache.json')
+    scraper = TarotScraper(cache_file=cache_file)
+    scraper.refresh(MeaningRefresher(site.url, workers=4, rate=0), CARDS)
+    before = read_cache(cache_file)
+
+    site.reset_stats()
+    sent = []
+    stats = scraper.refresh(recording_refresher(site, sent), CARDS)
+
+    assert (stats['fetched'], stats['unchanged'], stats['failed']) == (0, len(CARDS), 0)
+    assert site.stats()['not_modified'] == len(CARDS)
+    etags = {validator['etag'] for validator in before[VALIDATORS_KEY].values()}
+    assert {headers['If-None-Match'] for headers in sent} == etags
+    assert all(headers['If-Modified-Since'] for headers in sent)
+    assert read_cache(cache_file) == before
+
+
+def test_changed_pages_are_fetched_again(site, tmp_path):
+    cache_file = str(tmp_path / 'tarot_cache.json')
+    scraper = TarotScraper(cache_file=cache_file)
+    refresher = MeaningRefresher(site.url, workers=4, rate=0)
+    scraper.refresh(refresher, CARDS)
+    first = read_cache(cache_file)[VALIDATORS_KEY]
+
+    site.bump()
+    stats = scraper.refresh(refresher, CARDS)
+
+    assert stats['fetched'] == len(CARDS)
+    on_disk = read_cache(cache_file)
+    assert all(on_disk[card.key]['upright'].endswith('(rev. 2)') for card in CARDS)
+    assert all(on_disk[VALIDATORS_KEY][card.key]['etag'] != first[card.key]['etag'] for card in CARDS)
+
+
+def test_refresh_spaces_requests_to_the_site(site, tmp_path):
+    rate = 40.0
+    scraper = TarotScraper(cache_file=str(tmp_path / 'tarot_cache.json'))
+    start = time.monotonic()
+    scraper.refresh(MeaningRefresher(site.url, workers=8, rate=rate), CARDS)
+    elapsed = time.monotonic() - start
+
+    assert elapsed >= (len(CARDS) - 1) / rate
+    # Arrival times at the site also carry thread scheduling; the limiter itself is exact
+    assert site.stats()['min_gap_ms'] >= 0.5 * 1000 / rate
+
+
+def test_limiter_spacing_holds_while_threads_compete_for_the_gil():
+    limiter = _HostLimiter(rate=50.0)
+    woke = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def busy():
+        # Stands in for page parsing, which keeps sleepers from waking on time
+        while not stop.is_set():
+            sum(range(10000))
+
+    def request():
+        for _ in range(8):
+            limiter.wait('example.com')
+            with lock:
+                woke.append(time.monotonic())
+
+    burners = [threading.Thread(target=busy) for _ in range(2)]
+    for burner in burners:
+        burner.start()
+    try:
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        stop.set()
+        for burner in burners:
+            burner.join()
+
+    woke.sort()
+    gaps = [later - earlier for earlier, later in zip(woke, woke[1:])]
+    assert len(woke) == 48
+    assert min(gaps) >= 0.75 * limiter.interval
+
+
+def test_back_off_holds_every_request_to_the_host():
+    limiter = _HostLimiter(rate=0)
+    limiter.back_off('example.com', 0.2)
+    start = time.monotonic()
+    limiter.wait('example.com')
+    assert time.monotonic() - start >= 0.19
+    start = time.monotonic()
+    limiter.wait('other.example')
+    assert time.monotonic() - start < 0.05
@@ -0,0 +1,76 @@
+"""
+Pitch-preserving time-stretch for synthesized speech (WSOLA)
+Piper only changes the speaking rate by running the voice again with
+another length-scale. WSOLA (waveform-similarity overlap-add) re-times
+audio we already have instead: Hann-windowed frames are read from the
+input at a scaled hop, each shifted within a small tolerance to where it
+best continues the previous frame, and overlap-added at a fixed hop, so
+the duration changes and the pitch does not.
+"""
+
+import numpy as np
+
+FRAME_MS = 25       # Frame length; about two pitch periods of a low voice
+TOLERANCE_MS = 8    # How far a frame may move to line up with the one before
+STEP = 4            # Decimation of the coarse alignment search
+
+# Beyond these duration ratios the result sounds processed; synthesize instead
+MIN_RATIO = 0.5
+MAX_RATIO = 2.0
+
+
+def wsola(samples, ratio, sample_rate=22050):
+    """
+    Stretch int16 samples to `ratio` times their duration, keeping the pitch.
+
+    Args:
+        samples: int16 mono samples
+        ratio: Output duration / input duration (above 1 is slower)
+        sample_rate: Sample rate of the audio
+
+    Returns:
+        np.ndarray: int16 samples, round(len(samples) * ratio) long
+    """
+    out_len = int(round(len(samples) * ratio))
+    frame = int(sample_rate * FRAME_MS / 1000) & ~1
+    if ratio == 1 or len(samples) < frame:
+        positions = np.linspace(0, max(len(samples) - 1, 0), out_len)
+        y = np.interp(positions, np.arange(len(samples)), samples.astype(np.float32))
+        return np.clip(np.rint(y), -32768, 32767).astype('<i2')
+
+    hop = frame // 2
+    tolerance = int(sample_rate * TOLERANCE_MS / 1000)
+    # Zero padding so every candidate frame, and the continuation of the last one, is in range
+    x = np.zeros(len(samples) + 2 * tolerance + 2 * frame, dtype=np.float32)
+    x[tolerance:tolerance + len(samples)] = samples
+    last = len(x) - frame
+
+    count = out_len // hop + 2
+    analysis_hop = hop / ratio
+    positions = np.empty(count, dtype=np.int64)
+    pos = positions[0] = tolerance
+    for k in range(1, count):
+        # The input that naturally follows the previous frame, and the window around
+        # this frame's nominal position to find the best match for it in
+        natural = x[pos + hop:pos + hop + frame]
+        nominal = tolerance + int(round(k * analysis_hop))
+        lo = min(max(nominal - tolerance, 0), last)
+        hi = min(nominal + tolerance, last)
+        candidates = np.lib.stride_tricks.sliding_window_view(x[lo:hi + frame], frame)
+        # Coarse search on every STEP-th offset and sample, then refine around the best
+        best = int(np.argmax(candidates[::STEP, ::STEP] @ natural[::STEP])) * STEP
+        start = max(best - STEP + 1, 0)
+        fine = candidates[start:best + STEP]
+        pos = positions[k] = lo + start + int(np.argmax(fine @ natural))
+
+    # Periodic Hann at half-frame hop: even frames tile the output from 0, odd ones from `hop`
+    window = np.hanning(frame + 1)[:-1].astype(np.float32)
+    frames = x[positions[:, None] + np.arange(frame)] * window
+    y = np.zeros(count * hop + frame, dtype=np.float32)
+    weight = np.zeros_like(y)
+    for first, offset in ((0, 0), (1, hop)):
+        tiled = frames[first::2].reshape(-1)
+        y[offset:offset + len(tiled)] += tiled
+        weight[offset:offset + len(tiled)] += np.tile(window, len(frames[first::2]))
+    y = y[:out_len] / np.maximum(weight[:out_len], 1e-3)
+    return np.clip(np.rint(y), -32768, 32767).astype('<i2')
@@ -0,0 +1,209 @@
+"""
+Content-addressed cache for synthesized speech
+A bounded in-memory LRU sits in front of a size-capped on-disk store, both
+keyed by a hash of the normalized text, voice model and length-scale.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+# Seconds after which a temporary file at startup is a crash leftover, not a write in progress
+TMP_FILE_AGE = 60
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share a cache entry"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class AudioCache:
+    def __init__(self, cache_dir=None, memory_bytes=32 * 1024 * 1024,
+                 disk_bytes=512 * 1024 * 1024):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory for the on-disk tier (None = memory only)
+            memory_bytes: Maximum bytes held in the in-memory LRU
+            disk_bytes: Maximum bytes kept on disk before the oldest entries are evicted
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> bytes, least recently used first
+        self._memory_size = 0
+        self._disk = OrderedDict()  # key -> file size, least recently used first
+        self._disk_size = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def make_key(text, model_path, length_scale):
+        """Hash of normalized text, voice model path and length-scale"""
+        material = '\0'.join([normalize_text(text), model_path, repr(float(length_scale))])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.wav')
+
+    def _scan_disk(self):
+        """Index existing files, oldest first, so eviction survives restarts"""
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    # Left by a crash mid-write; recent ones may be another worker's write in progress
+                    try:
+                        if now - os.stat(path).st_mtime > TMP_FILE_AGE:
+                            os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                if not name.endswith('.wav'):
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def get(self, key, count_miss=True):
+        """
+        Return cached audio bytes or None
+
+        Args:
+            count_miss: Count a miss; off for a second lookup on behalf of a
+                request whose own lookup already missed (time-stretching)
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                self.bytes_served += len(data)
+                return data
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    data = f.read()
+                os.utime(self._path(key))
+            except OSError:
+                data = None
+            with self._lock:
+                if data is None:
+                    self._forget_disk(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self.bytes_served += len(data)
+                    self._remember(key, data)
+                    return data
+
+        if count_miss:
+            with self._lock:
+                self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """Store audio bytes in memory and, if enabled, on disk"""
+        with self._lock:
+            self._remember(key, data)
+            if not self.cache_dir or key in self._disk or len(data) > self.disk_bytes:
+                return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                # Do not leave a partial file behind
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            print(f"Error writing TTS cache entry: {e}")
+            return
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_size += len(data)
+            self._evict_disk()
+
+    def _remember(self, key, data):
+        """Insert into the memory LRU (caller holds the lock)"""
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def _forget_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+    def _evict_disk(self):
+        """Delete least recently used files until under the size cap (caller holds the lock)"""
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit, miss and byte counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'bytes_served': self.bytes_served,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size,
+                'evictions': self.evictions
+            }
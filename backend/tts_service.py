@@ -5,34 +5,710 @@ Provides high-quality neural voice synthesis for tarot interpretations
 
 import subprocess
 import os
+import sys
+import json
+import queue
+import threading
+import atexit
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, asynccontextmanager
+
+import numpy as np
+
+import metrics
+import piper_worker
+from time_stretch import MAX_RATIO, MIN_RATIO, wsola
+
+WORKER_SCRIPT = os.path.abspath(piper_worker.__file__)
+
+# Voice model and length-scale used when none is given
+DEFAULT_VOICE = "./voices/ru_RU-irina-medium.onnx"
+DEFAULT_SPEECH_RATE = 1.4
+
+# Piper output format: 16-bit mono PCM at 22.05 kHz
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+SAMPLE_RATE = 22050
+WAV_HEADER_SIZE = 44
+
+# Data size written into the header of a streamed WAV whose length is unknown
+STREAMING_DATA_SIZE = 0xFFFFFFFF
+
+# Streamed audio longer than this is not kept for the cache
+STREAM_CACHE_LIMIT = 4 * 1024 * 1024
+
+# Texts shorter than this are synthesized in one piece even when sharding is on
+SHARD_MIN_CHARS = 200
+
+# Short phrase synthesized at startup so each worker has run the voice once
+WARMUP_TEXT = "The cards are ready."
+
+# Workers lead their own process group, so killing one also stops the piper
+# process it may have started for a request (the CLI engine)
+NEW_SESSION = hasattr(os, 'killpg')
+
+
+def _kill_group(proc):
+    """SIGKILL a worker and anything it started."""
+    try:
+        if NEW_SESSION:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def split_shards(text, count, min_chars=SHARD_MIN_CHARS):
+    """
+    Split text at sentence boundaries into at most `count` runs of whole
+    sentences of similar length.
+
+    Piper synthesizes every sentence on its own and appends the same
+    silence after each, so the shards' audio joined in order is the audio
+    of the whole text. Sentences are never split further (a clause on its
+    own would be voiced differently), so there are no more shards than
+    sentences.
+
+    Returns:
+        list: The shards, or [text] when it is short or a single sentence
+    """
+    if count <= 1 or len(text) < min_chars:
+        return [text]
+    from read_aloud import SentenceSegmenter  # read_aloud imports this module via audio_codecs
+    segmenter = SentenceSegmenter()
+    sentences = segmenter.feed(text) + segmenter.flush()
+    if len(sentences) <= 1:
+        return [text]
+    count = min(count, len(sentences))
+    share = sum(len(sentence) for sentence in sentences) / count
+    shards, current, done = [], [], 0
+    for sentence in sentences:
+        current.append(sentence)
+        done += len(sentence)
+        if len(shards) < count - 1 and done >= share * (len(shards) + 1):
+            shards.append(' '.join(current))
+            current = []
+    if current:
+        shards.append(' '.join(current))
+    return shards
+
+
+def wav_duration(wav_data):
+    """Duration in seconds of a WAV produced by TTSService (44-byte header)"""
+    return (len(wav_data) - WAV_HEADER_SIZE) / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH)
+
+
+def pcm_wav_header(data_size):
+    """Build a 44-byte WAV header for data_size bytes of Piper PCM"""
+    import struct
+    
+    # WAV file parameters (must match Piper output)
+    channels = CHANNELS
+    sample_width = SAMPLE_WIDTH
+    framerate = SAMPLE_RATE
+    
+    # Calculate sizes (clamped for streamed output of unknown length)
+    file_size = min(36 + data_size, STREAMING_DATA_SIZE)
+    
+    # Build WAV header
+    wav_header = struct.pack('<4sI4s4sIHHIIHH4sI',
+        b'RIFF',
+        file_size,
+        b'WAVE',
+        b'fmt ',
+        16,  # fmt chunk size
+        1,   # PCM format
+        channels,
+        framerate,
+        framerate * channels * sample_width,  # byte rate
+        channels * sample_width,  # block align
+        sample_width * 8,  # bits per sample
+        b'data',
+        data_size
+    )
+    
+    return wav_header
+
+
+def stretch_wav(wav_data, from_rate, to_rate):
+    """
+    Re-time a WAV synthesized at length-scale from_rate to sound as if
+    synthesized at to_rate, keeping the pitch (WSOLA)
+
+    Returns:
+        bytes: WAV audio data, or None if the change is too large to stretch
+    """
+    ratio = to_rate / from_rate
+    if not MIN_RATIO <= ratio <= MAX_RATIO:
+        return None
+    start = time.perf_counter()
+    samples = np.frombuffer(memoryview(wav_data)[WAV_HEADER_SIZE:], dtype='<i2')
+    pcm = wsola(samples, ratio, SAMPLE_RATE).tobytes()
+    metrics.record('tts_time_stretch', time.perf_counter() - start)
+    return b''.join([pcm_wav_header(len(pcm)), pcm])
+
+
+def stretch_from_copy(text, rate, default_rate, model_path, cache=None, precomputed=None):
+    """
+    WAV for text at `rate`, time-stretched from a copy at another rate: the
+    one cached at default_rate, else a precomputed one. Needs no Piper, so
+    the asyncio server uses it without a TTSService.
+
+    Returns:
+        bytes: WAV audio data, or None (nothing to stretch, or too far off)
+    """
+    if cache is not None and rate != default_rate:
+        # The request's own lookup has already counted the miss
+        wav_data = cache.get(cache.make_key(text, model_path, default_rate), count_miss=False)
+        if wav_data is not None:
+            return stretch_wav(wav_data, default_rate, rate)
+    if precomputed is not None:
+        stored = precomputed.wav(text.strip())
+        if stored is not None and stored[1] != rate:
+            return stretch_wav(stored[0], stored[1], rate)
+    return None
+
+
+class WorkerCrashed(RuntimeError):
+    """Raised when a Piper worker process dies or stops answering."""
+
+
+class PiperWorker:
+    """One long-lived piper_worker.py process with the voice model loaded."""
+
+    def __init__(self, model_path, piper_cmd="piper"):
+        self.model_path = model_path
+        self.piper_cmd = piper_cmd
+        self.proc = None
+        self.restarts = 0
+        self.start()
+
+    def start(self):
+        """Spawn the worker process."""
+        self.proc = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT,
+             "--model", self.model_path,
+             "--piper-cmd", self.piper_cmd],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=NEW_SESSION
+        )
+
+    def restart(self):
+        """Kill the worker (if still running) and spawn a fresh one."""
+        self.kill()
+        self.restarts += 1
+        self.start()
+
+    def kill(self):
+        if self.proc is not None and self.proc.poll() is None:
+            _kill_group(self.proc)
+            self.proc.wait()
+
+    def close(self):
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except Exception:
+                self.kill()
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def _send(self, request):
+        try:
+            self.proc.stdin.write(json.dumps(request).encode('utf-8') + b'\n')
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            raise WorkerCrashed("Piper worker is not accepting requests")
+
+    def _read_frame(self):
+        header = self.proc.stdout.read(piper_worker.FRAME_HEADER.size)
+        if len(header) < piper_worker.FRAME_HEADER.size:
+            raise WorkerCrashed("Piper worker exited unexpectedly")
+        kind, length = piper_worker.FRAME_HEADER.unpack(header)
+        payload = self.proc.stdout.read(length) if length else b''
+        if len(payload) < length:
+            raise WorkerCrashed("Piper worker exited unexpectedly")
+        return kind, payload
+
+    def ping(self):
+        """Round-trip a ping; returns True once the model is loaded and answering."""
+        self._send({'ping': True})
+        kind, _ = self._read_frame()
+        return kind == piper_worker.FRAME_PONG
+
+    def synthesize_chunks(self, text, length_scale):
+        """
+        Yield raw PCM chunks for text as the worker produces them.
+        The generator must be exhausted before the worker is reused.
+        """
+        self._send({'text': text, 'length_scale': length_scale})
+        while True:
+            kind, payload = self._read_frame()
+            if kind == piper_worker.FRAME_AUDIO:
+                yield payload
+            elif kind == piper_worker.FRAME_DONE:
+                return
+            elif kind == piper_worker.FRAME_ERROR:
+                raise RuntimeError(f"Piper TTS failed: {payload.decode('utf-8', 'replace')}")
+            else:
+                raise WorkerCrashed(f"Unexpected frame from Piper worker: {kind!r}")
+
+
+class PiperWorkerPool:
+    """
+    Fixed-size pool of PiperWorker processes.
+
+    Workers are leased one request at a time. A worker that crashes or
+    exceeds request_timeout is killed and restarted, and a background
+    thread pings idle workers every health_interval seconds.
+    """
+
+    def __init__(self, model_path, piper_cmd="piper", size=2,
+                 request_timeout=60.0, health_interval=30.0):
+        self.size = size
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.workers = [PiperWorker(model_path, piper_cmd) for _ in range(size)]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+        self._closed = threading.Event()
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._health_thread.start()
+        atexit.register(self.close)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow an idle worker, restarting it first if it has died."""
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError("No Piper worker available")
+        try:
+            if not worker.alive():
+                worker.restart()
+            yield worker
+        finally:
+            self._idle.put(worker)
+
+    @contextmanager
+    def _watchdog(self, worker):
+        """Kill the worker if the wrapped request runs past request_timeout."""
+        timer = threading.Timer(self.request_timeout, worker.kill)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        finally:
+            timer.cancel()
+
+    @contextmanager
+    def _on_cancel(self, worker, cancel):
+        """Kill the worker if the request's client leaves during the wrapped request."""
+        if cancel is None:
+            yield
+            return
+        start = time.perf_counter()
+
+        def stop():
+            metrics.record_cancel('tts', time.perf_counter() - start)
+            worker.kill()
+
+        detach = cancel.on_cancel(stop)
+        try:
+            yield
+        finally:
+            detach()
+
+    def synthesize(self, text, length_scale, cancel=None):
+        """
+        Synthesize text on a pooled worker and return the list of raw PCM chunks.
+        If `cancel` (a CancelToken) trips, the worker is killed and restarted
+        and Cancelled is raised.
+        """
+        for attempt in range(2):
+            if cancel is not None:
+                cancel.check()
+            with self.lease() as worker:
+                try:
+                    with self._watchdog(worker), self._on_cancel(worker, cancel):
+                        return list(worker.synthesize_chunks(text, length_scale))
+                except WorkerCrashed:
+                    # Retry once on a fresh process; Piper errors (RuntimeError) propagate
+                    worker.restart()
+                    if cancel is not None:
+                        cancel.check()
+                    if attempt:
+                        raise RuntimeError("Piper worker crashed during synthesis")
+
+    def stream(self, text, length_scale, cancel=None):
+        """
+        Yield raw PCM chunks as a pooled worker produces them.
+
+        If the consumer stops early, or `cancel` trips, the worker is left
+        mid-response and is restarted rather than drained.
+        """
+        with self.lease() as worker:
+            finished = False
+            start = time.perf_counter()
+            try:
+                with self._watchdog(worker), self._on_cancel(worker, cancel):
+                    yield from worker.synthesize_chunks(text, length_scale)
+                finished = True
+            except GeneratorExit:
+                if cancel is None or not cancel.cancelled:  # else counted when the token tripped
+                    metrics.record_cancel('tts', time.perf_counter() - start)
+                raise
+            except WorkerCrashed:
+                if cancel is not None:
+                    cancel.check()
+                raise RuntimeError("Piper worker crashed during synthesis")
+            finally:
+                if not finished:
+                    worker.restart()
+
+    def health_check(self):
+        """
+        Ping every idle worker, restarting any that fail.
+
+        Returns:
+            dict: pool size, idle/healthy counts and total restarts
+        """
+        checked = []
+        healthy = 0
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for worker in checked:
+                try:
+                    with self._watchdog(worker):
+                        ok = worker.alive() and worker.ping()
+                except WorkerCrashed:
+                    ok = False
+                if not ok:
+                    worker.restart()
+                else:
+                    healthy += 1
+        finally:
+            for worker in checked:
+                self._idle.put(worker)
+
+        return {
+            'size': self.size,
+            'checked': len(checked),
+            'healthy': healthy,
+            'restarts': sum(w.restarts for w in self.workers)
+        }
+
+    def warm_up(self, text, length_scale, timeout=None):
+        """
+        Synthesize text once on every worker, so none serves its first real
+        request with a cold voice. Waits for busy workers to come back.
+
+        Returns:
+            list: milliseconds taken by each worker
+        """
+        leased = []
+        timings = []
+        try:
+            for _ in range(self.size):
+                try:
+                    leased.append(self._idle.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            for worker in leased:
+                if not worker.alive():
+                    worker.restart()
+                start = time.perf_counter()
+                try:
+                    with self._watchdog(worker):
+                        for _ in worker.synthesize_chunks(text, length_scale):
+                            pass
+                except WorkerCrashed:
+                    worker.restart()
+                    continue
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            for worker in leased:
+                self._idle.put(worker)
+        return timings
+
+    def alive_count(self):
+        return sum(1 for worker in self.workers if worker.alive())
+
+    def _health_loop(self):
+        while not self._closed.wait(self.health_interval):
+            self.health_check()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        for worker in self.workers:
+            worker.close()
+
+
+class AsyncPiperWorker:
+    """PiperWorker counterpart driven by asyncio subprocess pipes."""
+
+    def __init__(self, model_path, piper_cmd="piper"):
+        self.model_path = model_path
+        self.piper_cmd = piper_cmd
+        self.proc = None
+        self.restarts = 0
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT,
+            "--model", self.model_path,
+            "--piper-cmd", self.piper_cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            start_new_session=NEW_SESSION
+        )
+
+    async def restart(self):
+        self.kill()
+        if self.proc is not None:
+            await self.proc.wait()
+        self.restarts += 1
+        await self.start()
+
+    def kill(self):
+        if self.alive():
+            _kill_group(self.proc)
+
+    def alive(self):
+        return self.proc is not None and self.proc.returncode is None
+
+    async def close(self):
+        if self.alive():
+            self.proc.stdin.close()
+            try:
+                await asyncio.wait_for(self.proc.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                self.kill()
+
+    async def _send(self, request):
+        try:
+            self.proc.stdin.write(json.dumps(request).encode('utf-8') + b'\n')
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            raise WorkerCrashed("Piper worker is not accepting requests")
+
+    async def _read_frame(self):
+        try:
+            header = await self.proc.stdout.readexactly(piper_worker.FRAME_HEADER.size)
+            kind, length = piper_worker.FRAME_HEADER.unpack(header)
+            payload = await self.proc.stdout.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            raise WorkerCrashed("Piper worker exited unexpectedly")
+        return kind, payload
+
+    async def ping(self):
+        await self._send({'ping': True})
+        kind, _ = await self._read_frame()
+        return kind == piper_worker.FRAME_PONG
+
+    async def synthesize_chunks(self, text, length_scale):
+        """Async generator of raw PCM chunks, as in PiperWorker.synthesize_chunks."""
+        await self._send({'text': text, 'length_scale': length_scale})
+        while True:
+            kind, payload = await self._read_frame()
+            if kind == piper_worker.FRAME_AUDIO:
+                yield payload
+            elif kind == piper_worker.FRAME_DONE:
+                return
+            elif kind == piper_worker.FRAME_ERROR:
+                raise RuntimeError(f"Piper TTS failed: {payload.decode('utf-8', 'replace')}")
+            else:
+                raise WorkerCrashed(f"Unexpected frame from Piper worker: {kind!r}")
+
+
+class AsyncPiperPool:
+    """
+    PiperWorkerPool for an asyncio event loop.
+
+    Waiting for a worker or for audio never blocks the loop, so many
+    requests can be in flight with only `size` synthesis processes.
+    """
+
+    def __init__(self, model_path, piper_cmd="piper", size=2, request_timeout=60.0):
+        self.size = size
+        self.request_timeout = request_timeout
+        self.workers = [AsyncPiperWorker(model_path, piper_cmd) for _ in range(size)]
+        self._idle = None
+
+    async def start(self):
+        """Spawn the workers; call once from the running event loop."""
+        self._idle = asyncio.Queue()
+        for worker in self.workers:
+            await worker.start()
+            self._idle.put_nowait(worker)
+
+    @asynccontextmanager
+    async def lease(self):
+        worker = await self._idle.get()
+        try:
+            if not worker.alive():
+                await worker.restart()
+            yield worker
+        finally:
+            self._idle.put_nowait(worker)
+
+    async def synthesize(self, text, length_scale):
+        """
+        Synthesize text on a pooled worker and return the list of raw PCM chunks.
+        If the task is cancelled (the client left), the worker is restarted.
+        """
+        for attempt in range(2):
+            async with self.lease() as worker:
+                start = time.perf_counter()
+                try:
+                    return await asyncio.wait_for(
+                        self._collect(worker, text, length_scale), self.request_timeout
+                    )
+                except (WorkerCrashed, asyncio.TimeoutError):
+                    await worker.restart()
+                    if attempt:
+                        raise RuntimeError("Piper worker crashed during synthesis")
+                except asyncio.CancelledError:
+                    # Mid-response: the worker cannot be handed to the next request as it is
+                    metrics.record_cancel('tts', time.perf_counter() - start)
+                    await worker.restart()
+                    raise
+
+    @staticmethod
+    async def _collect(worker, text, length_scale):
+        return [chunk async for chunk in worker.synthesize_chunks(text, length_scale)]
+
+    async def stream(self, text, length_scale):
+        """Async generator of raw PCM chunks; an abandoned worker is restarted."""
+        async with self.lease() as worker:
+            finished = False
+            start = time.perf_counter()
+            try:
+                async for chunk in worker.synthesize_chunks(text, length_scale):
+                    yield chunk
+                finished = True
+            except (GeneratorExit, asyncio.CancelledError):
+                metrics.record_cancel('tts', time.perf_counter() - start)
+                raise
+            except WorkerCrashed:
+                raise RuntimeError("Piper worker crashed during synthesis")
+            finally:
+                if not finished:
+                    await worker.restart()
+
+    async def warm_up(self, text, length_scale):
+        """Synthesize text once on every worker; returns milliseconds per worker."""
+        leased = [await self._idle.get() for _ in range(self.size)]
+        timings = []
+        try:
+            for worker in leased:
+                if not worker.alive():
+                    await worker.restart()
+                start = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._collect(worker, text, length_scale), self.request_timeout)
+                except (WorkerCrashed, asyncio.TimeoutError):
+                    await worker.restart()
+                    continue
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            for worker in leased:
+                self._idle.put_nowait(worker)
+        return timings
+
+    async def health_check(self):
+        healthy = 0
+        for worker in self.workers:
+            if worker.alive():
+                healthy += 1
+        return {
+            'size': self.size,
+            'healthy': healthy,
+            'restarts': sum(w.restarts for w in self.workers)
+        }
+
+    async def close(self):
+        for worker in self.workers:
+            await worker.close()
+
 
 class TTSService:
-    def __init__(self, model_path="./voices/ru_RU-irina-medium.onnx", speech_rate=1.4):
+    def __init__(self, model_path=DEFAULT_VOICE, speech_rate=DEFAULT_SPEECH_RATE,
+                 pool_size=2, request_timeout=60.0, cache=None, time_stretch=False,
+                 shard_workers=1, shard_min_chars=SHARD_MIN_CHARS):
         """
         Initialize TTS service with American English female voice (Amy)
         
         Args:
             model_path: Path to voice model
             speech_rate: Speech speed multiplier (1.0=normal, faster/slower as needed)
+            pool_size: Number of persistent Piper workers (0 = one piper process per call)
+            request_timeout: Seconds before a stuck worker is killed and restarted
+            cache: Optional AudioCache; hits skip Piper entirely
+            time_stretch: Serve other rates by time-stretching audio already cached
+                (or precomputed) at the default rate, instead of running Piper again
+            shard_workers: Split a long text at sentence boundaries and synthesize
+                up to this many shards at once (1 = off; at most pool_size with a pool)
+            shard_min_chars: Texts shorter than this are never split
         """
         self.model_path = os.path.abspath(model_path)
         self.piper_cmd = "piper"  # Use piper from venv
         self.speech_rate = speech_rate  # Default 1.0 for natural speed
+        self.cache = cache
+        self.time_stretch = time_stretch
+        self.precomputed = None  # Optional PrecomputedStore, a second source to stretch from
         
         # Verify model exists
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"Voice model not found: {self.model_path}")
         
+        # Keep the voice model loaded in long-lived workers
+        self.pool = None
+        if pool_size > 0:
+            self.pool = PiperWorkerPool(
+                self.model_path, self.piper_cmd,
+                size=pool_size, request_timeout=request_timeout
+            )
+        
+        # Shards beyond the pool size would only wait for a worker
+        self.shard_workers = max(1, min(shard_workers, pool_size) if pool_size > 0 else shard_workers)
+        self.shard_min_chars = shard_min_chars
+        self._shard_executor = None
+        if self.shard_workers > 1:
+            self._shard_executor = ThreadPoolExecutor(
+                max_workers=self.shard_workers, thread_name_prefix='tts-shard'
+            )
+        
         print(f"✓ TTS service initialized with model: {self.model_path}")
         print(f"  Speech rate: {self.speech_rate}x (1.0=normal, higher=slower/clearer)")
+        print(f"  Piper workers: {pool_size or 'none (one process per request)'}")
+        if self.shard_workers > 1:
+            print(f"  Long texts: up to {self.shard_workers} shards in parallel")
     
-    def synthesize(self, text, custom_rate=None):
+    def synthesize(self, text, custom_rate=None, cancel=None):
         """
         Convert text to speech audio using Piper CLI
         
         Args:
             text (str): Text to convert to speech
             custom_rate (float): Optional custom speech rate for this synthesis
+            cancel (CancelToken): Optional; when it trips, Piper is killed and
+                Cancelled is raised
             
         Returns:
             bytes: WAV audio data
@@ -43,62 +719,219 @@ class TTSService:
         # Use custom rate if provided, otherwise use default
         rate = custom_rate if custom_rate is not None else self.speech_rate
         
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(text, self.model_path, rate)
+            wav_data = self.cache.get(key)
+            if wav_data is not None:
+                return wav_data
+        
+        # Without a cache a precomputed copy can still be stretched
+        wav_data = self.stretched(text, rate)
+        if wav_data is not None:
+            return wav_data
+        wav_data = self._synthesize_uncached(text, rate, cancel)
+        if key is not None:
+            self.cache.put(key, wav_data)
+        return wav_data
+    
+    def stretched(self, text, rate):
+        """
+        WAV for text at `rate`, time-stretched from a copy at another rate
+        that is already cached or precomputed
+        
+        Returns:
+            bytes: WAV audio data, or None (stretching off or nothing to stretch)
+        """
+        if not self.time_stretch:
+            return None
+        return stretch_from_copy(text, rate, self.speech_rate, self.model_path, self.cache, self.precomputed)
+    
+    def stretch(self, wav_data, from_rate, to_rate):
+        """Re-time a WAV from one length-scale to another (see stretch_wav)"""
+        return stretch_wav(wav_data, from_rate, to_rate)
+    
+    def _synthesize_uncached(self, text, rate, cancel=None):
+        """Run Piper for text at the given length-scale and return WAV bytes"""
+        start = time.perf_counter()
+        shards = self.shards(text)
+        if len(shards) > 1:
+            wav_data = self._join_wav(self._synthesize_shards(shards, rate, cancel))
+        else:
+            wav_data = self._run_piper(text, rate, cancel)
+        metrics.record_synthesis(time.perf_counter() - start, wav_duration(wav_data))
+        return wav_data
+    
+    def shards(self, text, workers=None):
+        """Text split for parallel synthesis (a single shard unless sharding is on and it is long)"""
+        return split_shards(text, workers or self.shard_workers, self.shard_min_chars)
+    
+    def _synthesize_shards(self, shards, rate, cancel=None):
+        """
+        Synthesize shards in parallel, one Piper worker each, and return
+        their PCM chunks in text order
+        """
+        futures = [self._shard_executor.submit(self._piper_pcm, shard, rate, cancel) for shard in shards]
+        try:
+            return [chunk for future in futures for chunk in future.result()]
+        finally:
+            # After a failure, shards that have not started yet are dropped
+            for future in futures:
+                future.cancel()
+    
+    def _join_wav(self, chunks):
+        data_size = sum(len(chunk) for chunk in chunks)
+        # Single join: header and PCM are copied once into the final buffer
+        return b''.join([self._wav_header(data_size), *chunks])
+    
+    def _run_piper(self, text, rate, cancel=None):
+        return self._join_wav(self._piper_pcm(text, rate, cancel))
+    
+    def _piper_pcm(self, text, rate, cancel=None):
+        """Raw PCM chunks for text from a pooled worker or a one-off piper process"""
+        if self.pool is not None:
+            return self.pool.synthesize(text, rate, cancel)
+        
         try:
             # Call piper CLI with length-scale for speech rate control
             # length-scale > 1.0 = slower (clearer), < 1.0 = faster
-            result = subprocess.run(
+            proc = subprocess.Popen(
                 [self.piper_cmd, "--model", self.model_path, 
                  "--length-scale", str(rate),
                  "--output-raw"],
-                input=text.encode('utf-8'),
-                capture_output=True,
-                check=True
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
             )
-            
-            # Piper outputs raw PCM audio, we need to add WAV header
-            raw_audio = result.stdout
-            
-            # Create WAV file with header
-            wav_data = self._create_wav(raw_audio)
-            
-            return wav_data
-            
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Piper TTS failed: {e.stderr.decode('utf-8')}")
         except FileNotFoundError:
             raise RuntimeError("Piper command not found. Make sure piper-tts is installed.")
+        
+        with self._kill_on_cancel(proc, cancel):
+            # Piper outputs raw PCM audio, we need to add WAV header
+            raw_audio, stderr = proc.communicate(text.encode('utf-8'))
+        if cancel is not None:
+            cancel.check()
+        if proc.returncode != 0:
+            raise RuntimeError(f"Piper TTS failed: {stderr.decode('utf-8')}")
+        
+        return [raw_audio]
+    
+    @contextmanager
+    def _kill_on_cancel(self, proc, cancel):
+        """Kill a one-off piper process if the request's client leaves while it runs"""
+        if cancel is None:
+            yield
+            return
+        start = time.perf_counter()
+        
+        def stop():
+            if proc.poll() is None:
+                metrics.record_cancel('tts', time.perf_counter() - start)
+                proc.kill()
+        
+        detach = cancel.on_cancel(stop)
+        try:
+            yield
+        finally:
+            detach()
     
-    def _create_wav(self, raw_pcm_data):
-        """Add WAV header to raw PCM data"""
-        import struct
-        
-        # WAV file parameters (must match Piper output)
-        channels = 1  # Mono
-        sample_width = 2  # 16-bit
-        framerate = 22050  # 22.05 kHz
-        
-        # Calculate sizes
-        data_size = len(raw_pcm_data)
-        file_size = 36 + data_size
-        
-        # Build WAV header
-        wav_header = struct.pack('<4sI4s4sIHHIIHH4sI',
-            b'RIFF',
-            file_size,
-            b'WAVE',
-            b'fmt ',
-            16,  # fmt chunk size
-            1,   # PCM format
-            channels,
-            framerate,
-            framerate * channels * sample_width,  # byte rate
-            channels * sample_width,  # block align
-            sample_width * 8,  # bits per sample
-            b'data',
-            data_size
+    def synthesize_stream(self, text, custom_rate=None, cancel=None):
+        """
+        Stream speech as a WAV whose PCM is forwarded as Piper produces it
+        
+        The header declares an unknown (maximum) length, which players treat
+        as "read until end of stream". Chunks are passed through without
+        being joined, so memory per request stays flat however long the text.
+        
+        Args:
+            text (str): Text to convert to speech
+            custom_rate (float): Optional custom speech rate for this synthesis
+            cancel (CancelToken): Optional; when it trips, Piper is killed
+            
+        Yields:
+            bytes: WAV header, then raw PCM chunks
+        """
+        if not text or len(text.strip()) == 0:
+            raise ValueError("Text cannot be empty")
+        
+        rate = custom_rate if custom_rate is not None else self.speech_rate
+        
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(text, self.model_path, rate)
+            wav_data = self.cache.get(key)
+            if wav_data is not None:
+                yield wav_data
+                return
+        
+        wav_data = self.stretched(text, rate)
+        if wav_data is not None:
+            yield wav_data
+            return
+        
+        yield self._wav_header(STREAMING_DATA_SIZE)
+        
+        # Keep references to the chunks for the cache, unless the audio grows too long
+        kept = [] if key is not None else None
+        kept_size = 0
+        pcm_size = 0
+        start = time.perf_counter()
+        for chunk in self._stream_pcm(text, rate, cancel):
+            if not pcm_size:
+                metrics.record('tts_first_audio', time.perf_counter() - start)
+            pcm_size += len(chunk)
+            if kept is not None:
+                kept.append(chunk)
+                kept_size += len(chunk)
+                if kept_size > STREAM_CACHE_LIMIT:
+                    kept = None
+            yield chunk
+        
+        metrics.record_synthesis(
+            time.perf_counter() - start,
+            pcm_size / (SAMPLE_RATE * SAMPLE_WIDTH * CHANNELS)
         )
+        if kept is not None:
+            self.cache.put(key, b''.join([self._wav_header(kept_size), *kept]))
+    
+    def _stream_pcm(self, text, rate, cancel=None):
+        """Yield raw PCM chunks from a pooled worker or a one-off piper process"""
+        if self.pool is not None:
+            yield from self.pool.stream(text, rate, cancel)
+            return
         
-        return wav_header + raw_pcm_data
+        try:
+            proc = subprocess.Popen(
+                [self.piper_cmd, "--model", self.model_path,
+                 "--length-scale", str(rate),
+                 "--output-raw"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            raise RuntimeError("Piper command not found. Make sure piper-tts is installed.")
+        
+        try:
+            with self._kill_on_cancel(proc, cancel):
+                proc.stdin.write(text.encode('utf-8'))
+                proc.stdin.close()
+                while True:
+                    chunk = proc.stdout.read1(65536)
+                    if not chunk:
+                        break
+                    yield chunk
+            if cancel is not None:
+                cancel.check()
+            if proc.wait() != 0:
+                raise RuntimeError("Piper TTS failed")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+    
+    def _wav_header(self, data_size):
+        return pcm_wav_header(data_size)
     
     def test(self):
         """Test TTS with sample text"""
@@ -107,3 +940,40 @@ class TTSService:
         audio = self.synthesize(test_text)
         print(f"✓ Generated {len(audio)} bytes of audio")
         return audio
+    
+    def warm_up(self, text=WARMUP_TEXT):
+        """
+        Load the voice and run it once, bypassing the audio cache.
+        
+        Returns:
+            dict: workers warmed and milliseconds per synthesis
+        """
+        if self.pool is None:
+            start = time.perf_counter()
+            self._run_piper(text, self.speech_rate)
+            timings = [(time.perf_counter() - start) * 1000]
+        else:
+            timings = self.pool.warm_up(text, self.speech_rate)
+        return {
+            'workers': len(timings),
+            'ms': [round(ms, 1) for ms in timings]
+        }
+    
+    def workers_alive(self):
+        """Number of running Piper workers (None without a pool)"""
+        if self.pool is None:
+            return None
+        return self.pool.alive_count()
+    
+    def health_check(self):
+        """Ping the Piper workers, restarting any that have crashed or hung"""
+        if self.pool is None:
+            return {'size': 0}
+        return self.pool.health_check()
+    
+    def close(self):
+        """Shut down the Piper workers"""
+        if self._shard_executor is not None:
+            self._shard_executor.shutdown(wait=False, cancel_futures=True)
+        if self.pool is not None:
+            self.pool.close()
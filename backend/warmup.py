@@ -0,0 +1,144 @@
+"""
+Startup warm-up and readiness state.
+
+Primes the LLM (loading the model and caching the system prompt) and runs
+the Piper voice once on every worker in a background thread at boot, then
+keeps the model resident by re-priming it whenever it has been idle for
+`interval` seconds or Ollama reports it unloaded. readiness() tells a load
+balancer whether this instance is warm enough to take traffic.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class Warmup:
+    """Background warm-up of the LLM and TTS services, with readiness reporting."""
+
+    def __init__(self, llm_service, tts_service, interval: float = 240.0, retry_interval: float = 10.0):
+        """
+        Args:
+            llm_service: LLMService to prime and keep resident
+            tts_service: TTSService whose voice is warmed at startup
+            interval: Seconds of idleness after which the model is re-primed
+            retry_interval: Seconds between attempts while warm-up is failing
+        """
+        self.llm_service = llm_service
+        self.tts_service = tts_service
+        self.interval = interval
+        self.retry_interval = retry_interval
+
+        self.started_at = time.time()
+        self.llm_warmed_at: Optional[float] = None
+        self.llm_error: Optional[str] = None
+        self.llm_prime: Optional[Dict] = None
+        self.tts_warmed_at: Optional[float] = None
+        self.tts_error: Optional[str] = None
+        self.tts_warmup: Optional[Dict] = None
+        self.reprimes = 0
+
+        self._closed = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Warm up in the background and keep the model resident until close()."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='warmup')
+            self._thread.start()
+
+    def _run(self):
+        self.warm_llm()
+        self.warm_tts()
+        while not self._closed.wait(self.interval if self._warm() else self.retry_interval):
+            self.keep_resident()
+
+    def _warm(self) -> bool:
+        return self.llm_error is None and self.tts_warmed_at is not None
+
+    def warm_llm(self) -> bool:
+        try:
+            stats = self.llm_service.prime()
+        except Exception as e:
+            self.llm_error = str(e)
+            print(f"Warning: LLM warm-up failed: {e}")
+            return False
+        if stats is None:
+            self.llm_error = "Could not reach Ollama"
+            return False
+        self.llm_prime = stats
+        self.llm_warmed_at = time.time()
+        self.llm_error = None
+        return True
+
+    def warm_tts(self) -> bool:
+        try:
+            self.tts_warmup = self.tts_service.warm_up()
+        except Exception as e:
+            self.tts_error = str(e)
+            print(f"Warning: TTS warm-up failed: {e}")
+            return False
+        self.tts_warmed_at = time.time()
+        self.tts_error = None
+        return True
+
+    def keep_resident(self):
+        """Re-prime the model if it was unloaded or is about to idle out."""
+        if self.llm_warmed_at is None:
+            # Not built or not reachable yet: asking whether it idled out would only fail
+            self.warm_llm()
+        else:
+            idle = self.llm_service.idle_seconds()
+            unloaded = self.llm_service.model_loaded() is False
+            if unloaded or idle is None or idle >= self.interval:
+                if self.warm_llm():
+                    self.reprimes += 1
+        if self.tts_warmed_at is None:
+            self.warm_tts()
+
+    def liveness(self) -> Dict:
+        return {
+            'status': 'alive',
+            'uptime_s': round(time.time() - self.started_at, 1)
+        }
+
+    def readiness(self) -> Tuple[bool, Dict]:
+        """
+        Returns:
+            (ready, report): ready once the model is loaded and primed and
+            the voice has been warmed, with the expected first-token latency
+        """
+        # Only services that have warmed up are asked; asking would build unbuilt ones
+        llm_warmed = self.llm_warmed_at is not None
+        loaded = self.llm_service.model_loaded() if llm_warmed else None
+        llm_ready = llm_warmed and loaded is not False
+        workers_alive = self.tts_service.workers_alive() if self.tts_warmed_at is not None else None
+        tts_ready = self.tts_warmed_at is not None and workers_alive != 0
+        ready = llm_ready and tts_ready
+        return ready, {
+            'status': 'ready' if ready else 'warming',
+            'llm': {
+                'ready': llm_ready,
+                'model': self.llm_service.model_name if llm_warmed else None,
+                'loaded': loaded,
+                'warmed_at': self.llm_warmed_at,
+                'expected_first_token_ms': self.llm_service.expected_first_token_ms() if llm_warmed else None,
+                'idle_s': _round(self.llm_service.idle_seconds()) if llm_warmed else None,
+                'reprimes': self.reprimes,
+                'error': self.llm_error
+            },
+            'tts': {
+                'ready': tts_ready,
+                'warmed_at': self.tts_warmed_at,
+                'workers_alive': workers_alive,
+                'warmup': self.tts_warmup,
+                'error': self.tts_error
+            }
+        }
+
+    def close(self):
+        self._closed.set()
+
+
+def _round(value, digits=1):
+    return round(value, digits) if value is not None else None